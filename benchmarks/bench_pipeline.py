@@ -0,0 +1,204 @@
+import argparse
+from dataclasses import asdict, replace
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from data_type_mapper.sql_type_mapper import PgsqlTypeMapper
+from entity_parser.entity import Entity, FieldFormat
+from entity_parser.entity_parser import JsonSchemaParser
+from service_gens.csharp_service_gen.db_service_gen import DbServiceGenerator
+from service_gens.csharp_service_gen.utils import CsharpServiceUtil
+from service_gens.service_gen import CSharpTypeMapper
+from sql_generator.sql_generator import (
+    PgsqlCommandGenerator, PgsqlTableSqlGenerator
+)
+from synthetic_schema.synthetic_schema import (
+    PROFILES, SchemaProfile, SyntheticSchemaGenerator
+)
+from utils.utils import EntityFieldData
+
+
+SQL_COMMAND_METHODS: List[str] = [
+    "gen_get_sql_statement",
+    "gen_get_many_sql_statement",
+    "gen_list_sql_statement",
+    "gen_count_sql_statement",
+    "gen_estimate_count_sql_statement",
+    "gen_create_sql_statement",
+    "gen_update_sql_statement",
+    "gen_update_partial_sql_statement",
+    "gen_delete_sql_statement",
+]
+CONTAINMENT_METHOD: str = "gen_list_by_containment_sql_statement"
+
+
+def time_stage(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "min": min(timings),
+        "mean": statistics.mean(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+        "runs": repeat,
+    }
+
+
+def _parse(file_content: str) -> List[Entity]:
+    return JsonSchemaParser().parse(file_content=file_content)
+
+
+def _gen_sql_commands(
+    entities_data: List[EntityFieldData], method_name: str
+) -> None:
+    sql_gen = PgsqlCommandGenerator(entity=None)
+    for entity_data in entities_data:
+        sql_gen.update_entity(entity_data)
+        getattr(sql_gen, method_name)()
+
+
+def _gen_containment_commands(
+    entities_data: List[EntityFieldData]
+) -> None:
+    # Synthetic schemas carry no filterable hints, every json column is
+    # one the hint could be set on
+    sql_gen = PgsqlCommandGenerator(entity=None)
+    for entity_data in entities_data:
+        json_names = {
+            fld.name for fld in entity_data.entity.non_ref_fields
+            if fld.format == FieldFormat.JSON
+        }
+        sql_gen.update_entity(entity_data)
+        for fld in entity_data.other_field_data:
+            if fld.name in json_names:
+                sql_gen.gen_list_by_containment_sql_statement(fld)
+
+
+def _gen_db_scripts(entities: List[Entity]) -> None:
+    file_data = PgsqlTableSqlGenerator().gen_db_scripts_file_data(
+        entities=entities,
+        type_mapper=PgsqlTypeMapper(),
+        file_path="",
+        file_name=""
+    )
+    for _ in file_data.file_content:
+        pass
+
+
+def _gen_db_service(entities: List[Entity]) -> None:
+    service_gen = DbServiceGenerator(
+        service_name="BenchDal",
+        svc_dir=CsharpServiceUtil(
+            output_path="",
+            sln_name="Bench",
+            service_name="BenchDal",
+            src="src"
+        ),
+        entities=entities,
+        pl_type_mapper=CSharpTypeMapper(),
+        sql_gen=PgsqlCommandGenerator(entity=None)
+    )
+    for file_data in service_gen.gen_service():
+        for _ in file_data.file_content:
+            pass
+
+
+def run_benchmarks(
+    profile: SchemaProfile, seed: int, repeat: int
+) -> Dict[str, Any]:
+    file_content = SyntheticSchemaGenerator(profile, seed).gen_schema_content()
+    entities = _parse(file_content)
+    entities_data = [
+        EntityFieldData.from_entity(entity, CSharpTypeMapper())
+        for entity in entities
+    ]
+
+    stages: Dict[str, Dict[str, float]] = {
+        "JsonSchemaParser.parse": time_stage(
+            lambda: _parse(file_content), repeat
+        ),
+        "EntityFieldData.from_entity": time_stage(
+            lambda: [
+                EntityFieldData.from_entity(entity, CSharpTypeMapper())
+                for entity in entities
+            ],
+            repeat
+        ),
+    }
+    for method_name in SQL_COMMAND_METHODS:
+        stages[f"SqlCommandGenerator.{method_name}"] = time_stage(
+            lambda: _gen_sql_commands(entities_data, method_name), repeat
+        )
+
+    stages[f"SqlCommandGenerator.{CONTAINMENT_METHOD}"] = time_stage(
+        lambda: _gen_containment_commands(entities_data), repeat
+    )
+
+    stages["PgsqlTableSqlGenerator.gen_db_scripts_file_data"] = time_stage(
+        lambda: _gen_db_scripts(entities), repeat
+    )
+    stages["DbServiceGenerator.gen_service"] = time_stage(
+        lambda: _gen_db_service(entities), repeat
+    )
+
+    return {
+        "profile": asdict(profile),
+        "seed": seed,
+        "entity_count": len(entities),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "stages": stages,
+    }
+
+
+def main(argv: List[str] = None) -> None:
+    arg_parser = argparse.ArgumentParser(
+        description="Time each stage of the schema to code pipeline"
+    )
+    arg_parser.add_argument(
+        "--profile", choices=sorted(PROFILES), default="production"
+    )
+    arg_parser.add_argument("--entities", type=int)
+    arg_parser.add_argument("--min-fields", type=int)
+    arg_parser.add_argument("--max-fields", type=int)
+    arg_parser.add_argument("--ref-density", type=float)
+    arg_parser.add_argument("--defs-depth", type=int)
+    arg_parser.add_argument("--enum-ratio", type=float)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument(
+        "--output", help="JSON results file, defaults to stdout"
+    )
+    args = arg_parser.parse_args(argv)
+
+    # Command line values override the selected profile
+    overrides = {
+        "entity_count": args.entities,
+        "min_fields": args.min_fields,
+        "max_fields": args.max_fields,
+        "ref_density": args.ref_density,
+        "defs_depth": args.defs_depth,
+        "enum_ratio": args.enum_ratio,
+    }
+    profile = replace(
+        PROFILES[args.profile],
+        **{key: value for key, value in overrides.items() if value is not None}
+    )
+    results = run_benchmarks(profile, args.seed, args.repeat)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
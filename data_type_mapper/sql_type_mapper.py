@@ -93,6 +93,16 @@ class PgsqlTypeMapper(TypeMapper):
     Class for mapping data from json type to pgsql data type
     """
 
+    def __init__(self, use_jsonb: bool = False):
+        """
+        Args:
+            use_jsonb (bool, optional): Whether json fields are stored as
+                JSONB, which is parsed once on write and can be indexed,
+                instead of JSON. Filterable json fields always use JSONB.
+                Defaults to False.
+        """
+        self.use_jsonb = use_jsonb
+
     def get_array_type(self, entity_field: EntityField) -> str:
         return PgSQLDataType.ARRAY
 
@@ -128,7 +138,9 @@ class PgsqlTypeMapper(TypeMapper):
             return PgSQLDataType.REAL.name
         return PgSQLDataType.DOUBLE.name
 
-    def _get_string_type(self, format: FieldFormat, max_length: int) -> str:
+    def _get_string_type(
+        self, format: FieldFormat, max_length: int, use_jsonb: bool = False
+    ) -> str:
         if format == FieldFormat.BYTE:
             return PgSQLDataType.BYTEA.name
         elif format == FieldFormat.DATE:
@@ -142,6 +154,8 @@ class PgsqlTypeMapper(TypeMapper):
         elif format == FieldFormat.IPV6:
             return PgSQLDataType.CIDR.name
         elif format == FieldFormat.JSON:
+            if use_jsonb:
+                return PgSQLDataType.JSONB.name
             return PgSQLDataType.JSON.name
         elif format == FieldFormat.MAC:
             return PgSQLDataType.MACADDR.name
@@ -154,7 +168,9 @@ class PgsqlTypeMapper(TypeMapper):
     def get_field_type(self, entity_field: EntityField) -> str:
         if entity_field.field_type == FieldType.STRING:
             return self._get_string_type(
-                entity_field.format, entity_field.max_length
+                entity_field.format,
+                entity_field.max_length,
+                self.use_jsonb or entity_field.is_filterable
             )
         elif entity_field.field_type == FieldType.INTEGER:
             return self._get_int_type(
@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, List, Union
+from typing import Any, Dict, Iterator, List, Union
 
 
 class FieldType(Enum):
@@ -35,6 +35,7 @@ class FieldData:
     is_required: bool
     ref_field_name: str = None
     pl_data_type: str = None
+    compression: str = None
 
 
 @dataclass
@@ -59,6 +60,10 @@ class EntityField(BaseEntityField):
     enum_values: List[Any] = field(default_factory=list)
     minimum: int = None
     maximum: int = None
+    # Json documents matched by containment in generated list commands
+    is_filterable: bool = False
+    # TOAST compression method of the column
+    compression: str = None
 
 
 @dataclass
@@ -66,6 +71,40 @@ class RefEntityField(BaseEntityField):
     ref_entity: "Entity" = None
 
 
+@dataclass
+class EntityCache:
+    ttl_seconds: int = 60
+    size_limit: int = 10000
+
+
+@dataclass
+class EntityStorage:
+    # Percentage of each page filled by inserts, the rest is kept free so
+    # updated rows can stay on the same page
+    fillfactor: int = None
+    # Skips the write ahead log, the table is truncated after a crash
+    unlogged: bool = False
+
+
+class IndexMethod(Enum):
+    BTREE = "btree"
+    HASH = "hash"
+    BRIN = "brin"
+    GIN = "gin"
+    GIST = "gist"
+
+
+@dataclass
+class EntityIndex:
+    columns: List[str]
+    method: IndexMethod = IndexMethod.BTREE
+    # Non key columns stored in the index for index only scans
+    include: List[str] = field(default_factory=list)
+    # Predicate of a partial index
+    where: str = None
+    name: str = None
+
+
 @dataclass
 class Entity:
     name: str
@@ -75,3 +114,21 @@ class Entity:
     is_enum: bool = False
     enum_values: Any = None
     is_sub_def: bool = False
+    cache: EntityCache = None
+    # Named column subsets selected by the generated projection commands
+    projections: Dict[str, List[str]] = None
+    # Projections read by key through a covering index
+    covering_projections: List[str] = None
+    indexes: List[EntityIndex] = None
+    # Rows are only inserted, so timestamp columns follow the row order
+    append_only: bool = False
+    storage: EntityStorage = None
+
+    def get_table_ref_fields(self) -> Iterator[RefEntityField]:
+        # Sub definitions are stored inline, their references belong to the
+        # table of the entity that embeds them
+        for fld in self.ref_fields:
+            if fld.ref_entity.is_sub_def:
+                yield from fld.ref_entity.get_table_ref_fields()
+            elif not fld.ref_entity.is_enum:
+                yield fld
@@ -1,19 +1,40 @@
 
 from abc import ABC, abstractmethod
 import json
-from typing import Any, Dict, List, Set, Union
+from typing import Any, Dict, Iterable, List, Set, Tuple, Union
 
 from entity_parser.entity import (
-    Entity, EntityField, FieldFormat, FieldType, RefEntityField
+    Entity, EntityCache, EntityField, EntityIndex, EntityStorage, FieldFormat,
+    FieldType, IndexMethod, RefEntityField
+)
+from instrumentation.instrumentation import (
+    NULL_INSTRUMENTATION, Instrumentation
 )
 
 
 TWO: int = 2
 THREE: int = 3
+MIN_FILLFACTOR: int = 10
+MAX_FILLFACTOR: int = 100
+
+COMPRESSION_METHODS: Tuple[str, ...] = ("pglz", "lz4")
+# Formats stored in variable length columns, which TOAST can compress
+COMPRESSIBLE_FORMATS: Tuple[FieldFormat, ...] = (
+    None, FieldFormat.JSON, FieldFormat.BYTE
+)
 
+APPEND_ONLY: str = "appendOnly"
+CACHE: str = "cache"
+COMPRESSION: str = "compression"
+COLUMNS: str = "columns"
+COVERING: str = "covering"
+FILTERABLE: str = "filterable"
 ID: str = "id"
+INDEXES: str = "indexes"
+PROJECTIONS: str = "projections"
 PROPERTIES: str = "properties"
 REQUIRED: str = "required"
+STORAGE: str = "storage"
 SUB_DEFINITION: str = "$defs"
 
 
@@ -37,10 +58,13 @@ class EntityParser(ABC):
 
 
 class JsonSchemaParser(EntityParser):
-    def __init__(self) -> None:
+    def __init__(self, instrumentation: Instrumentation = None) -> None:
         super().__init__()
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
         self.created_objects: Dict[str, Entity] = {}
         self.obj_attributes: Dict[str. List[EntityField]] = {}
+        # Maps an entity name to the entities that reference or embed it
+        self.dependents: Dict[str, Set[str]] = {}
 
     def parse(
         self, file_content: str = None, file_path: str = None
@@ -65,13 +89,23 @@ class JsonSchemaParser(EntityParser):
             If both `file_content` and `file_path` are provided, `file_content`
             will take precedence.
         """
-        schema: Dict[str, Any] = {}
-        if file_content:
-            schema = json.loads(file_content)
-        elif file_path:
-            with open(file_path) as file:
-                schema = json.load(file)
-        else:
+        with self.instrumentation.span("parser.parse") as span:
+            schema: Dict[str, Any] = self._load_schema(file_content, file_path)
+
+            with self.instrumentation.span("parser.process_schema"):
+                self._process_schema(schema, True)
+                for obj_name, attributes in self.obj_attributes.items():
+                    self._update_entity_fields(obj_name, attributes)
+                self._check_unlogged_refs()
+
+            entities = list(self.created_objects.values())
+            span.item_count = len(entities)
+            return entities
+
+    def _load_schema(
+        self, file_content: str = None, file_path: str = None
+    ) -> Dict[str, Any]:
+        if not file_content and not file_path:
             raise ValueError(
                 """
                 Either `file_content` or `file_path` is require but
@@ -79,11 +113,35 @@ class JsonSchemaParser(EntityParser):
                 """
             )
 
-        self._process_schema(schema, True)
-        for obj_name, attributes in self.obj_attributes.items():
-            self._update_entity_fields(obj_name, attributes)
+        with self.instrumentation.span("parser.load_json"):
+            if file_content:
+                return json.loads(file_content)
 
-        return list(self.created_objects.values())
+            with open(file_path) as file:
+                return json.load(file)
+
+    def affected_by(self, entity_names: Iterable[str]) -> Set[str]:
+        """ Returns the entities whose generated output depends on any of
+        the given entities, directly or through other references.
+
+        Args:
+            entity_names (Iterable[str]): The names of the changed entities.
+
+        Returns:
+            Set[str]: The given entity names and every entity that
+                transitively references them.
+        """
+        affected: Set[str] = set()
+        pending: List[str] = list(entity_names)
+        while pending:
+            entity_name = pending.pop()
+            if entity_name in affected:
+                continue
+
+            affected.add(entity_name)
+            pending.extend(self.dependents.get(entity_name, ()))
+
+        return affected
 
     def _get_field_type(self, field_type: str) -> Union[FieldType, None]:
         if not field_type:
@@ -152,6 +210,10 @@ class JsonSchemaParser(EntityParser):
                 self.created_objects[obj_name].is_enum = True
                 self.created_objects[obj_name].enum_values = enum_values
 
+            self._process_entity_hints(
+                self.created_objects[obj_name], obj_defs
+            )
+
         for obj_name, obj_defs in definitions.items():
             self._process_schema(obj_defs)
             self._process_obj_properties(
@@ -175,12 +237,185 @@ class JsonSchemaParser(EntityParser):
             ref_fields=[],
             pk_fields=[]
         )
+        self._process_entity_hints(self.created_objects[obj_name], schema)
         self._process_obj_properties(
             obj_name=obj_name,
             obj_properties=schema.get(PROPERTIES, {}),
             required_props=set(schema.get(REQUIRED, []))
         )
 
+    def _process_entity_hints(
+        self, entity: Entity, obj_defs: Dict[str, Any]
+    ) -> None:
+        # Generation hints set on the definition itself
+        if (cache := obj_defs.get(CACHE)) is not None:
+            entity.cache = self._get_entity_cache(entity.name, cache)
+
+        if (projections := obj_defs.get(PROJECTIONS)) is not None:
+            entity.projections, entity.covering_projections = (
+                self._get_entity_projections(entity.name, projections)
+            )
+
+        if (indexes := obj_defs.get(INDEXES)) is not None:
+            entity.indexes = self._get_entity_indexes(entity.name, indexes)
+
+        if (append_only := obj_defs.get(APPEND_ONLY)) is not None:
+            if not isinstance(append_only, bool):
+                raise ValueError(
+                    f"`{entity.name}.{APPEND_ONLY}` must be a boolean"
+                )
+            entity.append_only = append_only
+
+        if (storage := obj_defs.get(STORAGE)) is not None:
+            entity.storage = self._get_entity_storage(entity, storage)
+
+    def _get_entity_cache(
+        self, obj_name: str, cache: Dict[str, Any]
+    ) -> EntityCache:
+        entity_cache = EntityCache()
+        for key, attr in (
+            ("ttlSeconds", "ttl_seconds"), ("sizeLimit", "size_limit")
+        ):
+            value = cache.get(key, getattr(entity_cache, attr))
+            if (
+                not isinstance(value, int) or isinstance(value, bool)
+                or value <= 0
+            ):
+                raise ValueError(
+                    f"`{obj_name}.{CACHE}.{key}` must be a positive integer"
+                )
+            setattr(entity_cache, attr, value)
+
+        return entity_cache
+
+    def _get_entity_projections(
+        self, obj_name: str, projections: Dict[str, Any]
+    ) -> Tuple[Dict[str, List[str]], List[str]]:
+        if not isinstance(projections, dict):
+            raise ValueError(f"`{obj_name}.{PROJECTIONS}` must be an object")
+
+        # A projection is a list of columns, or an object that also opts
+        # into a covering index
+        entity_projections: Dict[str, List[str]] = {}
+        covering: List[str] = []
+        for name, projection in projections.items():
+            path = f"{obj_name}.{PROJECTIONS}.{name}"
+            # Projection names become class and method names
+            if not name.isidentifier():
+                raise ValueError(f"`{path}` is not a valid name")
+
+            columns = projection
+            if isinstance(projection, dict):
+                columns = projection.get(COLUMNS)
+                is_covering = projection.get(COVERING, False)
+                if not isinstance(is_covering, bool):
+                    raise ValueError(
+                        f"`{path}.{COVERING}` must be a boolean"
+                    )
+                if is_covering:
+                    covering.append(name)
+            if (
+                not isinstance(columns, list) or not columns
+                or not all(isinstance(column, str) for column in columns)
+            ):
+                raise ValueError(
+                    f"`{path}` must be a non-empty list of column names"
+                )
+            entity_projections[name] = list(columns)
+
+        return entity_projections, covering or None
+
+    def _get_entity_storage(
+        self, entity: Entity, storage: Dict[str, Any]
+    ) -> EntityStorage:
+        path = f"{entity.name}.{STORAGE}"
+        if not isinstance(storage, dict):
+            raise ValueError(f"`{path}` must be an object")
+
+        fillfactor = storage.get("fillfactor")
+        if fillfactor is not None and (
+            not isinstance(fillfactor, int) or isinstance(fillfactor, bool)
+            or not MIN_FILLFACTOR <= fillfactor <= MAX_FILLFACTOR
+        ):
+            raise ValueError(
+                f"`{path}.fillfactor` must be an integer between "
+                f"{MIN_FILLFACTOR} and {MAX_FILLFACTOR}"
+            )
+
+        # Rows that are never updated gain nothing from free page space
+        if entity.append_only and fillfactor not in (None, MAX_FILLFACTOR):
+            raise ValueError(
+                f"`{path}.fillfactor` cannot be set on an append only table"
+            )
+
+        unlogged = storage.get("unlogged", False)
+        if not isinstance(unlogged, bool):
+            raise ValueError(f"`{path}.unlogged` must be a boolean")
+
+        return EntityStorage(fillfactor=fillfactor, unlogged=unlogged)
+
+    def _get_entity_indexes(
+        self, obj_name: str, indexes: List[Any]
+    ) -> List[EntityIndex]:
+        if not isinstance(indexes, list):
+            raise ValueError(f"`{obj_name}.{INDEXES}` must be a list")
+
+        entity_indexes: List[EntityIndex] = []
+        for idx, index in enumerate(indexes):
+            path = f"{obj_name}.{INDEXES}[{idx}]"
+            if not isinstance(index, dict):
+                raise ValueError(f"`{path}` must be an object")
+
+            columns = index.get("columns")
+            include = index.get("include", [])
+            for key, value, allow_empty in (
+                ("columns", columns, False), ("include", include, True)
+            ):
+                if (
+                    not isinstance(value, list)
+                    or not (value or allow_empty)
+                    or not all(isinstance(column, str) for column in value)
+                ):
+                    raise ValueError(
+                        f"`{path}.{key}` must be a "
+                        f"{'' if allow_empty else 'non-empty '}list of column "
+                        "names"
+                    )
+
+            try:
+                method = IndexMethod(index.get("method", "btree"))
+            except ValueError:
+                raise ValueError(
+                    f"`{path}.method` must be one of "
+                    f"{', '.join(method.value for method in IndexMethod)}"
+                )
+
+            # PostgreSQL only stores included columns in btree and gist
+            if include and method not in (IndexMethod.BTREE, IndexMethod.GIST):
+                raise ValueError(
+                    f"`{path}.include` is not supported by {method.value} "
+                    "indexes"
+                )
+
+            for key in ("where", "name"):
+                value = index.get(key)
+                if value is not None and (
+                    not isinstance(value, str) or not value.strip()
+                ):
+                    raise ValueError(
+                        f"`{path}.{key}` must be a non-empty string"
+                    )
+
+            entity_indexes.append(EntityIndex(
+                columns=list(columns),
+                method=method,
+                include=list(include),
+                where=index.get("where"),
+                name=index.get("name")
+            ))
+
+        return entity_indexes
+
     def _process_obj_properties(
         self,
         obj_name: str,
@@ -223,11 +458,72 @@ class JsonSchemaParser(EntityParser):
                         prop_def.get("format", None)
                     ),
                     minimum=prop_def.get("minimum", None),
-                    maximum=prop_def.get("maximum", None)
+                    maximum=prop_def.get("maximum", None),
+                    is_filterable=self._is_filterable(
+                        obj_name, prop_name, prop_def
+                    ),
+                    compression=self._get_compression(
+                        obj_name, prop_name, prop_def, prop_type
+                    )
                 ))
 
         self.obj_attributes[obj_name] = attributes
 
+    def _is_filterable(
+        self, obj_name: str, prop_name: str, prop_def: Dict[str, Any]
+    ) -> bool:
+        filterable = prop_def.get(FILTERABLE, False)
+        path = f"{obj_name}.{prop_name}.{FILTERABLE}"
+        if not isinstance(filterable, bool):
+            raise ValueError(f"`{path}` must be a boolean")
+
+        # Containment is only defined for json documents
+        if filterable and prop_def.get("format") != FieldFormat.JSON.value:
+            raise ValueError(f"`{path}` is only supported on json fields")
+
+        return filterable
+
+    def _get_compression(
+        self,
+        obj_name: str,
+        prop_name: str,
+        prop_def: Dict[str, Any],
+        prop_type: FieldType
+    ) -> Union[str, None]:
+        compression = prop_def.get(COMPRESSION)
+        if compression is None:
+            return None
+
+        path = f"{obj_name}.{prop_name}.{COMPRESSION}"
+        if compression not in COMPRESSION_METHODS:
+            raise ValueError(
+                f"`{path}` must be one of {', '.join(COMPRESSION_METHODS)}"
+            )
+
+        field_format = self._get_field_format(prop_def.get("format"))
+        if (
+            prop_type != FieldType.STRING
+            or field_format not in COMPRESSIBLE_FORMATS
+        ):
+            raise ValueError(
+                f"`{path}` is only supported on text, json and byte fields"
+            )
+
+        return compression
+
+    def _check_unlogged_refs(self) -> None:
+        # A logged table cannot hold a foreign key to an unlogged table
+        for entity in self.created_objects.values():
+            if entity.is_sub_def or entity.is_enum or _is_unlogged(entity):
+                continue
+
+            for fld in entity.get_table_ref_fields():
+                if _is_unlogged(fld.ref_entity):
+                    raise ValueError(
+                        f"`{entity.name}.{fld.name}` references the unlogged "
+                        f"table `{fld.ref_entity.name}`"
+                    )
+
     def _update_entity_fields(
         self, class_name: str, attributes: List[EntityField]
     ) -> None:
@@ -255,6 +551,9 @@ class JsonSchemaParser(EntityParser):
                     """
                 )
             elif field.type_ref:
+                self.dependents.setdefault(field.type_ref, set()).add(
+                    class_name
+                )
                 ref_fields.append(
                     RefEntityField(
                         name=field.name,
@@ -288,3 +587,7 @@ class JsonSchemaParser(EntityParser):
         self.created_objects[class_name].non_ref_fields = non_ref_fields
         self.created_objects[class_name].ref_fields = ref_fields
         self.created_objects[class_name].pk_fields = pk_fields
+
+
+def _is_unlogged(entity: Entity) -> bool:
+    return bool(entity.storage and entity.storage.unlogged)
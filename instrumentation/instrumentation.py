@@ -0,0 +1,206 @@
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, TextIO
+
+
+@dataclass
+class Span:
+    name: str
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    item_count: int = None
+    depth: int = 0
+    start: float = 0.0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    memory_peak: int = None
+    # Absolute traced memory values used while the span is open
+    _memory_base: int = field(default=0, repr=False)
+    _memory_max: int = field(default=0, repr=False)
+
+
+class Instrumentation:
+    """_summary_
+    No-op instrumentation. Subclasses receive a callback when a span starts
+    and when it ends.
+    """
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        span = Span(name=name, attributes=attributes)
+        self.on_span_start(span)
+        try:
+            yield span
+        finally:
+            self.on_span_end(span)
+
+    def on_span_start(self, span: Span) -> None:
+        pass
+
+    def on_span_end(self, span: Span) -> None:
+        pass
+
+
+NULL_INSTRUMENTATION = Instrumentation()
+
+
+class SpanRecorder(Instrumentation):
+    """_summary_
+    Records the wall time, CPU time, item count and, when `trace_memory` is
+    set, the tracemalloc peak of every span. Tracing started by the recorder
+    is stopped when it is closed.
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.spans: List[Span] = []
+        self._stack: List[Span] = []
+        self._origin = time.perf_counter()
+        self._started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+    def close(self) -> None:
+        # Tracing slows every allocation, leave it as it was found
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def __enter__(self) -> "SpanRecorder":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def on_span_start(self, span: Span) -> None:
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                parent = self._stack[-1]
+                parent._memory_max = max(parent._memory_max, peak)
+
+            # Reset so the peak observed at the end belongs to this span
+            tracemalloc.reset_peak()
+            span._memory_base = current
+            span._memory_max = current
+
+        span.depth = len(self._stack)
+        span.start = time.perf_counter() - self._origin
+        span.cpu_seconds = time.process_time()
+        self._stack.append(span)
+
+    def on_span_end(self, span: Span) -> None:
+        span.wall_seconds = time.perf_counter() - self._origin - span.start
+        span.cpu_seconds = time.process_time() - span.cpu_seconds
+        self._stack.pop()
+
+        if self.trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            span._memory_max = max(span._memory_max, peak)
+            span.memory_peak = span._memory_max - span._memory_base
+            if self._stack:
+                parent = self._stack[-1]
+                parent._memory_max = max(parent._memory_max, span._memory_max)
+
+        self.spans.append(span)
+
+    def get_summary(self) -> Dict[str, Dict[str, Any]]:
+        summary: Dict[str, Dict[str, Any]] = {}
+        for span in sorted(self.spans, key=lambda span: span.start):
+            stats = summary.setdefault(span.name, {
+                "count": 0,
+                "wall_seconds": 0.0,
+                "cpu_seconds": 0.0,
+                "memory_peak": None,
+                "item_count": None,
+            })
+            stats["count"] += 1
+            stats["wall_seconds"] += span.wall_seconds
+            stats["cpu_seconds"] += span.cpu_seconds
+            if span.memory_peak is not None:
+                stats["memory_peak"] = max(
+                    stats["memory_peak"] or 0, span.memory_peak
+                )
+            if span.item_count is not None:
+                stats["item_count"] = (
+                    (stats["item_count"] or 0) + span.item_count
+                )
+
+        return summary
+
+    def print_summary(self, file: TextIO = None) -> None:
+        file = file or sys.stdout
+        header = (
+            f"{'span':<40} {'count':>6} {'wall ms':>10} {'cpu ms':>10} "
+            f"{'peak KiB':>10} {'items':>8}"
+        )
+        print(header, file=file)
+        print("-" * len(header), file=file)
+        for name, stats in self.get_summary().items():
+            memory_peak = (
+                f"{stats['memory_peak'] / 1024:.1f}"
+                if stats["memory_peak"] is not None else "-"
+            )
+            item_count = (
+                stats["item_count"] if stats["item_count"] is not None
+                else "-"
+            )
+            print(
+                f"{name:<40} {stats['count']:>6} "
+                f"{stats['wall_seconds'] * 1000:>10.2f} "
+                f"{stats['cpu_seconds'] * 1000:>10.2f} "
+                f"{memory_peak:>10} {item_count:>8}",
+                file=file
+            )
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "spans": [
+                {
+                    key: value for key, value in asdict(span).items()
+                    if not key.startswith("_")
+                }
+                for span in self.spans
+            ],
+            "summary": self.get_summary(),
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """ Returns the spans in the Chrome trace event format, which can be
+        loaded in chrome://tracing or Perfetto.
+        """
+        pid = os.getpid()
+        tid = threading.get_ident()
+        return {
+            "traceEvents": [
+                {
+                    "name": span.name,
+                    "ph": "X",
+                    "ts": span.start * 1_000_000,
+                    "dur": span.wall_seconds * 1_000_000,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {
+                        **span.attributes,
+                        "cpu_ms": span.cpu_seconds * 1000,
+                        "memory_peak": span.memory_peak,
+                        "item_count": span.item_count,
+                    },
+                }
+                for span in self.spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write_json(self, file_path: str) -> None:
+        with open(file_path, "w") as file:
+            json.dump(self.to_json(), file, indent=2, default=str)
+
+    def write_chrome_trace(self, file_path: str) -> None:
+        with open(file_path, "w") as file:
+            json.dump(self.to_chrome_trace(), file, default=str)
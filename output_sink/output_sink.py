@@ -0,0 +1,111 @@
+from abc import ABC, abstractmethod
+import io
+import os
+import tarfile
+from typing import BinaryIO, Dict
+import zipfile
+
+from utils.utils import FileData, with_line_endings, write_file_data
+
+
+ENCODING: str = "utf-8"
+
+
+class OutputSink(ABC):
+    """_summary_
+    Destination that generated `FileData` is written to
+    """
+
+    def __init__(self, root_path: str = "") -> None:
+        self.root_path = root_path
+
+    @property
+    def is_file_system(self) -> bool:
+        return False
+
+    @abstractmethod
+    def write(self, file_data: FileData) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "OutputSink":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _get_entry_name(self, file_data: FileData) -> str:
+        file_path = os.path.join(file_data.file_path, file_data.file_name)
+        if self.root_path:
+            file_path = os.path.relpath(file_path, self.root_path)
+        return file_path.replace(os.sep, "/")
+
+
+class DirectoryOutputSink(OutputSink):
+    @property
+    def is_file_system(self) -> bool:
+        return True
+
+    def write(self, file_data: FileData) -> None:
+        write_file_data(file_data)
+
+
+class MemoryOutputSink(OutputSink):
+    def __init__(self, root_path: str = "") -> None:
+        super().__init__(root_path)
+        self.files: Dict[str, str] = {}
+
+    def write(self, file_data: FileData) -> None:
+        self.files[self._get_entry_name(file_data)] = "".join(
+            with_line_endings(file_data.file_content)
+        )
+
+
+class ZipOutputSink(OutputSink):
+    def __init__(
+        self,
+        stream: BinaryIO,
+        root_path: str = "",
+        compression: int = zipfile.ZIP_DEFLATED
+    ) -> None:
+        super().__init__(root_path)
+        self.archive = zipfile.ZipFile(stream, "w", compression=compression)
+
+    def write(self, file_data: FileData) -> None:
+        # Each line is encoded and compressed as it is produced
+        entry = self.archive.open(self._get_entry_name(file_data), "w")
+        with io.TextIOWrapper(entry, encoding=ENCODING) as text_entry:
+            text_entry.writelines(with_line_endings(file_data.file_content))
+
+    def close(self) -> None:
+        self.archive.close()
+
+
+class TarOutputSink(OutputSink):
+    def __init__(
+        self,
+        stream: BinaryIO,
+        root_path: str = "",
+        compression: str = "gz"
+    ) -> None:
+        super().__init__(root_path)
+        # Stream mode so non seekable outputs such as sockets can be used
+        self.archive = tarfile.open(fileobj=stream, mode=f"w|{compression}")
+
+    def write(self, file_data: FileData) -> None:
+        # Tar headers hold the entry size, so each file is encoded first
+        content = io.BytesIO()
+        with io.TextIOWrapper(content, encoding=ENCODING) as text_content:
+            text_content.writelines(
+                with_line_endings(file_data.file_content)
+            )
+            text_content.flush()
+            tar_info = tarfile.TarInfo(self._get_entry_name(file_data))
+            tar_info.size = content.tell()
+            content.seek(0)
+            self.archive.addfile(tar_info, content)
+
+    def close(self) -> None:
+        self.archive.close()
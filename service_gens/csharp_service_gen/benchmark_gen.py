@@ -0,0 +1,331 @@
+from typing import Dict, Generator, List
+
+from data_type_mapper.data_type_mapper import TypeMapper
+from entity_parser.entity import Entity, FieldData
+from service_gens.csharp_service_gen.utils import (
+    DB_SCRIPTS, CsharpServiceUtil
+)
+from service_gens.service_gen import CSharpDataType, ServiceGenerator
+from synthetic_schema.synthetic_schema import SyntheticSchemaGenerator
+from utils.constants import TAB_4, TAB_8, TAB_12, TAB_16
+from utils.utils import EntityFieldData, FileData
+
+
+DELETE_BATCH_SIZE: int = 100
+DB_CONNECTION_VARIABLE: str = "BENCHMARK_DB_CONNECTION"
+INIT_SQL_VARIABLE: str = "BENCHMARK_INIT_SQL"
+SEED_SQL_VARIABLE: str = "BENCHMARK_SEED_SQL"
+SEED_SQL_FILE_NAME: str = "seed.sql"
+DEFAULT_SEED_ROW_COUNT: int = 1000
+# Each benchmark process creates its rows in a random block of keys past
+# the seeded rows, the blocks fit the range of an int key
+KEY_BLOCK_SIZE: int = 1_000_000
+KEY_BLOCK_COUNT: int = 2_000
+DEFAULT_DB_CONNECTION: str = (
+    "Host=localhost;Username=postgres;Password=postgres;Database=postgres"
+)
+
+# C# expressions that build a value of each type from the `key` counter
+KEY_EXPRESSIONS: Dict[str, str] = {
+    CSharpDataType.BOOLEAN.value: "key % 2 == 0",
+    CSharpDataType.BYTE.value: "(byte)key",
+    CSharpDataType.SBYTE.value: "(sbyte)key",
+    CSharpDataType.CHAR.value: "(char)('a' + key % 26)",
+    CSharpDataType.DECIMAL.value: "key",
+    CSharpDataType.DOUBLE.value: "key",
+    CSharpDataType.FLOAT.value: "key",
+    CSharpDataType.INT.value: "(int)key",
+    CSharpDataType.UINT.value: "(uint)key",
+    CSharpDataType.LONG.value: "key",
+    CSharpDataType.ULONG.value: "(ulong)key",
+    CSharpDataType.SHORT.value: "(short)key",
+    CSharpDataType.USHORT.value: "(ushort)key",
+    CSharpDataType.STRING.value: '$"bench-{key}"',
+    CSharpDataType.DATETIME.value: "DateTime.UtcNow",
+    CSharpDataType.DATETIMEOFFSET.value: "DateTimeOffset.UtcNow",
+    CSharpDataType.TIMESPAN.value: "TimeSpan.FromSeconds(key)",
+    CSharpDataType.GUID.value: "Guid.NewGuid()",
+}
+
+
+class BenchmarkProjectGen(ServiceGenerator):
+    """_summary_
+    Generates a BenchmarkDotNet console project that measures the generated
+    repos against a PostgreSQL database created with the generated init.sql
+    and seeded with synthetic rows
+    """
+
+    def __init__(
+        self,
+        service_name: str,
+        svc_dir: CsharpServiceUtil,
+        entities: List[Entity],
+        pl_type_mapper: TypeMapper,
+        db_type_mapper: TypeMapper = None,
+        seed_row_count: int = DEFAULT_SEED_ROW_COUNT
+    ):
+        """
+        Args:
+            db_type_mapper (TypeMapper, optional): Maps the column types of
+                init.sql, which the seeded values are generated for.
+                Defaults to PgsqlTypeMapper().
+            seed_row_count (int, optional): The number of synthetic rows
+                seed.sql inserts per table before the benchmarks run.
+                Defaults to DEFAULT_SEED_ROW_COUNT.
+        """
+        super().__init__(
+            service_name=service_name,
+            entities=entities,
+            pl_type_mapper=pl_type_mapper,
+            db_type_mapper=db_type_mapper
+        )
+        self.svc_dir = svc_dir
+        self.seed_row_count = seed_row_count
+        self.entities_by_name: Dict[str, Entity] = {
+            entity.name: entity for entity in entities
+        }
+
+    def gen_service(self) -> Generator[FileData, None, None]:
+        yield self._gen_program()
+        yield self._gen_benchmark_db()
+        yield self._gen_seed_sql()
+
+        # Repos without a primary key cannot be fetched, updated or
+        # deleted one row at a time
+        for entity in self.entities:
+            if entity.pk_fields and not entity.is_sub_def:
+                yield self._gen_repo_benchmark(entity)
+
+    def _gen_program(self) -> FileData:
+        file_content = [
+            "using BenchmarkDotNet.Running;",
+            "",
+            "BenchmarkSwitcher.FromAssembly(typeof(Program).Assembly)"
+            ".Run(args);"
+        ]
+        return FileData(
+            file_path=self.svc_dir.benchmark_dir_path,
+            file_name=self.svc_dir.get_file_name("Program"),
+            file_content=file_content
+        )
+
+    def _gen_benchmark_db(self) -> FileData:
+        file_content = [
+            "using System.Data;",
+            "using Npgsql;",
+            "",
+            f"namespace {self.svc_dir.benchmark_ns}",
+            "{",
+            f"{TAB_4}public static class BenchmarkDb",
+            f"{TAB_4}{{",
+            f"{TAB_8}public const long SeedRowCount = {self.seed_row_count};",
+            "",
+            f"{TAB_8}private static bool initialized;",
+            "",
+            f"{TAB_8}public static IDbConnection Open()",
+            f"{TAB_8}{{",
+            f"{TAB_12}var conn = new NpgsqlConnection(",
+            f"{TAB_16}Environment.GetEnvironmentVariable"
+            f'("{DB_CONNECTION_VARIABLE}")',
+            f'{TAB_16}?? "{DEFAULT_DB_CONNECTION}");',
+            f"{TAB_12}conn.Open();",
+            "",
+            f"{TAB_12}// Rows are created without their referenced rows",
+            f"{TAB_12}Execute(conn, "
+            '"SET session_replication_role = replica;");',
+            f"{TAB_12}if (!initialized)",
+            f"{TAB_12}{{",
+            f"{TAB_16}Execute(conn, File.ReadAllText(FindScript"
+            f'("{INIT_SQL_VARIABLE}", "{DB_SCRIPTS}", '
+            f'"{self.svc_dir.db_scripts_file_name}")));',
+            "",
+            f"{TAB_16}// Queries run against tables of a realistic size",
+            f"{TAB_16}Execute(conn, File.ReadAllText(FindScript"
+            f'("{SEED_SQL_VARIABLE}", "{SEED_SQL_FILE_NAME}")));',
+            f"{TAB_16}initialized = true;",
+            f"{TAB_12}}}",
+            "",
+            f"{TAB_12}return conn;",
+            f"{TAB_8}}}",
+            "",
+            f"{TAB_8}// Keys restart in every BenchmarkDotNet process, so "
+            "each one",
+            f"{TAB_8}// starts at a random block to miss the rows of "
+            "earlier processes",
+            f"{TAB_8}public static long NewKeyBase() => SeedRowCount + 1",
+            f"{TAB_12}+ Random.Shared.NextInt64({KEY_BLOCK_COUNT}) * "
+            f"{KEY_BLOCK_SIZE};",
+            "",
+            f"{TAB_8}private static void Execute"
+            "(IDbConnection conn, string sql)",
+            f"{TAB_8}{{",
+            f"{TAB_12}using var command = conn.CreateCommand();",
+            f"{TAB_12}command.CommandText = sql;",
+            f"{TAB_12}command.ExecuteNonQuery();",
+            f"{TAB_8}}}",
+            "",
+            f"{TAB_8}private static string FindScript"
+            "(string variable, params string[] relativePath)",
+            f"{TAB_8}{{",
+            f"{TAB_12}var path = Environment.GetEnvironmentVariable"
+            "(variable);",
+            f"{TAB_12}if (!string.IsNullOrEmpty(path))",
+            f"{TAB_12}{{",
+            f"{TAB_16}return path;",
+            f"{TAB_12}}}",
+            "",
+            f"{TAB_12}for (var dir = new DirectoryInfo"
+            "(AppContext.BaseDirectory); dir != null; dir = dir.Parent)",
+            f"{TAB_12}{{",
+            f"{TAB_16}var candidate = Path.Combine"
+            "(relativePath.Prepend(dir.FullName).ToArray());",
+            f"{TAB_16}if (File.Exists(candidate))",
+            f"{TAB_16}{{",
+            f"{TAB_16}{TAB_4}return candidate;",
+            f"{TAB_16}}}",
+            f"{TAB_12}}}",
+            "",
+            f"{TAB_12}throw new FileNotFoundException"
+            '($"{relativePath[^1]} not found, set {variable}");',
+            f"{TAB_8}}}",
+            f"{TAB_4}}}",
+            "}"
+        ]
+        return FileData(
+            file_path=self.svc_dir.benchmark_dir_path,
+            file_name=self.svc_dir.get_file_name("BenchmarkDb"),
+            file_content=file_content
+        )
+
+    def _gen_seed_sql(self) -> FileData:
+        # Rows are only generated once the content is consumed
+        synthetic_gen = SyntheticSchemaGenerator()
+        return FileData(
+            file_path=self.svc_dir.benchmark_dir_path,
+            file_name=SEED_SQL_FILE_NAME,
+            file_content=synthetic_gen.gen_insert_sql(
+                synthetic_gen.gen_rows(
+                    self.entities, self.seed_row_count, self.db_type_mapper
+                ),
+                skip_existing=True
+            )
+        )
+
+    def _gen_repo_benchmark(self, entity: Entity) -> FileData:
+        ent_name: str = self.svc_dir.normalize_name(entity.name)
+        entity_data = EntityFieldData.from_entity(entity, self.pl_type_mapper)
+        class_name: str = self.svc_dir.get_benchmark_name(ent_name)
+        get_param: str = self.svc_dir.get_get_param_name(ent_name)
+        list_param: str = self.svc_dir.get_list_param_name(ent_name)
+        repo_name: str = self.svc_dir.get_repo_name(ent_name)
+        sql_cmd_name: str = self.svc_dir.get_sql_cmd_name(ent_name)
+        db_service: str = self.svc_dir.db_service_class_name
+        file_content = [
+            "using BenchmarkDotNet.Attributes;",
+            f"using {self.svc_dir.db_service_ns};",
+            f"using {self.svc_dir.model_ns};",
+            f"using {self.svc_dir.repos_ns};",
+            f"using {self.svc_dir.sql_cmd_ns};",
+            "",
+            f"namespace {self.svc_dir.benchmark_ns}",
+            "{",
+            f"{TAB_4}[MemoryDiagnoser]",
+            f"{TAB_4}public class {class_name}",
+            f"{TAB_4}{{",
+            f"{TAB_8}private const int DeleteBatchSize = {DELETE_BATCH_SIZE};",
+            f"{TAB_8}private readonly List<{get_param}> deleteParams = new();",
+            f"{TAB_8}private readonly {list_param} listParam = new();",
+            f"{TAB_8}private {repo_name} repo = null!;",
+            f"{TAB_8}private {ent_name} entity = null!;",
+            f"{TAB_8}private {get_param} getParam = null!;",
+            f"{TAB_8}private long nextKey = BenchmarkDb.NewKeyBase();",
+            "",
+            f"{TAB_8}[GlobalSetup]",
+            f"{TAB_8}public async Task SetupAsync()",
+            f"{TAB_8}{{",
+            f"{TAB_12}repo = new {repo_name}(new {db_service}"
+            f"(BenchmarkDb.Open()), new {sql_cmd_name}());",
+            f"{TAB_12}entity = NewEntity(nextKey++);",
+            f"{TAB_12}await repo.CreateAsync(entity);",
+            f"{TAB_12}getParam = NewGetParam(entity);",
+            f"{TAB_8}}}",
+            "",
+            f"{TAB_8}[IterationSetup(Target = nameof(DeleteAsync))]",
+            f"{TAB_8}public void SetupDelete()",
+            f"{TAB_8}{{",
+            f"{TAB_12}deleteParams.Clear();",
+            f"{TAB_12}for (var i = 0; i < DeleteBatchSize; i++)",
+            f"{TAB_12}{{",
+            f"{TAB_16}var row = NewEntity(nextKey++);",
+            f"{TAB_16}repo.CreateAsync(row).GetAwaiter().GetResult();",
+            f"{TAB_16}deleteParams.Add(NewGetParam(row));",
+            f"{TAB_12}}}",
+            f"{TAB_8}}}",
+            "",
+            f"{TAB_8}[Benchmark]",
+            f"{TAB_8}public Task<{ent_name}?> GetAsync() => "
+            "repo.GetAsync(getParam);",
+            "",
+            f"{TAB_8}[Benchmark]",
+            f"{TAB_8}public Task<IEnumerable<{ent_name}>> ListAsync() => "
+            "repo.ListAsync(listParam);",
+            "",
+            f"{TAB_8}[Benchmark]",
+            f"{TAB_8}public Task<int> CreateAsync() => "
+            "repo.CreateAsync(NewEntity(nextKey++));",
+            "",
+            f"{TAB_8}[Benchmark]",
+            f"{TAB_8}public Task<int> UpdateAsync() => "
+            "repo.UpdateAsync(entity);",
+            "",
+            f"{TAB_8}[Benchmark(OperationsPerInvoke = DeleteBatchSize)]",
+            f"{TAB_8}public async Task DeleteAsync()",
+            f"{TAB_8}{{",
+            f"{TAB_12}foreach (var param in deleteParams)",
+            f"{TAB_12}{{",
+            f"{TAB_16}await repo.DeleteAsync(param);",
+            f"{TAB_12}}}",
+            f"{TAB_8}}}",
+            "",
+            f"{TAB_8}private static {ent_name} NewEntity(long key) => new()",
+            f"{TAB_8}{{",
+        ]
+
+        # Only required columns are set, the others stay null
+        file_content.extend(
+            f"{TAB_12}{self.svc_dir.normalize_name(fld.name)} = "
+            f"{self._get_value_expression(fld)},"
+            for fld in entity_data.get_field_data()
+            if fld.is_required or fld in entity_data.pk_field_data
+        )
+        file_content.extend([
+            f"{TAB_8}}};",
+            "",
+            f"{TAB_8}private static {get_param} NewGetParam"
+            f"({ent_name} row) => new()",
+            f"{TAB_8}{{",
+        ])
+        file_content.extend(
+            f"{TAB_12}{self.svc_dir.normalize_name(fld.name)} = "
+            f"row.{self.svc_dir.normalize_name(fld.name)},"
+            for fld in entity_data.pk_field_data
+        )
+        file_content.extend([
+            f"{TAB_8}}};",
+            f"{TAB_4}}}",
+            "}"
+        ])
+        return FileData(
+            file_path=self.svc_dir.benchmark_dir_path,
+            file_name=self.svc_dir.get_file_name(class_name),
+            file_content=file_content
+        )
+
+    def _get_value_expression(self, field: FieldData) -> str:
+        ref_entity = self.entities_by_name.get(field.ref_entity_name)
+        if ref_entity and ref_entity.is_enum and ref_entity.enum_values:
+            return f'"{ref_entity.enum_values[0]}"'
+        return KEY_EXPRESSIONS.get(
+            field.data_type, KEY_EXPRESSIONS[CSharpDataType.STRING.value]
+        )
+
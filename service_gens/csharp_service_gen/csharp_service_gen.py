@@ -1,26 +1,49 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
 import os
 import subprocess
+import time
+import traceback
+from typing import Iterable, List
 
 from data_type_mapper.data_type_mapper import TypeMapper
 from entity_parser.entity_parser import JsonSchemaParser
-from service_gens.csharp_service_gen.db_service_gen import DbServiceGenerator
+from instrumentation.instrumentation import (
+    NULL_INSTRUMENTATION, Instrumentation
+)
+from output_sink.output_sink import DirectoryOutputSink, OutputSink
+from service_gens.csharp_service_gen.benchmark_gen import BenchmarkProjectGen
+from service_gens.csharp_service_gen.db_service_gen import (
+    DEFAULT_COUNT_ESTIMATE_THRESHOLD, DbServiceGenerator
+)
 from service_gens.csharp_service_gen.secret_manager_gen import SecretManagerGen
 from service_gens.csharp_service_gen.utils import (
     SECRET_MANAGER, CsharpServiceUtil
 )
 from service_gens.service_gen import CSharpTypeMapper
 from sql_generator.sql_generator import SqlCommandGenerator, TableSqlGenerator
-from utils.utils import read_file_content, write_file_data
+from utils.utils import FileData, read_file_content
 
 
 class DotnetProcessRunner:
     @staticmethod
     def setup_project(
-        svc_util: CsharpServiceUtil, create_db_scripts_dir: bool = True
+        svc_util: CsharpServiceUtil,
+        create_db_scripts_dir: bool = True,
+        instrumentation: Instrumentation = None,
+        gen_row_mappers: bool = False
     ) -> None:
-        DotnetProcessRunner.create_sln(svc_util)
-        DotnetProcessRunner.create_db_service(svc_util)
-        DotnetProcessRunner.create_secret_manager(svc_util)
+        instrumentation = instrumentation or NULL_INSTRUMENTATION
+        with instrumentation.span("dotnet.create_sln"):
+            DotnetProcessRunner.create_sln(svc_util)
+        with instrumentation.span("dotnet.create_db_service"):
+            DotnetProcessRunner.create_db_service(svc_util)
+            if gen_row_mappers:
+                DotnetProcessRunner.add_package(
+                    svc_util.service_path, "Npgsql"
+                )
+        with instrumentation.span("dotnet.create_secret_manager"):
+            DotnetProcessRunner.create_secret_manager(svc_util)
 
         # Create directories
         dir_paths = [
@@ -35,6 +58,9 @@ class DotnetProcessRunner:
         if create_db_scripts_dir:
             dir_paths.append(svc_util.db_scripts_dir_path)
 
+        if gen_row_mappers:
+            dir_paths.append(svc_util.mappers_dir_path)
+
         for dir_path in dir_paths:
             os.makedirs(dir_path)
 
@@ -81,6 +107,28 @@ class DotnetProcessRunner:
             sln_full_name, proj_full_name
         )
 
+    @staticmethod
+    def create_benchmark_project(svc_util: CsharpServiceUtil) -> None:
+        # Create console app for the benchmarks
+        proj_path: str = svc_util.benchmark_dir_path
+        subprocess.run([
+            "dotnet", "new", "console", "-n", svc_util.benchmark_proj_name,
+            "-o", proj_path
+        ])
+
+        # Add console app to the solution and reference the db service
+        DotnetProcessRunner.add_proj_to_solution(
+            svc_util.sln_full_name, svc_util.benchmark_full_name
+        )
+        subprocess.run([
+            "dotnet", "add", svc_util.benchmark_full_name, "reference",
+            svc_util.proj_full_name
+        ])
+
+        # Add benchmark and postgres packages
+        DotnetProcessRunner.add_package(proj_path, "BenchmarkDotNet")
+        DotnetProcessRunner.add_package(proj_path, "Npgsql")
+
     @staticmethod
     def create_class_lib(proj_name: str, proj_dir: str) -> None:
         subprocess.run([
@@ -93,12 +141,60 @@ class DotnetProcessRunner:
             "dotnet", "sln", sln_full_name, "add", proj_full_name
         ])
 
+    @staticmethod
     def add_package(proj_path: str, package_name: str) -> None:
-        os.chdir(proj_path)
+        # Run inside the project dir without changing the process cwd so
+        # concurrent generations do not interfere with each other
         subprocess.run(
             ["dotnet", "add", "package", package_name],
             check=True,
-            text=True
+            text=True,
+            cwd=proj_path
+        )
+
+
+@dataclass
+class ServiceGenOptions:
+    # The generator options of `gen_services_from_file_content`, kept
+    # picklable so they reach the manifest worker processes
+    gen_benchmarks: bool = False
+    gen_telemetry: bool = False
+    gen_row_mappers: bool = False
+    gen_get_many: bool = False
+    gen_partial_updates: bool = False
+    gen_counts: bool = False
+    gen_batch_loaders: bool = False
+    eager_load_depth: int = 0
+    count_estimate_threshold: int = DEFAULT_COUNT_ESTIMATE_THRESHOLD
+
+
+@dataclass
+class ServiceManifestEntry:
+    file_path: str
+    sln_name: str
+    service_name: str
+
+
+@dataclass
+class ServiceGenResult:
+    service_name: str
+    output_path: str
+    elapsed_seconds: float
+    error: str = None
+
+
+@dataclass
+class BatchGenReport:
+    results: List[ServiceGenResult] = field(default_factory=list)
+
+    @property
+    def failed(self) -> List[ServiceGenResult]:
+        return [result for result in self.results if result.error]
+
+    def get_error_report(self) -> str:
+        return "\n".join(
+            f"{result.service_name}: {result.error}"
+            for result in self.failed
         )
 
 
@@ -111,7 +207,18 @@ class CsharpRestServiceGenerator:
         file_path: str,
         sql_gen: SqlCommandGenerator,
         db_type_mapper: TypeMapper,
-        db_script_gen: TableSqlGenerator
+        db_script_gen: TableSqlGenerator,
+        output_sink: OutputSink = None,
+        instrumentation: Instrumentation = None,
+        gen_benchmarks: bool = False,
+        gen_telemetry: bool = False,
+        gen_row_mappers: bool = False,
+        gen_get_many: bool = False,
+        gen_partial_updates: bool = False,
+        gen_counts: bool = False,
+        gen_batch_loaders: bool = False,
+        eager_load_depth: int = 0,
+        count_estimate_threshold: int = DEFAULT_COUNT_ESTIMATE_THRESHOLD
     ) -> None:
         file_content: str = read_file_content(file_path)
         CsharpRestServiceGenerator.gen_services_from_file_content(
@@ -121,7 +228,18 @@ class CsharpRestServiceGenerator:
             file_content=file_content,
             sql_gen=sql_gen,
             db_type_mapper=db_type_mapper,
-            db_script_gen=db_script_gen
+            db_script_gen=db_script_gen,
+            output_sink=output_sink,
+            instrumentation=instrumentation,
+            gen_benchmarks=gen_benchmarks,
+            gen_telemetry=gen_telemetry,
+            gen_row_mappers=gen_row_mappers,
+            gen_get_many=gen_get_many,
+            gen_partial_updates=gen_partial_updates,
+            gen_counts=gen_counts,
+            gen_batch_loaders=gen_batch_loaders,
+            eager_load_depth=eager_load_depth,
+            count_estimate_threshold=count_estimate_threshold
         )
 
     @staticmethod
@@ -132,8 +250,58 @@ class CsharpRestServiceGenerator:
         file_content: str,
         sql_gen: SqlCommandGenerator,
         db_type_mapper: TypeMapper,
-        db_script_gen: TableSqlGenerator
+        db_script_gen: TableSqlGenerator,
+        output_sink: OutputSink = None,
+        instrumentation: Instrumentation = None,
+        gen_benchmarks: bool = False,
+        gen_telemetry: bool = False,
+        gen_row_mappers: bool = False,
+        gen_get_many: bool = False,
+        gen_partial_updates: bool = False,
+        gen_counts: bool = False,
+        gen_batch_loaders: bool = False,
+        eager_load_depth: int = 0,
+        count_estimate_threshold: int = DEFAULT_COUNT_ESTIMATE_THRESHOLD
     ) -> None:
+        """ Generates the services defined by the json schema content.
+
+        Args:
+            output_sink (OutputSink, optional): Where the generated files are
+                written. Defaults to a `DirectoryOutputSink`. The dotnet
+                solution and projects are only scaffolded for file system
+                sinks; other sinks receive the generated sources only.
+            instrumentation (Instrumentation, optional): Receives a span for
+                every pipeline stage. Defaults to no instrumentation.
+            gen_benchmarks (bool, optional): Whether to add a BenchmarkDotNet
+                project for the generated repos to the solution. Defaults to
+                False.
+            gen_telemetry (bool, optional): Whether the generated DbService
+                records OpenTelemetry traces and metrics. Defaults to False.
+            gen_row_mappers (bool, optional): Whether the repos use
+                generated row mappers and Npgsql parameter binders instead
+                of Dapper. Defaults to False.
+            gen_get_many (bool, optional): Whether the repos read a set of
+                keys in one round trip with GetManyAsync. Defaults to False.
+            gen_partial_updates (bool, optional): Whether the repos write
+                only the columns set on a PatchParam with
+                UpdatePartialAsync. Defaults to False.
+            gen_counts (bool, optional): Whether the repos count the rows
+                of a list with CountAsync. Defaults to False.
+            gen_batch_loaders (bool, optional): Whether to generate repo
+                decorators that batch concurrent GetAsync calls into one
+                GetManyAsync query, which implies gen_get_many. Defaults to
+                False.
+            eager_load_depth (int, optional): How many levels of references
+                the generated GetWithRefsAsync joins. Defaults to 0, which
+                generates no eager loading.
+            count_estimate_threshold (int, optional): The estimated row
+                count from which an unfiltered CountAsync returns the
+                planner estimate instead of counting the table.
+        """
+        if output_sink is None:
+            output_sink = DirectoryOutputSink(output_path)
+        instrumentation = instrumentation or NULL_INSTRUMENTATION
+
         # Setup project
         svc_util = CsharpServiceUtil(
             output_path=output_path,
@@ -141,12 +309,29 @@ class CsharpRestServiceGenerator:
             service_name=service_name + "Dal",
             src="src"
         )
-        DotnetProcessRunner.setup_project(svc_util)
+        if output_sink.is_file_system:
+            with instrumentation.span("dotnet.setup_project"):
+                DotnetProcessRunner.setup_project(
+                    svc_util,
+                    instrumentation=instrumentation,
+                    gen_row_mappers=gen_row_mappers
+                )
+            if gen_benchmarks:
+                with instrumentation.span("dotnet.create_benchmark_project"):
+                    DotnetProcessRunner.create_benchmark_project(svc_util)
 
         # Parse Json Schema
-        parser = JsonSchemaParser()
+        parser = JsonSchemaParser(instrumentation=instrumentation)
         entities = parser.parse(file_content=file_content)
 
+        # Caching decorators are only generated for entities with a hint
+        if output_sink.is_file_system and any(
+            entity.cache for entity in entities
+        ):
+            DotnetProcessRunner.add_package(
+                svc_util.service_path, "Microsoft.Extensions.Caching.Memory"
+            )
+
         # Generate and write db service files
         svc_dir = CsharpServiceUtil(
             output_path=output_path,
@@ -159,25 +344,145 @@ class CsharpRestServiceGenerator:
             svc_dir=svc_dir,
             entities=entities,
             pl_type_mapper=CSharpTypeMapper(),
-            db_type_mapper=None,
-            sql_gen=sql_gen
+            db_type_mapper=db_type_mapper,
+            sql_gen=sql_gen,
+            instrumentation=instrumentation,
+            gen_telemetry=gen_telemetry,
+            gen_row_mappers=gen_row_mappers,
+            gen_get_many=gen_get_many,
+            gen_partial_updates=gen_partial_updates,
+            gen_counts=gen_counts,
+            gen_batch_loaders=gen_batch_loaders,
+            eager_load_depth=eager_load_depth,
+            count_estimate_threshold=count_estimate_threshold
         )
-        for file_data in service_gen.gen_service():
-            write_file_data(file_data)
+        with instrumentation.span("db_service.gen_service") as span:
+            span.item_count = _write_all(
+                output_sink, service_gen.gen_service(), instrumentation
+            )
 
-        # Write db scripts
-        db_scripts_data = db_script_gen.gen_db_scripts_file_data(
-            entities=entities,
-            type_mapper=db_type_mapper,
-            file_path=svc_dir.db_scripts_dir_path,
-            file_name=svc_dir.db_scripts_file_name
-        )
-        write_file_data(db_scripts_data)
+        # Write db scripts, the script is generated while it is written
+        with instrumentation.span("db_scripts.gen_db_scripts") as span:
+            db_scripts_data = db_script_gen.gen_db_scripts_file_data(
+                entities=entities,
+                type_mapper=db_type_mapper,
+                file_path=svc_dir.db_scripts_dir_path,
+                file_name=svc_dir.db_scripts_file_name
+            )
+            output_sink.write(db_scripts_data)
+            span.item_count = len(entities)
 
         # Generate and write secret manager files
         secret_mgr_gen = SecretManagerGen(
             service_name="SecretManager",
             svc_dir=svc_dir
         )
-        for file_data in secret_mgr_gen.gen_service():
-            write_file_data(file_data)
+        with instrumentation.span("secret_manager.gen_service") as span:
+            span.item_count = _write_all(
+                output_sink, secret_mgr_gen.gen_service(), instrumentation
+            )
+
+        # Generate and write benchmark project files
+        if gen_benchmarks:
+            benchmark_gen = BenchmarkProjectGen(
+                service_name=service_name,
+                svc_dir=svc_dir,
+                entities=entities,
+                pl_type_mapper=CSharpTypeMapper(),
+                db_type_mapper=db_type_mapper
+            )
+            with instrumentation.span("benchmarks.gen_service") as span:
+                span.item_count = _write_all(
+                    output_sink, benchmark_gen.gen_service(), instrumentation
+                )
+
+    @staticmethod
+    def gen_services_from_manifest(
+        output_path: str,
+        manifest: List[ServiceManifestEntry],
+        sql_gen: SqlCommandGenerator,
+        db_type_mapper: TypeMapper,
+        db_script_gen: TableSqlGenerator,
+        max_workers: int = None,
+        options: ServiceGenOptions = None
+    ) -> BatchGenReport:
+        """ Generates one service per manifest entry across a process pool.
+
+        Each service is written under its own `output_path/service_name`
+        root. Failures do not stop the batch; they are collected with the
+        per-service timings in the returned report.
+
+        Args:
+            max_workers (int, optional): Number of worker processes.
+                Defaults to the number of CPUs.
+            options (ServiceGenOptions, optional): The generator options
+                of every service. Defaults to the options of
+                `gen_services_from_file_content`.
+        """
+        options = options or ServiceGenOptions()
+        with ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count()
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _gen_manifest_entry,
+                    os.path.join(output_path, entry.service_name),
+                    entry,
+                    sql_gen,
+                    db_type_mapper,
+                    db_script_gen,
+                    options
+                )
+                for entry in manifest
+            ]
+            return BatchGenReport(
+                results=[future.result() for future in futures]
+            )
+
+
+def _write_all(
+    output_sink: OutputSink,
+    files_data: Iterable[FileData],
+    instrumentation: Instrumentation
+) -> int:
+    # Writes get their own spans so file I/O can be told apart from the
+    # generation time of the enclosing span
+    count: int = 0
+    for file_data in files_data:
+        with instrumentation.span("output.write"):
+            output_sink.write(file_data)
+        count += 1
+
+    return count
+
+
+def _gen_manifest_entry(
+    output_path: str,
+    entry: ServiceManifestEntry,
+    sql_gen: SqlCommandGenerator,
+    db_type_mapper: TypeMapper,
+    db_script_gen: TableSqlGenerator,
+    options: ServiceGenOptions
+) -> ServiceGenResult:
+    start = time.perf_counter()
+    error: str = None
+    try:
+        CsharpRestServiceGenerator.gen_services_from_file_path(
+            output_path=output_path,
+            sln_name=entry.sln_name,
+            service_name=entry.service_name,
+            file_path=entry.file_path,
+            sql_gen=sql_gen,
+            db_type_mapper=db_type_mapper,
+            db_script_gen=db_script_gen,
+            **asdict(options)
+        )
+    except Exception:
+        error = traceback.format_exc()
+
+    return ServiceGenResult(
+        service_name=entry.service_name,
+        output_path=output_path,
+        elapsed_seconds=time.perf_counter() - start,
+        error=error
+    )
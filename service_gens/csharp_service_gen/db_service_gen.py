@@ -1,14 +1,151 @@
-from typing import Generator, List
+from dataclasses import replace
+from typing import Dict, Generator, List, NamedTuple, Set, Tuple
 
 from data_type_mapper.data_type_mapper import TypeMapper
-from entity_parser.entity import Entity, FieldData
+from data_type_mapper.sql_type_mapper import PgSQLDataType, PgsqlTypeMapper
+from entity_parser.entity import Entity, EntityCache, FieldData
+from instrumentation.instrumentation import Instrumentation
 from service_gens.csharp_service_gen.utils import CsharpServiceUtil
 from service_gens.service_gen import CSharpDataType, ServiceGenerator
-from sql_generator.sql_generator import SqlCommandGenerator
-from utils.constants import TAB_4, TAB_8, TAB_12
+from sql_generator.sql_generator import (
+    SET_FLAG_SUFFIX, RefJoin, SqlCommandGenerator
+)
+from utils.constants import TAB_4, TAB_8, TAB_12, TAB_16
 from utils.utils import EntityFieldData, FileData
 
 
+# DbDataReader getters of the C# types that have one
+READER_GETTERS: Dict[str, str] = {
+    CSharpDataType.BOOLEAN.value: "GetBoolean",
+    CSharpDataType.CHAR.value: "GetChar",
+    CSharpDataType.DECIMAL.value: "GetDecimal",
+    CSharpDataType.DOUBLE.value: "GetDouble",
+    CSharpDataType.FLOAT.value: "GetFloat",
+    CSharpDataType.INT.value: "GetInt32",
+    CSharpDataType.LONG.value: "GetInt64",
+    CSharpDataType.SHORT.value: "GetInt16",
+    CSharpDataType.STRING.value: "GetString",
+    CSharpDataType.DATETIME.value: "GetDateTime",
+    CSharpDataType.GUID.value: "GetGuid",
+}
+# DbDataReader getters of the numeric column types mapped by
+# `PgsqlTypeMapper` and the C# type they return
+COLUMN_READER_GETTERS: Dict[str, Tuple[str, str]] = {
+    PgSQLDataType.SMALLINT.name: ("GetInt16", CSharpDataType.SHORT.value),
+    PgSQLDataType.INTEGER.name: ("GetInt32", CSharpDataType.INT.value),
+    PgSQLDataType.BIGINT.name: ("GetInt64", CSharpDataType.LONG.value),
+    PgSQLDataType.REAL.name: ("GetFloat", CSharpDataType.FLOAT.value),
+    PgSQLDataType.DOUBLE.name: ("GetDouble", CSharpDataType.DOUBLE.value),
+    PgSQLDataType.NUMERIC.name: ("GetDecimal", CSharpDataType.DECIMAL.value),
+}
+# C# types read with the getter of their numeric column and converted
+NUMERIC_TYPES: Set[str] = {
+    CSharpDataType.BYTE.value,
+    CSharpDataType.SBYTE.value,
+    CSharpDataType.SHORT.value,
+    CSharpDataType.USHORT.value,
+    CSharpDataType.INT.value,
+    CSharpDataType.UINT.value,
+    CSharpDataType.LONG.value,
+    CSharpDataType.ULONG.value,
+    CSharpDataType.FLOAT.value,
+    CSharpDataType.DOUBLE.value,
+    CSharpDataType.DECIMAL.value,
+}
+
+
+class ColumnDbType(NamedTuple):
+    npgsql_type: str
+    # None when the column has no `DbType` member
+    db_type: str
+    # The C# types Npgsql writes to the column without a conversion
+    clr_types: Set[str]
+
+
+# Parameter types of the column types mapped by `PgsqlTypeMapper`
+COLUMN_DB_TYPES: Dict[str, ColumnDbType] = {
+    PgSQLDataType.SMALLINT.name: ColumnDbType(
+        "Smallint", "Int16", {CSharpDataType.SHORT.value}
+    ),
+    PgSQLDataType.INTEGER.name: ColumnDbType(
+        "Integer", "Int32", {CSharpDataType.INT.value}
+    ),
+    PgSQLDataType.BIGINT.name: ColumnDbType(
+        "Bigint", "Int64", {CSharpDataType.LONG.value}
+    ),
+    PgSQLDataType.DOUBLE.name: ColumnDbType(
+        "Double", "Double", {CSharpDataType.DOUBLE.value}
+    ),
+    PgSQLDataType.REAL.name: ColumnDbType(
+        "Real", "Single", {CSharpDataType.FLOAT.value}
+    ),
+    PgSQLDataType.NUMERIC.name: ColumnDbType(
+        "Numeric", "Decimal", {CSharpDataType.DECIMAL.value}
+    ),
+    PgSQLDataType.BOOLEAN.name: ColumnDbType(
+        "Boolean", "Boolean", {CSharpDataType.BOOLEAN.value}
+    ),
+    PgSQLDataType.VARCHAR.name: ColumnDbType(
+        "Varchar",
+        "String",
+        {CSharpDataType.STRING.value, CSharpDataType.CHAR.value}
+    ),
+    PgSQLDataType.TEXT.name: ColumnDbType(
+        "Text",
+        "String",
+        {CSharpDataType.STRING.value, CSharpDataType.CHAR.value}
+    ),
+    PgSQLDataType.BYTEA.name: ColumnDbType("Bytea", "Binary", {"byte[]"}),
+    PgSQLDataType.DATE.name: ColumnDbType(
+        "Date", "Date", {CSharpDataType.DATETIME.value}
+    ),
+    PgSQLDataType.TIME.name: ColumnDbType(
+        "Time", "Time", {CSharpDataType.TIMESPAN.value}
+    ),
+    PgSQLDataType.TIMESTAMPTZ.name: ColumnDbType(
+        "TimestampTz",
+        "DateTimeOffset",
+        {CSharpDataType.DATETIMEOFFSET.value}
+    ),
+    PgSQLDataType.JSON.name: ColumnDbType(
+        "Json", None, {CSharpDataType.STRING.value}
+    ),
+    PgSQLDataType.JSONB.name: ColumnDbType(
+        "Jsonb", None, {CSharpDataType.STRING.value}
+    ),
+    PgSQLDataType.UUID.name: ColumnDbType(
+        "Uuid", "Guid", {CSharpDataType.GUID.value}
+    ),
+}
+# Postgres has no unsigned integers, these are bound as the signed type
+# that holds their range
+BIND_TYPES: Dict[str, str] = {
+    CSharpDataType.BYTE.value: CSharpDataType.SHORT.value,
+    CSharpDataType.SBYTE.value: CSharpDataType.SHORT.value,
+    CSharpDataType.USHORT.value: CSharpDataType.INT.value,
+    CSharpDataType.UINT.value: CSharpDataType.LONG.value,
+    CSharpDataType.ULONG.value: CSharpDataType.LONG.value,
+}
+
+
+# Parameters of the Dapper multi mapping query used by the joined reads
+MULTI_MAP_PARAMS: str = (
+    "Type[] types, Func<object[], T> map, string splitOn"
+)
+
+
+# Dapper repo methods building the typed parameters of each row mapper bind
+DAPPER_BINDERS: Dict[str, str] = {
+    "Bind": "GetParameters",
+    "BindGetParam": "GetKeyParameters",
+    "BindPatchParam": "GetPatchParameters",
+}
+
+
+# Tables estimated below this many rows are counted exactly
+DEFAULT_COUNT_ESTIMATE_THRESHOLD: int = 100_000
+
+
 class DbServiceGenerator(ServiceGenerator):
     def __init__(
         self,
@@ -17,16 +154,69 @@ class DbServiceGenerator(ServiceGenerator):
         entities: List[Entity],
         pl_type_mapper: TypeMapper,
         db_type_mapper: TypeMapper = None,
-        sql_gen: SqlCommandGenerator = None
+        sql_gen: SqlCommandGenerator = None,
+        instrumentation: Instrumentation = None,
+        gen_telemetry: bool = False,
+        gen_row_mappers: bool = False,
+        gen_get_many: bool = False,
+        gen_partial_updates: bool = False,
+        gen_counts: bool = False,
+        gen_batch_loaders: bool = False,
+        eager_load_depth: int = 0,
+        count_estimate_threshold: int = DEFAULT_COUNT_ESTIMATE_THRESHOLD
     ):
+        """
+        Args:
+            gen_telemetry (bool, optional): Whether the generated DbService
+                records an ActivitySource span, with the row count and the
+                error status, and a duration histogram for every query,
+                tagged with the entity and the operation. Defaults to False.
+            gen_row_mappers (bool, optional): Whether the repos read rows
+                and bind parameters with generated per-entity mappers
+                instead of Dapper, which keeps the generated code free of
+                reflection and usable with Native AOT. Defaults to False.
+            db_type_mapper (TypeMapper, optional): Maps the column types.
+                When given, the generated binders, or the Dapper repos'
+                DynamicParameters, type every parameter whose value the
+                column accepts with the db type and size of its column.
+            gen_get_many (bool, optional): Whether the repos of entities
+                with a primary key read a set of keys in one round trip with
+                GetManyAsync. Defaults to False.
+            gen_partial_updates (bool, optional): Whether the repos of
+                entities with a primary key write only the columns set on a
+                PatchParam with UpdatePartialAsync. Defaults to False.
+            gen_counts (bool, optional): Whether the repos count the rows of
+                a list with CountAsync. Defaults to False.
+            gen_batch_loaders (bool, optional): Whether to generate a
+                request-scoped repo decorator per entity that coalesces the
+                concurrent GetAsync calls into one GetManyAsync query,
+                which implies gen_get_many. Defaults to False.
+            eager_load_depth (int, optional): How many levels of references
+                the generated GetWithRefsAsync joins, reading an entity and
+                the entities it references in one round trip. Defaults to 0,
+                which generates no eager loading.
+            count_estimate_threshold (int, optional): The estimated row
+                count from which an unfiltered CountAsync returns the
+                planner estimate instead of counting the table. Only used
+                with gen_counts. Defaults to DEFAULT_COUNT_ESTIMATE_THRESHOLD.
+        """
         super().__init__(
             service_name=service_name,
             entities=entities,
             pl_type_mapper=pl_type_mapper,
-            db_type_mapper=db_type_mapper
+            db_type_mapper=db_type_mapper,
+            instrumentation=instrumentation
         )
         self.svc_dir = svc_dir
         self.sql_gen = sql_gen
+        self.gen_telemetry = gen_telemetry
+        self.gen_row_mappers = gen_row_mappers
+        self.gen_get_many = gen_get_many or gen_batch_loaders
+        self.gen_partial_updates = gen_partial_updates
+        self.gen_counts = gen_counts
+        self.gen_batch_loaders = gen_batch_loaders
+        self.eager_load_depth = eager_load_depth
+        self.count_estimate_threshold = count_estimate_threshold
 
     def gen_service(self) -> Generator[FileData, None, None]:
         # Generate DbService Interface
@@ -35,30 +225,57 @@ class DbServiceGenerator(ServiceGenerator):
         # Generate DbService class
         yield self._gen_db_service()
 
+        # Generate telemetry instruments used by the DbService
+        if self.gen_telemetry:
+            yield self._gen_db_telemetry()
+
         # Generate sql command interface
         yield self._gen_sql_command_interface()
 
         # Generate files for each entity
         for entity in self.entities:
-            ent_name: str = self.svc_dir.normalize_name(entity.name)
-
-            # Generate repo interface
-            yield self._gen_repo_interface(ent_name)
+            yield from self.gen_entity_service(entity)
 
+    def gen_entity_service(
+        self, entity: Entity
+    ) -> Generator[FileData, None, None]:
+        ent_name: str = self.svc_dir.normalize_name(entity.name)
+        with self.instrumentation.span("db_service.type_mapping"):
             entity_file_data = EntityFieldData.from_entity(
                 entity, self.pl_type_mapper
             )
-            self.sql_gen.update_entity(entity_file_data)
+        self.sql_gen.update_entity(entity_file_data)
 
-            # Generate db models
-            for model in self._gen_db_models(entity_file_data, ent_name):
-                yield model
+        # Generate repo interface
+        yield self._gen_repo_interface(ent_name, entity_file_data)
 
-            # Generate Sql Command class
-            yield self._gen_sql_command_service(ent_name)
+        # Generate db models
+        for model in self._gen_db_models(entity_file_data, ent_name):
+            yield model
 
-            # Generate repo class
-            yield self._gen_repo_service(ent_name)
+        # Generate row mapper
+        if self.gen_row_mappers:
+            yield self._gen_row_mapper(entity_file_data, ent_name)
+
+        # Generate Sql Command class
+        with self.instrumentation.span("db_service.sql_generation"):
+            sql_command_file_data = self._gen_sql_command_service(
+                ent_name, entity_file_data
+            )
+        yield sql_command_file_data
+
+        # Generate repo class
+        yield self._gen_repo_service(ent_name, entity_file_data)
+
+        # Generate caching decorator for the entities with a cache hint
+        if entity.cache and entity_file_data.pk_field_data:
+            yield self._gen_cached_repo(
+                entity_file_data, ent_name, entity.cache
+            )
+
+        # Generate batching decorator that coalesces single key reads
+        if self.gen_batch_loaders and entity_file_data.pk_field_data:
+            yield self._gen_batched_repo(entity_file_data, ent_name)
 
     # Db models section
     def _gen_db_models(
@@ -84,6 +301,97 @@ class DbServiceGenerator(ServiceGenerator):
             file_path=file_path
         )
 
+        if self.gen_partial_updates and entity.pk_field_data:
+            yield self._gen_patch_param_model(entity, ent_name)
+
+        if (joins := self._get_ref_joins(entity)):
+            yield self._gen_with_refs_model(ent_name, joins)
+
+        for name, field_data in self._get_projections(entity).items():
+            yield self._gen_db_model(
+                field_data=field_data,
+                class_name=self.svc_dir.get_projection_name(ent_name, name),
+                file_path=file_path
+            )
+
+    def _gen_patch_param_model(
+        self, entity: EntityFieldData, ent_name: str
+    ) -> FileData:
+        class_name: str = self.svc_dir.get_patch_param_name(ent_name)
+        file_content: List[str] = [
+            f"namespace {self.svc_dir.model_ns}",
+            "{",
+            f"{TAB_4}public class {class_name}",
+            f"{TAB_4}{{",
+        ]
+        file_content.extend(
+            f"{TAB_8}public {fld.data_type} "
+            f"{self.svc_dir.normalize_name(fld.name)} {{ get; set; }}"
+            f"{self._get_default_clause(fld)}"
+            for fld in entity.pk_field_data
+        )
+
+        # Setting a property flags its column as changed
+        for fld in entity.get_non_pk_field_data():
+            prop_name: str = self.svc_dir.normalize_name(fld.name)
+            field_name: str = self.svc_dir.get_var_name(prop_name)
+            flag_name: str = prop_name + SET_FLAG_SUFFIX
+            prop_type: str = f"{_get_type_name(fld.data_type)}?"
+            file_content.extend([
+                "",
+                f"{TAB_8}private {prop_type} {field_name};",
+                f"{TAB_8}public {prop_type} {prop_name}",
+                f"{TAB_8}{{",
+                f"{TAB_12}get => {field_name};",
+                f"{TAB_12}set {{ {field_name} = value; {flag_name} = true; }}",
+                f"{TAB_8}}}",
+                f"{TAB_8}public bool {flag_name} {{ get; private set; }}",
+            ])
+
+        file_content.extend([
+            f"{TAB_4}}}",
+            "}"
+        ])
+        return FileData(
+            file_path=self.svc_dir.models_dir_path,
+            file_name=self.svc_dir.get_file_name(class_name),
+            file_content=file_content
+        )
+
+    def _gen_with_refs_model(
+        self, ent_name: str, joins: List[RefJoin]
+    ) -> FileData:
+        class_name: str = self.svc_dir.get_with_refs_name(ent_name)
+        file_content: List[str] = [
+            f"namespace {self.svc_dir.model_ns}",
+            "{",
+            f"{TAB_4}public class {class_name}",
+            f"{TAB_4}{{",
+            f"{TAB_8}public {ent_name} {ent_name} {{ get; set; }} = default!;",
+        ]
+        for join in joins:
+            ref_name: str = self.svc_dir.normalize_name(join.entity.name)
+            prop_name: str = self._get_join_prop_name(join)
+            if join.is_required:
+                file_content.append(
+                    f"{TAB_8}public {ref_name} {prop_name} {{ get; set; }} "
+                    "= default!;"
+                )
+            else:
+                file_content.append(
+                    f"{TAB_8}public {ref_name}? {prop_name} {{ get; set; }}"
+                )
+
+        file_content.extend([
+            f"{TAB_4}}}",
+            "}"
+        ])
+        return FileData(
+            file_path=self.svc_dir.models_dir_path,
+            file_name=self.svc_dir.get_file_name(class_name),
+            file_content=file_content
+        )
+
     def _gen_db_model(
         self,
         field_data: List[FieldData],
@@ -145,13 +453,17 @@ class DbServiceGenerator(ServiceGenerator):
         return ""
 
     # Interfaces section
-    def _gen_repo_interface(self, ent_name: str) -> FileData:
+    def _gen_repo_interface(
+        self, ent_name: str, entity: EntityFieldData
+    ) -> FileData:
         get_param: str = self.svc_dir.get_get_param_name(ent_name)
         get_param_var: str = self.svc_dir.get_var_name(get_param)
         list_param: str = self.svc_dir.get_list_param_name(ent_name)
         list_param_var: str = self.svc_dir.get_var_name(list_param)
         interface_name: str = self.svc_dir.get_repo_interface_name(ent_name)
         ent_var_name: str = self.svc_dir.get_var_name(ent_name)
+        patch_param: str = self.svc_dir.get_patch_param_name(ent_name)
+        patch_param_var: str = self.svc_dir.get_var_name(patch_param)
         file_content = [
             f"using {self.svc_dir.model_ns};",
             "",
@@ -160,11 +472,56 @@ class DbServiceGenerator(ServiceGenerator):
             f"{TAB_4}public interface {interface_name}",
             f"{TAB_4}{{",
             f"{TAB_8}Task<{ent_name}?> GetAsync({get_param} {get_param_var});",
+            *(
+                [
+                    f"{TAB_8}Task<Dictionary<{self._get_key_type(entity)}, "
+                    f"{ent_name}>> GetManyAsync(IEnumerable<{get_param}> "
+                    f"{get_param_var}s);"
+                ]
+                if self.gen_get_many and entity.pk_field_data else []
+            ),
             f"{TAB_8}Task<IEnumerable<{ent_name}>> ListAsync"
             f"({list_param} {list_param_var});",
+            *(
+                [
+                    f"{TAB_8}Task<long> CountAsync"
+                    f"({list_param} {list_param_var});"
+                ]
+                if self.gen_counts else []
+            ),
             f"{TAB_8}Task<int> CreateAsync({ent_name} {ent_var_name});",
             f"{TAB_8}Task<int> UpdateAsync({ent_name} {ent_var_name});",
+            *(
+                [
+                    f"{TAB_8}Task<int> UpdatePartialAsync"
+                    f"({patch_param} {patch_param_var});"
+                ]
+                if self.gen_partial_updates and entity.pk_field_data else []
+            ),
             f"{TAB_8}Task<int> DeleteAsync({get_param} {get_param_var});",
+            *(
+                [
+                    f"{TAB_8}Task<{ent_name}WithRefs?> GetWithRefsAsync"
+                    f"({get_param} {get_param_var});"
+                ]
+                if self._get_ref_joins(entity) else []
+            ),
+            *(
+                f"{TAB_8}Task<IEnumerable<{ent_name}>> "
+                f"ListBy{self.svc_dir.normalize_name(fld.name)}Async"
+                f"(string {fld.name}, {list_param} {list_param_var});"
+                for fld in self._get_filterable_fields(entity)
+            ),
+            *(
+                line
+                for name in self._get_projections(entity)
+                for line in (
+                    f"{TAB_8}Task<{ent_name}{name}?> Get{name}Async"
+                    f"({get_param} {get_param_var});",
+                    f"{TAB_8}Task<IEnumerable<{ent_name}{name}>> "
+                    f"List{name}Async({list_param} {list_param_var});",
+                )
+            ),
             f"{TAB_4}}}",
             "}"
         ]
@@ -182,9 +539,24 @@ class DbServiceGenerator(ServiceGenerator):
             f"{TAB_4}public interface {class_name}",
             f"{TAB_4}{{",
             f"{TAB_8}string GetCommand {{ get; }}",
+            *(
+                [f"{TAB_8}string GetManyCommand {{ get; }}"]
+                if self.gen_get_many else []
+            ),
             f"{TAB_8}string ListCommand {{ get; }}",
+            *(
+                [
+                    f"{TAB_8}string CountCommand {{ get; }}",
+                    f"{TAB_8}string EstimateCountCommand {{ get; }}",
+                ]
+                if self.gen_counts else []
+            ),
             f"{TAB_8}string CreateCommand {{ get; }}",
             f"{TAB_8}string UpdateCommand {{ get; }}",
+            *(
+                [f"{TAB_8}string UpdatePartialCommand {{ get; }}"]
+                if self.gen_partial_updates else []
+            ),
             f"{TAB_8}string DeleteCommand {{ get; }}",
             f"{TAB_4}}}",
             "}"
@@ -197,17 +569,42 @@ class DbServiceGenerator(ServiceGenerator):
 
     def _gen_db_service_interface(self) -> FileData:
         class_name: str = self.svc_dir.db_service_interface_name
-        file_content = [
+        tags: str = self._get_telemetry_params()
+        if self.gen_row_mappers:
+            usings = ["using System.Data.Common;", "using Npgsql;", ""]
+            bind = "Action<NpgsqlParameterCollection> bind"
+            map_ = "Func<DbDataReader, T> map"
+            methods = [
+                f"{TAB_8}Task<int> ExecuteAsync(string sqlCommand, "
+                f"{bind}{tags});",
+                f"{TAB_8}Task<T?> GetAsync<T>(string sqlCommand, "
+                f"{bind}, {map_}{tags});",
+                f"{TAB_8}Task<IEnumerable<T>> ListAsync<T>(string sqlCommand, "
+                f"{bind}, {map_}{tags});",
+            ]
+        else:
+            usings = []
+            methods = [
+                f"{TAB_8}Task<int> ExecuteAsync(string sqlCommand, object? "
+                f"param{tags});",
+                f"{TAB_8}Task<T?> GetAsync<T>(string sqlCommand, object? "
+                f"param{tags});",
+                f"{TAB_8}Task<IEnumerable<T>> ListAsync<T>(string sqlCommand, "
+                f"object? param{tags});",
+            ]
+            if self.eager_load_depth:
+                methods.append(
+                    f"{TAB_8}Task<T?> GetAsync<T>(string sqlCommand, object? "
+                    f"param, {MULTI_MAP_PARAMS}{tags});"
+                )
+
+        file_content = usings + [
             f"namespace {self.svc_dir.interfaces_ns}",
             "",
             "{",
             f"{TAB_4}public interface {class_name}",
             f"{TAB_4}{{",
-            f"{TAB_8}Task<int> ExecuteAsync(string sqlCommand, object? "
-            "param);",
-            f"{TAB_8}Task<T?> GetAsync<T>(string sqlCommand, object? param);",
-            f"{TAB_8}Task<IEnumerable<T>> ListAsync<T>(string sqlCommand, "
-            "object? param);",
+            *methods,
             f"{TAB_4}}}",
             "}"
         ]
@@ -220,9 +617,13 @@ class DbServiceGenerator(ServiceGenerator):
     def _gen_db_service(self) -> FileData:
         interface_name: str = self.svc_dir.db_service_interface_name
         class_name: str = self.svc_dir.db_service_class_name
-        file_content = [
-            "using System.Data;",
-            "using Dapper;",
+        file_content = ["using System.Data;"]
+        if self.gen_row_mappers:
+            file_content.append("using System.Data.Common;")
+        if self.gen_telemetry:
+            file_content.append("using System.Diagnostics;")
+        file_content.extend([
+            "using Npgsql;" if self.gen_row_mappers else "using Dapper;",
             f"using {self.svc_dir.interfaces_ns};",
             "",
             f"namespace {self.svc_dir.db_service_ns}",
@@ -230,23 +631,220 @@ class DbServiceGenerator(ServiceGenerator):
             f"{TAB_4}public class {class_name}(IDbConnection conn) "
             f": {interface_name}",
             f"{TAB_4}{{",
-            f"{TAB_8}public async Task<int> ExecuteAsync(string sqlCommand"
-            ", object? param)",
+        ])
+        if self.gen_row_mappers:
+            file_content.extend(self._get_reader_db_service_methods())
+        else:
+            file_content.extend(self._get_dapper_db_service_methods())
+        file_content.extend([
+            f"{TAB_4}}}",
+            "}"
+        ])
+        return FileData(
+            file_path=self.svc_dir.db_services_dir_path,
+            file_name=self.svc_dir.get_file_name(class_name),
+            file_content=file_content
+        )
+
+    def _get_dapper_db_service_methods(self) -> List[str]:
+        tags: str = self._get_telemetry_params()
+        return [
+            *self._get_db_service_method(
+                f"public async Task<int> ExecuteAsync(string sqlCommand"
+                f", object? param{tags})",
+                [],
+                "await conn.ExecuteAsync(sqlCommand, param)",
+                "result"
+            ),
+            "",
+            *self._get_db_service_method(
+                f"public async Task<T?> GetAsync<T>"
+                f"(string sqlCommand, object? param{tags})",
+                [],
+                "await conn.QuerySingleOrDefaultAsync<T>(sqlCommand, param)",
+                "result is null ? 0 : 1"
+            ),
+            "",
+            *self._get_db_service_method(
+                f"public async Task<IEnumerable<T>> ListAsync<T>"
+                f"(string sqlCommand, object? param{tags})",
+                [],
+                "await conn.QueryAsync<T>(sqlCommand, param)",
+                "result.Count()"
+            ),
+            *(
+                [
+                    "",
+                    *self._get_db_service_method(
+                        f"public async Task<T?> GetAsync<T>(string "
+                        f"sqlCommand, object? param, {MULTI_MAP_PARAMS}"
+                        f"{tags})",
+                        [],
+                        "(await conn.QueryAsync(sqlCommand, types, map, "
+                        "param, splitOn: splitOn)).FirstOrDefault()",
+                        "result is null ? 0 : 1"
+                    ),
+                ]
+                if self.eager_load_depth else []
+            ),
+        ]
+
+    def _get_reader_db_service_methods(self) -> List[str]:
+        # Rows are read with the generated mappers, no runtime code
+        # generation or reflection is involved
+        tags: str = self._get_telemetry_params()
+        bind: str = "Action<NpgsqlParameterCollection> bind"
+        map_: str = "Func<DbDataReader, T> map"
+        create_command: str = (
+            "await using var command = await CreateCommandAsync"
+            "(sqlCommand, bind);"
+        )
+        return [
+            *self._get_db_service_method(
+                f"public async Task<int> ExecuteAsync(string sqlCommand, "
+                f"{bind}{tags})",
+                [create_command],
+                "await command.ExecuteNonQueryAsync()",
+                "result"
+            ),
+            "",
+            *self._get_db_service_method(
+                f"public async Task<T?> GetAsync<T>(string sqlCommand, "
+                f"{bind}, {map_}{tags})",
+                [
+                    create_command,
+                    "await using var reader = await command.ExecuteReaderAsync"
+                    "(CommandBehavior.SingleRow);",
+                ],
+                "await reader.ReadAsync() ? map(reader) : default",
+                "result is null ? 0 : 1"
+            ),
+            "",
+            *self._get_db_service_method(
+                f"public async Task<IEnumerable<T>> ListAsync<T>"
+                f"(string sqlCommand, {bind}, {map_}{tags})",
+                [
+                    create_command,
+                    "await using var reader = await command.ExecuteReaderAsync"
+                    "();",
+                ],
+                "await ReadAllAsync(reader, map)",
+                "result.Count"
+            ),
+            "",
+            f"{TAB_8}private async Task<NpgsqlCommand> CreateCommandAsync"
+            f"(string sqlCommand, {bind})",
             f"{TAB_8}{{",
-            f"{TAB_12}return await conn.ExecuteAsync(sqlCommand, param);",
+            f"{TAB_12}if (conn.State != ConnectionState.Open)",
+            f"{TAB_12}{{",
+            f"{TAB_16}await ((DbConnection)conn).OpenAsync();",
+            f"{TAB_12}}}",
+            "",
+            f"{TAB_12}var command = (NpgsqlCommand)conn.CreateCommand();",
+            f"{TAB_12}command.CommandText = sqlCommand;",
+            f"{TAB_12}bind(command.Parameters);",
+            f"{TAB_12}return command;",
             f"{TAB_8}}}",
             "",
-            f"{TAB_8}public async Task<T?> GetAsync<T>"
-            "(string sqlCommand, object? param)",
+            f"{TAB_8}private static async Task<List<T>> ReadAllAsync<T>"
+            f"(DbDataReader reader, {map_})",
             f"{TAB_8}{{",
-            f"{TAB_12}return await conn.QuerySingleOrDefaultAsync<T>"
-            "(sqlCommand, param);",
+            f"{TAB_12}var rows = new List<T>();",
+            f"{TAB_12}while (await reader.ReadAsync())",
+            f"{TAB_12}{{",
+            f"{TAB_16}rows.Add(map(reader));",
+            f"{TAB_12}}}",
+            f"{TAB_12}return rows;",
             f"{TAB_8}}}",
+        ]
+
+    def _get_db_service_method(
+        self,
+        signature: str,
+        statements: List[str],
+        result_expr: str,
+        row_count_expr: str
+    ) -> List[str]:
+        telemetry: str = self.svc_dir.db_telemetry_class_name
+        method_content = [f"{TAB_8}{signature}", f"{TAB_8}{{"]
+        if not self.gen_telemetry:
+            method_content.extend(
+                f"{TAB_12}{statement}" for statement in statements
+            )
+            method_content.append(f"{TAB_12}return {result_expr};")
+            method_content.append(f"{TAB_8}}}")
+            return method_content
+
+        # Failed queries mark the activity as failed and are timed too
+        method_content.extend([
+            f"{TAB_12}using var activity = {telemetry}.StartActivity"
+            "(entity, operation);",
+            f"{TAB_12}var start = Stopwatch.GetTimestamp();",
+            f"{TAB_12}try",
+            f"{TAB_12}{{",
+        ])
+        method_content.extend(
+            f"{TAB_16}{statement}" for statement in statements
+        )
+        method_content.extend([
+            f"{TAB_16}var result = {result_expr};",
+            f'{TAB_16}activity?.SetTag("db.rows", {row_count_expr});',
+            f"{TAB_16}return result;",
+            f"{TAB_12}}}",
+            f"{TAB_12}catch (Exception ex)",
+            f"{TAB_12}{{",
+            f"{TAB_16}activity?.SetStatus"
+            "(ActivityStatusCode.Error, ex.Message);",
+            f"{TAB_16}throw;",
+            f"{TAB_12}}}",
+            f"{TAB_12}finally",
+            f"{TAB_12}{{",
+            f"{TAB_16}{telemetry}.Record(start, entity, operation);",
+            f"{TAB_12}}}",
+            f"{TAB_8}}}",
+        ])
+        return method_content
+
+    def _gen_db_telemetry(self) -> FileData:
+        class_name: str = self.svc_dir.db_telemetry_class_name
+        file_content = [
+            "using System.Diagnostics;",
+            "using System.Diagnostics.Metrics;",
+            "",
+            f"namespace {self.svc_dir.db_service_ns}",
+            "{",
+            f"{TAB_4}public static class {class_name}",
+            f"{TAB_4}{{",
+            f'{TAB_8}public const string SourceName = '
+            f'"{self.svc_dir.service_name}";',
+            "",
+            f"{TAB_8}public static readonly ActivitySource ActivitySource = "
+            "new(SourceName);",
+            f"{TAB_8}public static readonly Meter Meter = new(SourceName);",
+            f"{TAB_8}public static readonly Histogram<double> Duration = "
+            "Meter.CreateHistogram<double>(",
+            f'{TAB_12}"db.client.operation.duration", "ms", '
+            '"Duration of the DbService queries");',
             "",
-            f"{TAB_8}public async Task<IEnumerable<T>> ListAsync<T>"
-            "(string sqlCommand, object? param)",
+            f"{TAB_8}public static Activity? StartActivity"
+            "(string? entity, string? operation)",
             f"{TAB_8}{{",
-            f"{TAB_12}return await conn.QueryAsync<T>(sqlCommand, param);",
+            f"{TAB_12}var activity = ActivitySource.StartActivity(",
+            f'{TAB_16}$"{{entity}} {{operation}}", ActivityKind.Client);',
+            f'{TAB_12}activity?.SetTag("db.system", "postgresql");',
+            f'{TAB_12}activity?.SetTag("db.entity", entity);',
+            f'{TAB_12}activity?.SetTag("db.operation", operation);',
+            f"{TAB_12}return activity;",
+            f"{TAB_8}}}",
+            "",
+            f"{TAB_8}public static void Record"
+            "(long start, string? entity, string? operation)",
+            f"{TAB_8}{{",
+            f"{TAB_12}Duration.Record(",
+            f"{TAB_16}Stopwatch.GetElapsedTime(start).TotalMilliseconds,",
+            f'{TAB_16}new KeyValuePair<string, object?>("db.entity", entity),',
+            f"{TAB_16}new KeyValuePair<string, object?>"
+            '("db.operation", operation));',
             f"{TAB_8}}}",
             f"{TAB_4}}}",
             "}"
@@ -257,8 +855,20 @@ class DbServiceGenerator(ServiceGenerator):
             file_content=file_content
         )
 
+    def _get_telemetry_params(self) -> str:
+        if not self.gen_telemetry:
+            return ""
+        return ", string? entity = null, string? operation = null"
+
+    def _get_telemetry_args(self, class_name: str, operation: str) -> str:
+        if not self.gen_telemetry:
+            return ""
+        return f', "{class_name}", "{operation}"'
+
     # Repos
-    def _gen_repo_service(self, class_name: str) -> FileData:
+    def _gen_repo_service(
+        self, class_name: str, entity: EntityFieldData
+    ) -> FileData:
         i_db_service: str = self.svc_dir.db_service_interface_name
         db_service: str = self.svc_dir.get_var_name(
             self.svc_dir.db_service_class_name
@@ -270,49 +880,93 @@ class DbServiceGenerator(ServiceGenerator):
         list_param_var: str = self.svc_dir.get_var_name(class_name)
         class_name_var: str = self.svc_dir.get_var_name(class_name)
         repo_name: str = self.svc_dir.get_repo_name(class_name)
+        get_args: str = self._get_repo_call_args(
+            class_name, "get", get_param_var, "BindGetParam", map_rows=True
+        )
+        list_args: str = self._get_repo_call_args(
+            class_name, "list", list_param_var, "BindListParam", map_rows=True
+        )
+        create_args: str = self._get_repo_call_args(
+            class_name, "create", class_name_var, "Bind"
+        )
+        update_args: str = self._get_repo_call_args(
+            class_name, "update", class_name_var, "Bind"
+        )
+        delete_args: str = self._get_repo_call_args(
+            class_name, "delete", get_param_var, "BindGetParam"
+        )
         file_content = [
+            *(
+                ["using System.Data;", "using Dapper;"]
+                if self._has_dapper_binders() else []
+            ),
             f"using {self.svc_dir.interfaces_ns};",
+            *(
+                [f"using {self.svc_dir.mappers_ns};"]
+                if self.gen_row_mappers else []
+            ),
             f"using {self.svc_dir.model_ns};",
+            *(
+                [f"using {self.svc_dir.sql_cmd_ns};"]
+                if self._get_projections(entity)
+                or self._get_ref_joins(entity)
+                or self._get_filterable_fields(entity) else []
+            ),
             "",
             f"namespace {self.svc_dir.repos_ns}",
             "{",
             f"{TAB_4}public class {repo_name}({i_db_service} {db_service}, "
             f"ISqlCommand sqlCommand) : {i_class_name}",
             f"{TAB_4}{{",
+            *(
+                [
+                    f"{TAB_8}private const long EstimateCountThreshold = "
+                    f"{self.count_estimate_threshold};",
+                    "",
+                ]
+                if self.gen_counts else []
+            ),
             f"{TAB_8}public async Task<{class_name}?> GetAsync"
             f"({get_param} {get_param_var})",
             f"{TAB_8}{{",
             f"{TAB_12}return await {db_service}.GetAsync<{class_name}>"
-            f"(sqlCommand.GetCommand, {get_param_var});",
+            f"(sqlCommand.GetCommand, {get_args});",
             f"{TAB_8}}}",
             "",
+            *self._get_repo_get_many_method(class_name, entity),
             f"{TAB_8} public async Task<IEnumerable<{class_name}>> "
             f"ListAsync({list_param} {list_param_var})",
             f"{TAB_8}{{",
             f"{TAB_12}return await dbService.ListAsync<{class_name}>"
-            f"(sqlCommand.ListCommand, {list_param_var});",
+            f"(sqlCommand.ListCommand, {list_args});",
             f"{TAB_8}}}",
             "",
+            *self._get_repo_count_method(class_name, entity),
             f"{TAB_8}public async Task<int> CreateAsync"
             f"({class_name} {class_name_var})",
             f"{TAB_8}{{",
             f"{TAB_12}return await dbService.ExecuteAsync"
-            f"(sqlCommand.CreateCommand, {class_name_var});",
+            f"(sqlCommand.CreateCommand, {create_args});",
             f"{TAB_8}}}",
             "",
             f"{TAB_8}public async Task<int> UpdateAsync"
             f"({class_name} {class_name_var})",
             f"{TAB_8}{{",
             f"{TAB_12}return await dbService.ExecuteAsync"
-            f"(sqlCommand.UpdateCommand, {class_name_var});",
+            f"(sqlCommand.UpdateCommand, {update_args});",
             f"{TAB_8}}}",
             "",
+            *self._get_repo_update_partial_method(class_name, entity),
             f"{TAB_8}public async Task<int> DeleteAsync"
             f"({get_param} {get_param_var})",
             f"{TAB_8}{{",
             f"{TAB_12}return await dbService.ExecuteAsync"
-            f"(sqlCommand.DeleteCommand, {get_param_var});",
+            f"(sqlCommand.DeleteCommand, {delete_args});",
             f"{TAB_8}}}",
+            *self._get_repo_with_refs_method(class_name, entity),
+            *self._get_repo_containment_methods(class_name, entity),
+            *self._get_repo_projection_methods(class_name, entity),
+            *self._get_dapper_binders(class_name, entity),
             f"{TAB_4}}}",
             "}"
         ]
@@ -322,8 +976,1176 @@ class DbServiceGenerator(ServiceGenerator):
             file_content=file_content
         )
 
+    def _gen_cached_repo(
+        self, entity: EntityFieldData, ent_name: str, cache: EntityCache
+    ) -> FileData:
+        class_name: str = self.svc_dir.get_cached_repo_name(ent_name)
+        i_repo: str = self.svc_dir.get_repo_interface_name(ent_name)
+        get_param: str = self.svc_dir.get_get_param_name(ent_name)
+        get_param_var: str = self.svc_dir.get_var_name(get_param)
+        list_param: str = self.svc_dir.get_list_param_name(ent_name)
+        list_param_var: str = self.svc_dir.get_var_name(ent_name)
+        ent_var: str = self.svc_dir.get_var_name(ent_name)
+        pk_names: List[str] = [
+            self.svc_dir.normalize_name(fld.name)
+            for fld in entity.pk_field_data
+        ]
+        pk_types: List[str] = [
+            _get_type_name(fld.data_type) for fld in entity.pk_field_data
+        ]
+        key_types: str = ", ".join(["string"] + pk_types)
+        key_params: str = ", ".join(
+            f"{pk_type} {self.svc_dir.get_var_name(name)}"
+            for pk_type, name in zip(pk_types, pk_names)
+        )
+        get_key_args: str = self._get_key_args(get_param_var, pk_names)
+        ent_key_args: str = self._get_key_args(ent_var, pk_names)
+        patch_param: str = self.svc_dir.get_patch_param_name(ent_name)
+        patch_param_var: str = self.svc_dir.get_var_name(patch_param)
+        patch_key_args: str = self._get_key_args(patch_param_var, pk_names)
+        key_values: str = ", ".join(
+            [f'"{ent_name}"'] + [
+                self.svc_dir.get_var_name(name) for name in pk_names
+            ]
+        )
+        file_content = [
+            "using Microsoft.Extensions.Caching.Memory;",
+            f"using {self.svc_dir.interfaces_ns};",
+            f"using {self.svc_dir.model_ns};",
+            "",
+            f"namespace {self.svc_dir.repos_ns}",
+            "{",
+            f"{TAB_4}public class {class_name}({i_repo} repo, "
+            f"IMemoryCache cache, TimeSpan? ttl = null) : {i_repo}",
+            f"{TAB_4}{{",
+            f"{TAB_8}public static readonly TimeSpan DefaultTtl = "
+            f"TimeSpan.FromSeconds({cache.ttl_seconds});",
+            f"{TAB_8}public const long DefaultSizeLimit = "
+            f"{cache.size_limit};",
+            "",
+            f"{TAB_8}// Entries have a size of one, so the size limit of the "
+            "cache caps the number of cached rows",
+            f"{TAB_8}private readonly MemoryCacheEntryOptions entryOptions = "
+            "new()",
+            f"{TAB_8}{{",
+            f"{TAB_12}AbsoluteExpirationRelativeToNow = ttl ?? DefaultTtl,",
+            f"{TAB_12}Size = 1,",
+            f"{TAB_8}}};",
+            "",
+            f"{TAB_8}public static IMemoryCache CreateCache"
+            "(long sizeLimit = DefaultSizeLimit)",
+            f"{TAB_8}{{",
+            f"{TAB_12}return new MemoryCache(new MemoryCacheOptions "
+            "{ SizeLimit = sizeLimit });",
+            f"{TAB_8}}}",
+            "",
+            f"{TAB_8}public async Task<{ent_name}?> GetAsync"
+            f"({get_param} {get_param_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}var key = GetKey({get_key_args});",
+            f"{TAB_12}if (cache.TryGetValue(key, out {ent_name}? {ent_var}))",
+            f"{TAB_12}{{",
+            f"{TAB_16}return {ent_var};",
+            f"{TAB_12}}}",
+            "",
+            f"{TAB_12}{ent_var} = await repo.GetAsync({get_param_var});",
+            f"{TAB_12}if ({ent_var} is not null)",
+            f"{TAB_12}{{",
+            f"{TAB_16}cache.Set(key, {ent_var}, entryOptions);",
+            f"{TAB_12}}}",
+            f"{TAB_12}return {ent_var};",
+            f"{TAB_8}}}",
+            "",
+            *self._get_cached_get_many_method(entity, ent_name),
+            f"{TAB_8}public Task<IEnumerable<{ent_name}>> ListAsync"
+            f"({list_param} {list_param_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}return repo.ListAsync({list_param_var});",
+            f"{TAB_8}}}",
+            "",
+            *self._get_decorated_count_method(list_param, list_param_var),
+            f"{TAB_8}public Task<int> CreateAsync({ent_name} {ent_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}return repo.CreateAsync({ent_var});",
+            f"{TAB_8}}}",
+            "",
+            f"{TAB_8}public async Task<int> UpdateAsync({ent_name} {ent_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}var rows = await repo.UpdateAsync({ent_var});",
+            f"{TAB_12}cache.Remove(GetKey({ent_key_args}));",
+            f"{TAB_12}return rows;",
+            f"{TAB_8}}}",
+            "",
+            *(
+                [
+                    f"{TAB_8}public async Task<int> UpdatePartialAsync"
+                    f"({patch_param} {patch_param_var})",
+                    f"{TAB_8}{{",
+                    f"{TAB_12}var rows = await repo.UpdatePartialAsync"
+                    f"({patch_param_var});",
+                    f"{TAB_12}cache.Remove(GetKey({patch_key_args}));",
+                    f"{TAB_12}return rows;",
+                    f"{TAB_8}}}",
+                    "",
+                ]
+                if self.gen_partial_updates else []
+            ),
+            f"{TAB_8}public async Task<int> DeleteAsync"
+            f"({get_param} {get_param_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}var rows = await repo.DeleteAsync({get_param_var});",
+            f"{TAB_12}cache.Remove(GetKey({get_key_args}));",
+            f"{TAB_12}return rows;",
+            f"{TAB_8}}}",
+            "",
+            *self._get_decorated_read_methods(ent_name, entity),
+            f"{TAB_8}private static ({key_types}) GetKey({key_params})",
+            f"{TAB_8}{{",
+            f"{TAB_12}return ({key_values});",
+            f"{TAB_8}}}",
+            f"{TAB_4}}}",
+            "}"
+        ]
+        return FileData(
+            file_path=self.svc_dir.repos_dir_path,
+            file_name=self.svc_dir.get_file_name(class_name),
+            file_content=file_content
+        )
+
+    def _get_decorated_count_method(
+        self, list_param: str, list_param_var: str
+    ) -> List[str]:
+        if not self.gen_counts:
+            return []
+
+        return [
+            f"{TAB_8}public Task<long> CountAsync"
+            f"({list_param} {list_param_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}return repo.CountAsync({list_param_var});",
+            f"{TAB_8}}}",
+            "",
+        ]
+
+    def _get_cached_get_many_method(
+        self, entity: EntityFieldData, ent_name: str
+    ) -> List[str]:
+        if not self.gen_get_many:
+            return []
+
+        # Only the keys missing from the cache are read from the repo
+        get_param: str = self.svc_dir.get_get_param_name(ent_name)
+        get_param_var: str = self.svc_dir.get_var_name(get_param)
+        pk_names: List[str] = [
+            self.svc_dir.normalize_name(fld.name)
+            for fld in entity.pk_field_data
+        ]
+        param_key_args: str = self._get_key_args("getParam", pk_names)
+        row_key_args: str = self._get_key_args("row", pk_names)
+        row_key_type: str = self._get_key_type(entity)
+        param_row_key: str = self._get_key_expression(entity, "getParam")
+        return [
+            f"{TAB_8}public async Task<Dictionary<{row_key_type}, {ent_name}>>"
+            f" GetManyAsync(IEnumerable<{get_param}> {get_param_var}s)",
+            f"{TAB_8}{{",
+            f"{TAB_12}var rows = new Dictionary"
+            f"<{row_key_type}, {ent_name}>();",
+            f"{TAB_12}var missing = new List<{get_param}>();",
+            f"{TAB_12}foreach (var getParam in {get_param_var}s)",
+            f"{TAB_12}{{",
+            f"{TAB_16}if (cache.TryGetValue(GetKey({param_key_args}), "
+            f"out {ent_name}? row) && row is not null)",
+            f"{TAB_16}{{",
+            f"{TAB_16}{TAB_4}rows[{param_row_key}] = row;",
+            f"{TAB_16}}}",
+            f"{TAB_16}else",
+            f"{TAB_16}{{",
+            f"{TAB_16}{TAB_4}missing.Add(getParam);",
+            f"{TAB_16}}}",
+            f"{TAB_12}}}",
+            "",
+            f"{TAB_12}if (missing.Count > 0)",
+            f"{TAB_12}{{",
+            f"{TAB_16}foreach (var (key, row) in await repo.GetManyAsync"
+            "(missing))",
+            f"{TAB_16}{{",
+            f"{TAB_16}{TAB_4}cache.Set(GetKey({row_key_args}), row, "
+            "entryOptions);",
+            f"{TAB_16}{TAB_4}rows[key] = row;",
+            f"{TAB_16}}}",
+            f"{TAB_12}}}",
+            f"{TAB_12}return rows;",
+            f"{TAB_8}}}",
+            "",
+        ]
+
+    def _gen_batched_repo(
+        self, entity: EntityFieldData, ent_name: str
+    ) -> FileData:
+        class_name: str = self.svc_dir.get_batched_repo_name(ent_name)
+        i_repo: str = self.svc_dir.get_repo_interface_name(ent_name)
+        get_param: str = self.svc_dir.get_get_param_name(ent_name)
+        get_param_var: str = self.svc_dir.get_var_name(get_param)
+        list_param: str = self.svc_dir.get_list_param_name(ent_name)
+        list_param_var: str = self.svc_dir.get_var_name(ent_name)
+        ent_var: str = self.svc_dir.get_var_name(ent_name)
+        key_type: str = self._get_key_type(entity)
+        source_type: str = f"TaskCompletionSource<{ent_name}?>"
+        batch_type: str = (
+            f"Dictionary<{key_type}, ({get_param} Param, "
+            f"{source_type} Source)>"
+        )
+        param_key: str = self._get_key_expression(entity, get_param_var)
+        patch_param: str = self.svc_dir.get_patch_param_name(ent_name)
+        patch_param_var: str = self.svc_dir.get_var_name(patch_param)
+        file_content = [
+            f"using {self.svc_dir.interfaces_ns};",
+            f"using {self.svc_dir.model_ns};",
+            "",
+            f"namespace {self.svc_dir.repos_ns}",
+            "{",
+            f"{TAB_4}// Register one instance per request, the GetAsync calls "
+            "issued through it in the same tick share a GetManyAsync query",
+            f"{TAB_4}public class {class_name}({i_repo} repo) : {i_repo}",
+            f"{TAB_4}{{",
+            f"{TAB_8}private readonly object gate = new();",
+            f"{TAB_8}private {batch_type} pending = new();",
+            "",
+            f"{TAB_8}public Task<{ent_name}?> GetAsync"
+            f"({get_param} {get_param_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}var key = {param_key};",
+            f"{TAB_12}lock (gate)",
+            f"{TAB_12}{{",
+            f"{TAB_16}if (pending.TryGetValue(key, out var item))",
+            f"{TAB_16}{{",
+            f"{TAB_16}{TAB_4}return item.Source.Task;",
+            f"{TAB_16}}}",
+            "",
+            f"{TAB_16}if (pending.Count == 0)",
+            f"{TAB_16}{{",
+            f"{TAB_16}{TAB_4}_ = DispatchAsync();",
+            f"{TAB_16}}}",
+            f"{TAB_16}var source = new {source_type}"
+            "(TaskCreationOptions.RunContinuationsAsynchronously);",
+            f"{TAB_16}pending[key] = ({get_param_var}, source);",
+            f"{TAB_16}return source.Task;",
+            f"{TAB_12}}}",
+            f"{TAB_8}}}",
+            "",
+            f"{TAB_8}public Task<Dictionary<{key_type}, {ent_name}>> "
+            f"GetManyAsync(IEnumerable<{get_param}> {get_param_var}s)",
+            f"{TAB_8}{{",
+            f"{TAB_12}return repo.GetManyAsync({get_param_var}s);",
+            f"{TAB_8}}}",
+            "",
+            f"{TAB_8}public Task<IEnumerable<{ent_name}>> ListAsync"
+            f"({list_param} {list_param_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}return repo.ListAsync({list_param_var});",
+            f"{TAB_8}}}",
+            "",
+            *self._get_decorated_count_method(list_param, list_param_var),
+            f"{TAB_8}public Task<int> CreateAsync({ent_name} {ent_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}return repo.CreateAsync({ent_var});",
+            f"{TAB_8}}}",
+            "",
+            f"{TAB_8}public Task<int> UpdateAsync({ent_name} {ent_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}return repo.UpdateAsync({ent_var});",
+            f"{TAB_8}}}",
+            "",
+            *(
+                [
+                    f"{TAB_8}public Task<int> UpdatePartialAsync"
+                    f"({patch_param} {patch_param_var})",
+                    f"{TAB_8}{{",
+                    f"{TAB_12}return repo.UpdatePartialAsync"
+                    f"({patch_param_var});",
+                    f"{TAB_8}}}",
+                    "",
+                ]
+                if self.gen_partial_updates else []
+            ),
+            f"{TAB_8}public Task<int> DeleteAsync"
+            f"({get_param} {get_param_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}return repo.DeleteAsync({get_param_var});",
+            f"{TAB_8}}}",
+            "",
+            *self._get_decorated_read_methods(ent_name, entity),
+            f"{TAB_8}private async Task DispatchAsync()",
+            f"{TAB_8}{{",
+            f"{TAB_12}// The calls issued before this continuation runs join "
+            "the batch",
+            f"{TAB_12}await Task.Yield();",
+            f"{TAB_12}{batch_type} batch;",
+            f"{TAB_12}lock (gate)",
+            f"{TAB_12}{{",
+            f"{TAB_16}batch = pending;",
+            f"{TAB_16}pending = new();",
+            f"{TAB_12}}}",
+            "",
+            f"{TAB_12}try",
+            f"{TAB_12}{{",
+            f"{TAB_16}var rows = await repo.GetManyAsync"
+            "(batch.Values.Select(item => item.Param));",
+            f"{TAB_16}foreach (var (key, item) in batch)",
+            f"{TAB_16}{{",
+            f"{TAB_16}{TAB_4}item.Source.TrySetResult"
+            "(rows.GetValueOrDefault(key));",
+            f"{TAB_16}}}",
+            f"{TAB_12}}}",
+            f"{TAB_12}catch (Exception exception)",
+            f"{TAB_12}{{",
+            f"{TAB_16}foreach (var item in batch.Values)",
+            f"{TAB_16}{{",
+            f"{TAB_16}{TAB_4}item.Source.TrySetException(exception);",
+            f"{TAB_16}}}",
+            f"{TAB_12}}}",
+            f"{TAB_8}}}",
+            f"{TAB_4}}}",
+            "}"
+        ]
+        return FileData(
+            file_path=self.svc_dir.repos_dir_path,
+            file_name=self.svc_dir.get_file_name(class_name),
+            file_content=file_content
+        )
+
+    def _get_key_args(self, var_name: str, pk_names: List[str]) -> str:
+        return ", ".join(f"{var_name}.{name}" for name in pk_names)
+
+    def _get_repo_get_many_method(
+        self, class_name: str, entity: EntityFieldData
+    ) -> List[str]:
+        if not self.gen_get_many or not entity.pk_field_data:
+            return []
+
+        get_param: str = self.svc_dir.get_get_param_name(class_name)
+        get_params_var: str = f"{self.svc_dir.get_var_name(get_param)}s"
+        key_type: str = self._get_key_type(entity)
+        method_content = [
+            f"{TAB_8}public async Task<Dictionary<{key_type}, {class_name}>> "
+            f"GetManyAsync(IEnumerable<{get_param}> {get_params_var})",
+            f"{TAB_8}{{",
+        ]
+        if self.gen_row_mappers:
+            args = self._get_repo_call_args(
+                class_name,
+                "get_many",
+                get_params_var,
+                "BindGetManyParam",
+                map_rows=True
+            )
+        else:
+            # Dapper sends the key arrays as postgres arrays
+            method_content.extend([
+                f"{TAB_12}var param = new",
+                f"{TAB_12}{{",
+                *(
+                    f"{TAB_16}{fld.name}s = {get_params_var}.Select(getParam "
+                    f"=> getParam.{self.svc_dir.normalize_name(fld.name)})"
+                    ".ToArray(),"
+                    for fld in entity.pk_field_data
+                ),
+                f"{TAB_12}}};",
+            ])
+            args = "param" + self._get_telemetry_args(class_name, "get_many")
+
+        method_content.extend([
+            f"{TAB_12}var rows = await dbService.ListAsync<{class_name}>"
+            f"(sqlCommand.GetManyCommand, {args});",
+            f"{TAB_12}return rows.ToDictionary(row => "
+            f"{self._get_key_expression(entity, 'row')});",
+            f"{TAB_8}}}",
+            "",
+        ])
+        return method_content
+
+    def _get_repo_count_method(
+        self, class_name: str, entity: EntityFieldData
+    ) -> List[str]:
+        if not self.gen_counts:
+            return []
+
+        list_param: str = self.svc_dir.get_list_param_name(class_name)
+        list_param_var: str = self.svc_dir.get_var_name(class_name)
+        count_args: str = list_param_var
+        estimate_args: str = "null"
+        if self.gen_row_mappers:
+            mapper: str = self.svc_dir.get_row_mapper_name(class_name)
+            read_count = ", reader => reader.GetInt64(0)"
+            count_args = (
+                f"parameters => {mapper}.BindListParam"
+                f"(parameters, {list_param_var}){read_count}"
+            )
+            estimate_args = "parameters => { }" + read_count
+
+        count_args += self._get_telemetry_args(class_name, "count")
+        estimate_args += self._get_telemetry_args(class_name, "estimate_count")
+        # Only lists without key filters page through the whole table
+        indent: str = TAB_16 if entity.pk_field_data else TAB_12
+        estimate_content: List[str] = [
+            f"{indent}var estimate = await dbService.GetAsync<long>"
+            f"(sqlCommand.EstimateCountCommand, {estimate_args});",
+            f"{indent}if (estimate >= EstimateCountThreshold)",
+            f"{indent}{{",
+            f"{indent}{TAB_4}return estimate;",
+            f"{indent}}}",
+        ]
+        if entity.pk_field_data:
+            is_unfiltered: str = " && ".join(
+                f"{list_param_var}.{self.svc_dir.normalize_name(fld.name)}s"
+                "?.Any() != true"
+                for fld in entity.pk_field_data
+            )
+            estimate_content = [
+                f"{TAB_12}if ({is_unfiltered})",
+                f"{TAB_12}{{",
+                *estimate_content,
+                f"{TAB_12}}}",
+            ]
+
+        return [
+            f"{TAB_8}public async Task<long> CountAsync"
+            f"({list_param} {list_param_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}// Counts of large tables are estimated from the "
+            "planner statistics",
+            *estimate_content,
+            "",
+            f"{TAB_12}return await dbService.GetAsync<long>"
+            f"(sqlCommand.CountCommand, {count_args});",
+            f"{TAB_8}}}",
+            "",
+        ]
+
+    def _get_repo_update_partial_method(
+        self, class_name: str, entity: EntityFieldData
+    ) -> List[str]:
+        if not self.gen_partial_updates or not entity.pk_field_data:
+            return []
+
+        patch_param: str = self.svc_dir.get_patch_param_name(class_name)
+        patch_param_var: str = self.svc_dir.get_var_name(patch_param)
+        args: str = self._get_repo_call_args(
+            class_name, "update_partial", patch_param_var, "BindPatchParam"
+        )
+        return [
+            f"{TAB_8}public async Task<int> UpdatePartialAsync"
+            f"({patch_param} {patch_param_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}return await dbService.ExecuteAsync"
+            f"(sqlCommand.UpdatePartialCommand, {args});",
+            f"{TAB_8}}}",
+            "",
+        ]
+
+    def _get_repo_with_refs_method(
+        self, class_name: str, entity: EntityFieldData
+    ) -> List[str]:
+        joins: List[RefJoin] = self._get_ref_joins(entity)
+        if not joins:
+            return []
+
+        dto_name: str = self.svc_dir.get_with_refs_name(class_name)
+        get_param: str = self.svc_dir.get_get_param_name(class_name)
+        get_param_var: str = self.svc_dir.get_var_name(get_param)
+        sql_cmd_name: str = self.svc_dir.get_sql_cmd_name(class_name)
+        if self.gen_row_mappers:
+            args = self._get_repo_call_args(
+                class_name,
+                "get_with_refs",
+                get_param_var,
+                "BindGetParam",
+                map_rows=True,
+                map_method="MapWithRefs"
+            )
+            call = f"GetAsync<{dto_name}>"
+        else:
+            # Dapper splits each row into the entities on the first key
+            # column of every joined entity
+            ref_names = [
+                self.svc_dir.normalize_name(join.entity.name)
+                for join in joins
+            ]
+            types = ", ".join(
+                f"typeof({name})" for name in [class_name] + ref_names
+            )
+            props = "".join(
+                f", {self._get_join_prop_name(join)} = "
+                f"({ref_name}{'' if join.is_required else '?'})row[{idx}]"
+                for idx, (join, ref_name) in enumerate(
+                    zip(joins, ref_names), start=1
+                )
+            )
+            split_on = ",".join(
+                join.entity.pk_fields[0].name for join in joins
+            )
+            args = (
+                f"{get_param_var}, [{types}], row => new {dto_name} "
+                f"{{ {class_name} = ({class_name})row[0]{props} }}, "
+                f'"{split_on}"'
+                + self._get_telemetry_args(class_name, "get_with_refs")
+            )
+            call = "GetAsync"
+
+        return [
+            "",
+            f"{TAB_8}public async Task<{dto_name}?> GetWithRefsAsync"
+            f"({get_param} {get_param_var})",
+            f"{TAB_8}{{",
+            f"{TAB_12}return await dbService.{call}"
+            f"({sql_cmd_name}.GetWithRefsCommand, {args});",
+            f"{TAB_8}}}",
+        ]
+
+    def _get_ref_joins(self, entity: EntityFieldData) -> List[RefJoin]:
+        if not self.eager_load_depth or not entity.pk_field_data:
+            return []
+
+        self.sql_gen.update_entity(entity)
+        return self.sql_gen.get_ref_joins(self.eager_load_depth)
+
+    def _get_join_prop_name(self, join: RefJoin) -> str:
+        return "".join(self.svc_dir.normalize_name(name) for name in join.path)
+
+    def _get_repo_containment_methods(
+        self, class_name: str, entity: EntityFieldData
+    ) -> List[str]:
+        list_param: str = self.svc_dir.get_list_param_name(class_name)
+        list_param_var: str = self.svc_dir.get_var_name(class_name)
+        sql_cmd_name: str = self.svc_dir.get_sql_cmd_name(class_name)
+        method_content: List[str] = []
+        for fld in self._get_filterable_fields(entity):
+            name: str = self.svc_dir.normalize_name(fld.name)
+            if self.gen_row_mappers:
+                mapper: str = self.svc_dir.get_row_mapper_name(class_name)
+                args = (
+                    f"parameters => {mapper}.BindListBy{name}Param"
+                    f"(parameters, {fld.name}, {list_param_var}), "
+                    f"{mapper}.Map"
+                )
+            else:
+                args = (
+                    f"new {{ {fld.name}, limit = {list_param_var}.Limit, "
+                    f"offset = {list_param_var}.OffSet }}"
+                )
+            args += self._get_telemetry_args(
+                class_name, f"list_by_{fld.name.lower()}"
+            )
+            method_content.extend([
+                "",
+                f"{TAB_8}public async Task<IEnumerable<{class_name}>> "
+                f"ListBy{name}Async(string {fld.name}, "
+                f"{list_param} {list_param_var})",
+                f"{TAB_8}{{",
+                f"{TAB_12}return await dbService.ListAsync<{class_name}>"
+                f"({sql_cmd_name}.ListBy{name}Command, {args});",
+                f"{TAB_8}}}",
+            ])
+
+        return method_content
+
+    def _get_filterable_fields(
+        self, entity: EntityFieldData
+    ) -> List[FieldData]:
+        filterable: Set[str] = {
+            fld.name for fld in entity.entity.non_ref_fields
+            if fld.is_filterable
+        }
+        return [
+            fld for fld in entity.other_field_data if fld.name in filterable
+        ]
+
+    def _get_repo_projection_methods(
+        self, class_name: str, entity: EntityFieldData
+    ) -> List[str]:
+        get_param: str = self.svc_dir.get_get_param_name(class_name)
+        get_param_var: str = self.svc_dir.get_var_name(get_param)
+        list_param: str = self.svc_dir.get_list_param_name(class_name)
+        list_param_var: str = self.svc_dir.get_var_name(class_name)
+        sql_cmd_name: str = self.svc_dir.get_sql_cmd_name(class_name)
+        method_content: List[str] = []
+        for name in self._get_projections(entity):
+            dto_name: str = self.svc_dir.get_projection_name(class_name, name)
+            get_args: str = self._get_repo_call_args(
+                class_name,
+                f"get_{name.lower()}",
+                get_param_var,
+                "BindGetParam",
+                map_rows=True,
+                map_method=f"Map{name}"
+            )
+            list_args: str = self._get_repo_call_args(
+                class_name,
+                f"list_{name.lower()}",
+                list_param_var,
+                "BindListParam",
+                map_rows=True,
+                map_method=f"Map{name}"
+            )
+            method_content.extend([
+                "",
+                f"{TAB_8}public async Task<{dto_name}?> Get{name}Async"
+                f"({get_param} {get_param_var})",
+                f"{TAB_8}{{",
+                f"{TAB_12}return await dbService.GetAsync<{dto_name}>"
+                f"({sql_cmd_name}.Get{name}Command, {get_args});",
+                f"{TAB_8}}}",
+                "",
+                f"{TAB_8}public async Task<IEnumerable<{dto_name}>> "
+                f"List{name}Async({list_param} {list_param_var})",
+                f"{TAB_8}{{",
+                f"{TAB_12}return await dbService.ListAsync<{dto_name}>"
+                f"({sql_cmd_name}.List{name}Command, {list_args});",
+                f"{TAB_8}}}",
+            ])
+
+        return method_content
+
+    def _get_decorated_read_methods(
+        self, ent_name: str, entity: EntityFieldData
+    ) -> List[str]:
+        # Projections, joined and containment reads go straight to the
+        # decorated repo
+        get_param: str = self.svc_dir.get_get_param_name(ent_name)
+        get_param_var: str = self.svc_dir.get_var_name(get_param)
+        list_param: str = self.svc_dir.get_list_param_name(ent_name)
+        list_param_var: str = self.svc_dir.get_var_name(ent_name)
+        method_content: List[str] = []
+        if self._get_ref_joins(entity):
+            method_content.extend([
+                f"{TAB_8}public Task<{ent_name}WithRefs?> GetWithRefsAsync"
+                f"({get_param} {get_param_var})",
+                f"{TAB_8}{{",
+                f"{TAB_12}return repo.GetWithRefsAsync({get_param_var});",
+                f"{TAB_8}}}",
+                "",
+            ])
+
+        for fld in self._get_filterable_fields(entity):
+            name: str = self.svc_dir.normalize_name(fld.name)
+            method_content.extend([
+                f"{TAB_8}public Task<IEnumerable<{ent_name}>> "
+                f"ListBy{name}Async(string {fld.name}, "
+                f"{list_param} {list_param_var})",
+                f"{TAB_8}{{",
+                f"{TAB_12}return repo.ListBy{name}Async"
+                f"({fld.name}, {list_param_var});",
+                f"{TAB_8}}}",
+                "",
+            ])
+
+        for name in self._get_projections(entity):
+            dto_name: str = self.svc_dir.get_projection_name(ent_name, name)
+            method_content.extend([
+                f"{TAB_8}public Task<{dto_name}?> Get{name}Async"
+                f"({get_param} {get_param_var})",
+                f"{TAB_8}{{",
+                f"{TAB_12}return repo.Get{name}Async({get_param_var});",
+                f"{TAB_8}}}",
+                "",
+                f"{TAB_8}public Task<IEnumerable<{dto_name}>> "
+                f"List{name}Async({list_param} {list_param_var})",
+                f"{TAB_8}{{",
+                f"{TAB_12}return repo.List{name}Async({list_param_var});",
+                f"{TAB_8}}}",
+                "",
+            ])
+
+        return method_content
+
+    def _get_projections(
+        self, entity: EntityFieldData
+    ) -> Dict[str, List[FieldData]]:
+        fields_by_name: Dict[str, FieldData] = {
+            fld.name: fld for fld in entity.get_field_data()
+        }
+        projections: Dict[str, List[FieldData]] = {}
+        for name, columns in (entity.entity.projections or {}).items():
+            for column in columns:
+                if column not in fields_by_name:
+                    raise ValueError(
+                        f"`{entity.entity.name}.projections.{name}` has no "
+                        f"column `{column}`"
+                    )
+
+            projections[self.svc_dir.normalize_name(name)] = [
+                fields_by_name[column] for column in columns
+            ]
+
+        return projections
+
+    def _get_key_type(self, entity: EntityFieldData) -> str:
+        pk_types = [
+            _get_type_name(fld.data_type) for fld in entity.pk_field_data
+        ]
+        if len(pk_types) == 1:
+            return pk_types[0]
+        return f"({', '.join(pk_types)})"
+
+    def _get_key_expression(
+        self, entity: EntityFieldData, var_name: str
+    ) -> str:
+        values = [
+            f"{var_name}.{self.svc_dir.normalize_name(fld.name)}"
+            for fld in entity.pk_field_data
+        ]
+        if len(values) == 1:
+            return values[0]
+        return f"({', '.join(values)})"
+
+    def _get_repo_call_args(
+        self,
+        class_name: str,
+        operation: str,
+        param_var: str,
+        bind_method: str,
+        map_rows: bool = False,
+        map_method: str = "Map"
+    ) -> str:
+        args: str = param_var
+        if self._has_dapper_binders() and bind_method in DAPPER_BINDERS:
+            args = f"{DAPPER_BINDERS[bind_method]}({param_var})"
+        elif self.gen_row_mappers:
+            mapper: str = self.svc_dir.get_row_mapper_name(class_name)
+            args = (
+                f"parameters => {mapper}.{bind_method}"
+                f"(parameters, {param_var})"
+            )
+            if map_rows:
+                args += f", {mapper}.{map_method}"
+        return args + self._get_telemetry_args(class_name, operation)
+
+    def _has_dapper_binders(self) -> bool:
+        return not self.gen_row_mappers and self.db_type_mapper is not None
+
+    def _get_dapper_binders(
+        self, class_name: str, entity: EntityFieldData
+    ) -> List[str]:
+        # Dapper infers the parameter types from the values, the binders
+        # type them like the row mapper binds do
+        if not self._has_dapper_binders():
+            return []
+
+        db_types: Dict[str, str] = self._get_db_types(entity.entity)
+        binders = [
+            (DAPPER_BINDERS["Bind"], class_name, entity.get_field_data(), [])
+        ]
+        if entity.pk_field_data:
+            binders.append((
+                DAPPER_BINDERS["BindGetParam"],
+                self.svc_dir.get_get_param_name(class_name),
+                entity.pk_field_data,
+                []
+            ))
+        if self.gen_partial_updates and entity.pk_field_data:
+            # Unset properties are null whether the column is required or not
+            patch_fields = [
+                replace(fld, is_required=False)
+                for fld in entity.get_non_pk_field_data()
+            ]
+            binders.append((
+                DAPPER_BINDERS["BindPatchParam"],
+                self.svc_dir.get_patch_param_name(class_name),
+                entity.pk_field_data,
+                patch_fields
+            ))
+
+        method_content: List[str] = []
+        for method_name, param_type, field_data, patch_fields in binders:
+            method_content.extend([
+                "",
+                f"{TAB_8}private static DynamicParameters {method_name}"
+                f"({param_type} param)",
+                f"{TAB_8}{{",
+                f"{TAB_12}var parameters = new DynamicParameters();",
+            ])
+            method_content.extend(
+                self._get_dapper_add_statement(fld, db_types)
+                for fld in field_data
+            )
+            for fld in patch_fields:
+                flag_name: str = fld.name + SET_FLAG_SUFFIX
+                method_content.extend([
+                    self._get_dapper_add_statement(fld, db_types),
+                    f"{TAB_12}parameters.Add(\"{flag_name}\", param."
+                    f"{self.svc_dir.normalize_name(flag_name)}, "
+                    "DbType.Boolean);",
+                ])
+            method_content.extend([
+                f"{TAB_12}return parameters;",
+                f"{TAB_8}}}",
+            ])
+
+        return method_content
+
+    def _get_dapper_add_statement(
+        self, field: FieldData, db_types: Dict[str, str]
+    ) -> str:
+        data_type: str = _get_type_name(field.data_type)
+        bind_type: str = self._get_bind_type(field)
+        value: str = f"param.{self.svc_dir.normalize_name(field.name)}"
+        if bind_type != data_type:
+            null_type: str = "" if field.is_required else "?"
+            value = f"({bind_type}{null_type}){value}"
+
+        column_db_type, size = self._get_column_db_type(field, db_types)
+        if column_db_type and column_db_type.db_type:
+            value += f", DbType.{column_db_type.db_type}"
+            if size:
+                value += f", size: {size}"
+        return f"{TAB_12}parameters.Add(\"{field.name}\", {value});"
+
+    # Row mappers
+    def _gen_row_mapper(
+        self, entity: EntityFieldData, ent_name: str
+    ) -> FileData:
+        class_name: str = self.svc_dir.get_row_mapper_name(ent_name)
+        ent_var_name: str = self.svc_dir.get_var_name(ent_name)
+        get_param: str = self.svc_dir.get_get_param_name(ent_name)
+        list_param: str = self.svc_dir.get_list_param_name(ent_name)
+        patch_param: str = self.svc_dir.get_patch_param_name(ent_name)
+        bind: str = "NpgsqlParameterCollection parameters"
+        db_types: Dict[str, str] = self._get_db_types(entity.entity)
+        col_types: Dict[str, str] = self._get_column_types(entity.entity)
+        file_content = [
+            "using System.Data.Common;",
+            "using Npgsql;",
+            *(["using NpgsqlTypes;"] if db_types else []),
+            f"using {self.svc_dir.model_ns};",
+            "",
+            f"namespace {self.svc_dir.mappers_ns}",
+            "{",
+            f"{TAB_4}public static class {class_name}",
+            f"{TAB_4}{{",
+            f"{TAB_8}// Ordinals follow the column order of the generated "
+            "SELECT commands",
+            f"{TAB_8}public static {ent_name} Map(DbDataReader reader) "
+            "=> new()",
+            f"{TAB_8}{{",
+        ]
+        file_content.extend(
+            f"{TAB_12}{self.svc_dir.normalize_name(fld.name)} = "
+            f"{self._get_reader_expression(fld, ordinal, col_types)},"
+            for ordinal, fld in enumerate(entity.get_field_data())
+        )
+        file_content.append(f"{TAB_8}}};")
+        if (joins := self._get_ref_joins(entity)):
+            file_content.extend(
+                self._get_map_with_refs_method(entity, ent_name, joins)
+            )
+
+        for name, field_data in self._get_projections(entity).items():
+            dto_name: str = self.svc_dir.get_projection_name(ent_name, name)
+            file_content.extend([
+                "",
+                f"{TAB_8}public static {dto_name} Map{name}"
+                "(DbDataReader reader) => new()",
+                f"{TAB_8}{{",
+                *(
+                    f"{TAB_12}{self.svc_dir.normalize_name(fld.name)} = "
+                    f"{self._get_reader_expression(fld, ordinal, col_types)},"
+                    for ordinal, fld in enumerate(field_data)
+                ),
+                f"{TAB_8}}};",
+            ])
+
+        file_content.extend([
+            "",
+            f"{TAB_8}public static void Bind({bind}, "
+            f"{ent_name} {ent_var_name})",
+            f"{TAB_8}{{",
+            *(
+                self._get_bind_statement(fld, ent_var_name, db_types)
+                for fld in entity.get_field_data()
+            ),
+            f"{TAB_8}}}",
+            "",
+            f"{TAB_8}public static void BindGetParam({bind}, "
+            f"{get_param} param)",
+            f"{TAB_8}{{",
+            *(
+                self._get_bind_statement(fld, "param", db_types)
+                for fld in entity.pk_field_data
+            ),
+            f"{TAB_8}}}",
+            "",
+            *(
+                [
+                    f"{TAB_8}public static void BindGetManyParam({bind}, "
+                    f"IEnumerable<{get_param}> param)",
+                    f"{TAB_8}{{",
+                    *(
+                        self._get_bind_many_statement(fld, db_types)
+                        for fld in entity.pk_field_data
+                    ),
+                    f"{TAB_8}}}",
+                    "",
+                ]
+                if self.gen_get_many and entity.pk_field_data else []
+            ),
+            *(
+                [
+                    f"{TAB_8}public static void BindPatchParam({bind}, "
+                    f"{patch_param} param)",
+                    f"{TAB_8}{{",
+                    *(
+                        self._get_bind_statement(fld, "param", db_types)
+                        for fld in entity.pk_field_data
+                    ),
+                    *self._get_bind_patch_statements(entity, db_types),
+                    f"{TAB_8}}}",
+                    "",
+                ]
+                if self.gen_partial_updates and entity.pk_field_data else []
+            ),
+            f"{TAB_8}public static void BindListParam({bind}, "
+            f"{list_param} param)",
+            f"{TAB_8}{{",
+            *(
+                self._get_bind_statement(
+                    fld, "param", db_types, is_list=True
+                )
+                for fld in entity.pk_field_data
+            ),
+        ])
+
+        # Foreign key filters are not exposed by the list param yet, they
+        # are bound empty so the list command gets all of its parameters
+        file_content.extend(
+            f"{TAB_12}parameters.Add(new NpgsqlParameter"
+            f"<{self._get_bind_type(fld)}[]>(\"{fld.name}s\", [])"
+            f"{self._get_db_type_init(fld, db_types, is_list=True)});"
+            for fld in entity.fk_field_data
+        )
+        if entity.get_pk_and_fk_field_data():
+            file_content.extend([
+                f"{TAB_12}parameters.Add(new NpgsqlParameter<int>"
+                "(\"limit\", param.Limit));",
+                f"{TAB_12}parameters.Add(new NpgsqlParameter<int>"
+                "(\"offset\", param.OffSet));",
+            ])
+        file_content.append(f"{TAB_8}}}")
+        for fld in self._get_filterable_fields(entity):
+            file_content.extend([
+                "",
+                f"{TAB_8}public static void BindListBy"
+                f"{self.svc_dir.normalize_name(fld.name)}Param({bind}, "
+                f"string {fld.name}, {list_param} param)",
+                f"{TAB_8}{{",
+                f"{TAB_12}parameters.Add(new NpgsqlParameter<string>"
+                f"(\"{fld.name}\", {fld.name}));",
+                f"{TAB_12}parameters.Add(new NpgsqlParameter<int>"
+                "(\"limit\", param.Limit));",
+                f"{TAB_12}parameters.Add(new NpgsqlParameter<int>"
+                "(\"offset\", param.OffSet));",
+                f"{TAB_8}}}",
+            ])
+
+        file_content.extend([
+            f"{TAB_4}}}",
+            "}"
+        ])
+        return FileData(
+            file_path=self.svc_dir.mappers_dir_path,
+            file_name=self.svc_dir.get_file_name(class_name),
+            file_content=file_content
+        )
+
+    def _get_map_with_refs_method(
+        self, entity: EntityFieldData, ent_name: str, joins: List[RefJoin]
+    ) -> List[str]:
+        dto_name: str = self.svc_dir.get_with_refs_name(ent_name)
+        method_content: List[str] = [
+            "",
+            f"{TAB_8}public static {dto_name} MapWithRefs"
+            "(DbDataReader reader) => new()",
+            f"{TAB_8}{{",
+        ]
+        entities = [(ent_name, ent_name, entity, None)] + [
+            (
+                self._get_join_prop_name(join),
+                self.svc_dir.normalize_name(join.entity.name),
+                EntityFieldData.from_entity(join.entity, self.pl_type_mapper),
+                join
+            )
+            for join in joins
+        ]
+
+        # Ordinals continue across the columns of the joined entities
+        ordinal = 0
+        for prop_name, class_name, entity_data, join in entities:
+            field_data = entity_data.get_field_data()
+            col_types = self._get_column_types(entity_data.entity)
+            null_check = (
+                f"reader.IsDBNull({ordinal}) ? null : "
+                if join and not join.is_required else ""
+            )
+            method_content.append(
+                f"{TAB_12}{prop_name} = {null_check}new {class_name}"
+            )
+            method_content.append(f"{TAB_12}{{")
+            for fld in field_data:
+                method_content.append(
+                    f"{TAB_16}{self.svc_dir.normalize_name(fld.name)} = "
+                    f"{self._get_reader_expression(fld, ordinal, col_types)},"
+                )
+                ordinal += 1
+            method_content.append(f"{TAB_12}}},")
+
+        method_content.append(f"{TAB_8}}};")
+        return method_content
+
+    def _get_reader_expression(
+        self, field: FieldData, ordinal: int, col_types: Dict[str, str]
+    ) -> str:
+        data_type: str = _get_type_name(field.data_type)
+        column_type: str = col_types.get(field.name, "").partition("(")[0]
+        if (
+            data_type in NUMERIC_TYPES
+            and column_type.upper() in COLUMN_READER_GETTERS
+        ):
+            # Npgsql only reads a column with the getter of its own type,
+            # the value is then converted to the property type
+            getter, read_type = COLUMN_READER_GETTERS[column_type.upper()]
+            value = f"reader.{getter}({ordinal})"
+            if read_type != data_type:
+                value = f"({data_type}){value}"
+        elif data_type in READER_GETTERS:
+            value = f"reader.{READER_GETTERS[data_type]}({ordinal})"
+        elif data_type in BIND_TYPES:
+            # Unsigned values are stored in the next wider signed column
+            value = f"({data_type})reader.GetInt64({ordinal})"
+        else:
+            value = f"reader.GetFieldValue<{data_type}>({ordinal})"
+
+        if field.is_required:
+            return value
+        return f"reader.IsDBNull({ordinal}) ? null : {value}"
+
+    def _get_bind_type(self, field: FieldData) -> str:
+        data_type: str = _get_type_name(field.data_type)
+        return BIND_TYPES.get(data_type, data_type)
+
+    def _get_bind_statement(
+        self,
+        field: FieldData,
+        var_name: str,
+        db_types: Dict[str, str],
+        is_list: bool = False
+    ) -> str:
+        data_type: str = _get_type_name(field.data_type)
+        bind_type: str = self._get_bind_type(field)
+        prop: str = f"{var_name}.{self.svc_dir.normalize_name(field.name)}"
+        type_init: str = self._get_db_type_init(field, db_types, is_list)
+        if is_list:
+            values: str = f"{prop}s?"
+            if bind_type != data_type:
+                values += f".Select(value => ({bind_type})value)"
+            return (
+                f"{TAB_12}parameters.Add(new NpgsqlParameter<{bind_type}[]>"
+                f"(\"{field.name}s\", {values}.ToArray() ?? []){type_init});"
+            )
+
+        null_type: str = "" if field.is_required else "?"
+        value: str = prop
+        if bind_type != data_type:
+            value = f"({bind_type}{null_type}){prop}"
+        return (
+            f"{TAB_12}parameters.Add(new NpgsqlParameter"
+            f"<{bind_type}{null_type}>(\"{field.name}\", {value}){type_init});"
+        )
+
+    def _get_bind_patch_statements(
+        self, entity: EntityFieldData, db_types: Dict[str, str]
+    ) -> Generator[str, None, None]:
+        for fld in entity.get_non_pk_field_data():
+            flag_name: str = fld.name + SET_FLAG_SUFFIX
+            flag_prop: str = self.svc_dir.normalize_name(flag_name)
+
+            # Unset properties are null whether the column is required or not
+            yield self._get_bind_statement(
+                replace(fld, is_required=False), "param", db_types
+            )
+            yield (
+                f"{TAB_12}parameters.Add(new NpgsqlParameter<bool>"
+                f"(\"{flag_name}\", param.{flag_prop}));"
+            )
+
+    def _get_bind_many_statement(
+        self, field: FieldData, db_types: Dict[str, str]
+    ) -> str:
+        data_type: str = _get_type_name(field.data_type)
+        bind_type: str = self._get_bind_type(field)
+        cast: str = f"({bind_type})" if bind_type != data_type else ""
+        prop: str = self.svc_dir.normalize_name(field.name)
+        type_init: str = self._get_db_type_init(
+            field, db_types, is_list=True
+        )
+        return (
+            f"{TAB_12}parameters.Add(new NpgsqlParameter<{bind_type}[]>"
+            f"(\"{field.name}s\", param.Select(getParam => "
+            f"{cast}getParam.{prop}).ToArray()){type_init});"
+        )
+
+    def _get_db_types(self, entity: Entity) -> Dict[str, str]:
+        if not self.db_type_mapper:
+            return {}
+
+        entity_data = EntityFieldData.from_entity(entity, self.db_type_mapper)
+        return {
+            fld.name: fld.data_type for fld in entity_data.get_field_data()
+        }
+
+    def _get_column_types(self, entity: Entity) -> Dict[str, str]:
+        # The row mappers read Npgsql results, so the columns are the ones
+        # of `PgsqlTypeMapper` unless another mapper is given
+        type_mapper = self.db_type_mapper or PgsqlTypeMapper()
+        entity_data = EntityFieldData.from_entity(entity, type_mapper)
+        return {
+            fld.name: fld.data_type for fld in entity_data.get_field_data()
+        }
+
+    def _get_column_db_type(
+        self, field: FieldData, db_types: Dict[str, str]
+    ) -> Tuple[ColumnDbType, str]:
+        # Parameters typed like their column keep the server from casting
+        # the column, which would stop it from using its indexes. A type the
+        # bound value cannot be written as would fail at runtime instead, so
+        # those parameters are left for Npgsql to infer
+        type_name, _, size = db_types.get(field.name, "").partition("(")
+        column_db_type = COLUMN_DB_TYPES.get(type_name.upper())
+        if (
+            not column_db_type
+            or self._get_bind_type(field) not in column_db_type.clr_types
+        ):
+            return None, None
+
+        size = size.rstrip(")")
+        return column_db_type, size if size.isdigit() else None
+
+    def _get_db_type_init(
+        self, field: FieldData, db_types: Dict[str, str], is_list: bool
+    ) -> str:
+        column_db_type, size = self._get_column_db_type(field, db_types)
+        if not column_db_type:
+            return ""
+
+        npgsql_type = f"NpgsqlDbType.{column_db_type.npgsql_type}"
+        if is_list:
+            return f" {{ NpgsqlDbType = NpgsqlDbType.Array | {npgsql_type} }}"
+        elif size:
+            return f" {{ NpgsqlDbType = {npgsql_type}, Size = {size} }}"
+        return f" {{ NpgsqlDbType = {npgsql_type} }}"
+
     # Sql command class
-    def _gen_sql_command_service(self, class_name: str) -> FileData:
+    def _gen_sql_command_service(
+        self, class_name: str, entity: EntityFieldData
+    ) -> FileData:
         i_sql_cmd: str = self.svc_dir.sql_cmd_interface_name
         sql_cmd_class_name: str = self.svc_dir.get_sql_cmd_name(class_name)
         get_sql: str = f'"{self.sql_gen.gen_get_sql_statement()}";'
@@ -339,15 +2161,78 @@ class DbServiceGenerator(ServiceGenerator):
             f"{TAB_4}public class {sql_cmd_class_name} : {i_sql_cmd}",
             f"{TAB_4}{{",
             f"{TAB_8}public string GetCommand => {get_sql}",
+            *(
+                [
+                    f"{TAB_8}public string GetManyCommand => "
+                    f'"{self.sql_gen.gen_get_many_sql_statement()}";'
+                ]
+                if self.gen_get_many else []
+            ),
             f"{TAB_8}public string ListCommand => {list_sql}",
+            *(
+                [
+                    f"{TAB_8}public string CountCommand => "
+                    f'"{self.sql_gen.gen_count_sql_statement()}";',
+                    f"{TAB_8}public string EstimateCountCommand => "
+                    f'"{self.sql_gen.gen_estimate_count_sql_statement()}";',
+                ]
+                if self.gen_counts else []
+            ),
             f"{TAB_8}public string CreateCommand => {create_sql}",
             f"{TAB_8}public string UpdateCommand => {update_sql}",
+            *(
+                [
+                    f"{TAB_8}public string UpdatePartialCommand => "
+                    f'"{self.sql_gen.gen_update_partial_sql_statement()}";'
+                ]
+                if self.gen_partial_updates else []
+            ),
             f"{TAB_8}public string DeleteCommand => {delete_sql}",
+        ]
+
+        if (joins := self._get_ref_joins(entity)):
+            with_refs_sql = self.sql_gen.gen_get_with_refs_sql_statement(
+                joins
+            )
+            file_content.append(
+                f'{TAB_8}public const string GetWithRefsCommand = '
+                f'"{with_refs_sql}";'
+            )
+
+        for fld in self._get_filterable_fields(entity):
+            list_by_sql = self.sql_gen.gen_list_by_containment_sql_statement(
+                fld
+            )
+            file_content.append(
+                f"{TAB_8}public const string "
+                f"ListBy{self.svc_dir.normalize_name(fld.name)}Command = "
+                f'"{list_by_sql}";'
+            )
+
+        # Projection commands are specific to the entity, they are constants
+        # of the class rather than members of the command interface
+        for name, field_data in self._get_projections(entity).items():
+            get_sql = self.sql_gen.gen_get_sql_statement(field_data)
+            list_sql = self.sql_gen.gen_list_sql_statement(field_data)
+            file_content.extend([
+                f'{TAB_8}public const string Get{name}Command = "{get_sql}";',
+                f'{TAB_8}public const string List{name}Command = '
+                f'"{list_sql}";',
+            ])
+
+        file_content.extend([
             f"{TAB_4}}}",
             "}"
-        ]
+        ])
         return FileData(
             file_path=self.svc_dir.sql_cmd_dir_path,
             file_name=self.svc_dir.get_file_name(sql_cmd_class_name),
             file_content=file_content
         )
+
+
+def _get_type_name(data_type) -> str:
+    # Enum fields are typed with the `CSharpDataType` member itself
+    if isinstance(data_type, CSharpDataType):
+        return data_type.value
+    return data_type
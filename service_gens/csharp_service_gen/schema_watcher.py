@@ -0,0 +1,247 @@
+import os
+import sys
+from threading import Event
+import time
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from data_type_mapper.data_type_mapper import TypeMapper
+from entity_parser.entity import Entity
+from entity_parser.entity_parser import JsonSchemaParser
+from output_sink.output_sink import DirectoryOutputSink, OutputSink
+from service_gens.csharp_service_gen.db_service_gen import (
+    DEFAULT_COUNT_ESTIMATE_THRESHOLD, DbServiceGenerator
+)
+from service_gens.csharp_service_gen.utils import CsharpServiceUtil
+from service_gens.service_gen import CSharpTypeMapper
+from sql_generator.sql_generator import SqlCommandGenerator, TableSqlGenerator
+from utils.utils import FileData
+
+
+DEFAULT_POLL_INTERVAL: float = 0.5
+
+
+class SchemaWatcher:
+    """_summary_
+    Polls a json schema file and regenerates only the files of the entities
+    whose definition changed since the last generation, along with the
+    entities that depend on them. The solution is
+    expected to have been scaffolded by `CsharpRestServiceGenerator`; the
+    first poll regenerates every entity.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        svc_dir: CsharpServiceUtil,
+        service_name: str,
+        sql_gen: SqlCommandGenerator,
+        db_type_mapper: TypeMapper,
+        db_script_gen: TableSqlGenerator,
+        output_sink: OutputSink = None,
+        gen_telemetry: bool = False,
+        gen_row_mappers: bool = False,
+        gen_get_many: bool = False,
+        gen_partial_updates: bool = False,
+        gen_counts: bool = False,
+        gen_batch_loaders: bool = False,
+        eager_load_depth: int = 0,
+        count_estimate_threshold: int = DEFAULT_COUNT_ESTIMATE_THRESHOLD
+    ):
+        """
+        The generator options must match the ones the solution was generated
+        with, so changed entities are regenerated the same way.
+
+        Args:
+            gen_telemetry (bool, optional): Whether the DbService records
+                OpenTelemetry traces and metrics. Defaults to False.
+            gen_row_mappers (bool, optional): Whether the repos use
+                generated row mappers and parameter binders instead of
+                Dapper. Defaults to False.
+            gen_get_many (bool, optional): Whether the repos have
+                GetManyAsync. Defaults to False.
+            gen_partial_updates (bool, optional): Whether the repos have
+                UpdatePartialAsync. Defaults to False.
+            gen_counts (bool, optional): Whether the repos have CountAsync.
+                Defaults to False.
+            gen_batch_loaders (bool, optional): Whether batching repo
+                decorators are generated. Defaults to False.
+            eager_load_depth (int, optional): How many levels of references
+                GetWithRefsAsync joins. Defaults to 0.
+            count_estimate_threshold (int, optional): The estimated row
+                count from which an unfiltered CountAsync returns the
+                planner estimate.
+        """
+        self.file_path = file_path
+        self.svc_dir = svc_dir
+        self.service_name = service_name
+        self.sql_gen = sql_gen
+        self.pl_type_mapper = CSharpTypeMapper()
+        self.db_type_mapper = db_type_mapper
+        self.db_script_gen = db_script_gen
+        self.gen_telemetry = gen_telemetry
+        self.gen_row_mappers = gen_row_mappers
+        self.gen_get_many = gen_get_many
+        self.gen_partial_updates = gen_partial_updates
+        self.gen_counts = gen_counts
+        self.gen_batch_loaders = gen_batch_loaders
+        self.eager_load_depth = eager_load_depth
+        self.count_estimate_threshold = count_estimate_threshold
+        self.output_sink = output_sink or DirectoryOutputSink(
+            svc_dir.sln_path
+        )
+        self.last_mtime: int = None
+        self.fingerprints: Dict[str, Tuple[Any, ...]] = {}
+        self.entity_files: Dict[str, List[str]] = {}
+        self.last_refresh_seconds: float = 0.0
+        self.last_error: Exception = None
+
+    def poll(self) -> Set[str]:
+        """ Regenerates the changed entities if the schema file was
+        modified since the last poll.
+
+        Returns:
+            Set[str]: The names of the regenerated entities.
+        """
+        mtime = os.stat(self.file_path).st_mtime_ns
+        if mtime == self.last_mtime:
+            return set()
+
+        changed = self.refresh()
+        self.last_mtime = mtime
+        return changed
+
+    def watch(
+        self,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        stop_event: Event = None,
+        on_error: Callable[[Exception], None] = None
+    ) -> None:
+        """ Polls the schema file until the stop event is set.
+
+        A schema that fails to parse or generate, e.g. while it is only
+        half saved, is reported and retried by the next poll. The files of
+        the last good schema are kept until then.
+
+        Args:
+            poll_interval (float, optional): The seconds between polls.
+                Defaults to DEFAULT_POLL_INTERVAL.
+            stop_event (Event, optional): Stops the watch once set.
+            on_error (Callable[[Exception], None], optional): Reports a
+                failed refresh once per distinct error. Defaults to
+                printing it to stderr.
+        """
+        stop_event = stop_event or Event()
+        on_error = on_error or _print_error
+        while not stop_event.is_set():
+            try:
+                self.poll()
+                self.last_error = None
+            except Exception as error:
+                # The same error is raised on every poll until the schema
+                # is fixed
+                if repr(error) != repr(self.last_error):
+                    on_error(error)
+                self.last_error = error
+            stop_event.wait(poll_interval)
+
+    def refresh(self) -> Set[str]:
+        start = time.perf_counter()
+        parser = JsonSchemaParser()
+        entities = parser.parse(file_path=self.file_path)
+        entities_by_name = {entity.name: entity for entity in entities}
+        fingerprints = {
+            entity.name: self._get_fingerprint(entity) for entity in entities
+        }
+
+        removed = set(self.fingerprints) - set(fingerprints)
+        changed = {
+            name for name, fingerprint in fingerprints.items()
+            if self.fingerprints.get(name) != fingerprint
+        }
+        changed = {
+            name for name in parser.affected_by(changed | removed)
+            if name in entities_by_name
+        }
+        if not changed and not removed:
+            self.fingerprints = fingerprints
+            return set()
+
+        service_gen = DbServiceGenerator(
+            service_name=self.service_name,
+            svc_dir=self.svc_dir,
+            entities=entities,
+            pl_type_mapper=self.pl_type_mapper,
+            db_type_mapper=self.db_type_mapper,
+            sql_gen=self.sql_gen,
+            gen_telemetry=self.gen_telemetry,
+            gen_row_mappers=self.gen_row_mappers,
+            gen_get_many=self.gen_get_many,
+            gen_partial_updates=self.gen_partial_updates,
+            gen_counts=self.gen_counts,
+            gen_batch_loaders=self.gen_batch_loaders,
+            eager_load_depth=self.eager_load_depth,
+            count_estimate_threshold=self.count_estimate_threshold
+        )
+
+        for name in removed:
+            self._remove_entity_files(name)
+
+        for name in changed:
+            entity = entities_by_name[name]
+            self.entity_files[name] = []
+            for file_data in service_gen.gen_entity_service(entity):
+                self._write(name, file_data)
+
+        # A changed reference can move any table to another dependency
+        # level, so the whole script is regenerated
+        self.output_sink.write(self.db_script_gen.gen_db_scripts_file_data(
+            entities=entities,
+            type_mapper=self.db_type_mapper,
+            file_path=self.svc_dir.db_scripts_dir_path,
+            file_name=self.svc_dir.db_scripts_file_name
+        ))
+
+        # Only committed once generation succeeded, so a failed refresh is
+        # retried by the next one
+        self.fingerprints = fingerprints
+        self.last_refresh_seconds = time.perf_counter() - start
+        return changed
+
+    def _get_fingerprint(self, entity: Entity) -> Tuple[Any, ...]:
+        # Only the entity's own definition; entities that pick up its
+        # columns through references are found with `affected_by`
+        return (
+            entity.is_enum,
+            entity.enum_values,
+            entity.is_sub_def,
+            entity.cache,
+            entity.projections,
+            entity.covering_projections,
+            entity.indexes,
+            entity.append_only,
+            entity.storage,
+            entity.pk_fields,
+            entity.non_ref_fields,
+            [
+                (fld.name, fld.is_required, fld.ref_entity.name)
+                for fld in entity.ref_fields
+            ]
+        )
+
+    def _write(self, entity_name: str, file_data: FileData) -> None:
+        self.entity_files[entity_name].append(
+            os.path.join(file_data.file_path, file_data.file_name)
+        )
+        self.output_sink.write(file_data)
+
+    def _remove_entity_files(self, entity_name: str) -> None:
+        if not self.output_sink.is_file_system:
+            return
+
+        for file_path in self.entity_files.pop(entity_name, []):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+
+def _print_error(error: Exception) -> None:
+    print(f"Schema refresh failed: {error}", file=sys.stderr)
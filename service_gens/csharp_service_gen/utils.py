@@ -5,14 +5,17 @@ from service_gens.service_gen import ServiceUtil
 ZERO: int = 0
 ONE: int = 1
 
+BENCHMARKS: str = "benchmarks"
 CLASS_1_CS: str = "Class1.cs"
 CS_EXT: str = ".cs"
 DB_SCRIPT_FILE: str = "init.sql"
 DB_SCRIPTS: str = "DbScripts"
 DB_SERVICE = "DbService"
+DB_TELEMETRY: str = "DbTelemetry"
 DB_SERVICES: str = "DbServices"
 ENV_MANAGER: str = "EnvManagers"
 INTERFACES: str = "Interfaces"
+MAPPERS: str = "Mappers"
 MODELS: str = "Models"
 REPOS: str = "Repos"
 SQL_COMMANDS: str = "SqlCommands"
@@ -33,6 +36,10 @@ class CsharpServiceUtil(ServiceUtil):
     def models_dir_path(self) -> str:
         return self.get_path(MODELS)
 
+    @property
+    def mappers_dir_path(self) -> str:
+        return self.get_path(MAPPERS)
+
     @property
     def repos_dir_path(self) -> str:
         return self.get_path(REPOS)
@@ -49,6 +56,10 @@ class CsharpServiceUtil(ServiceUtil):
     def sql_cmd_dir_path(self) -> str:
         return self.get_path(SQL_COMMANDS)
 
+    @property
+    def benchmark_dir_path(self) -> str:
+        return path.join(self.sln_path, BENCHMARKS, self.benchmark_proj_name)
+
     # namespaces
     @property
     def db_service_ns(self) -> str:
@@ -58,6 +69,10 @@ class CsharpServiceUtil(ServiceUtil):
     def model_ns(self) -> str:
         return self.get_name_space(MODELS)
 
+    @property
+    def mappers_ns(self) -> str:
+        return self.get_name_space(MAPPERS)
+
     @property
     def repos_ns(self) -> str:
         return self.get_name_space(REPOS)
@@ -84,6 +99,10 @@ class CsharpServiceUtil(ServiceUtil):
     def db_service_class_name(self) -> str:
         return DB_SERVICE
 
+    @property
+    def db_telemetry_class_name(self) -> str:
+        return DB_TELEMETRY
+
     # Secret Manager
     @property
     def secret_mgr_env_mgr_dir_path(self) -> str:
@@ -129,6 +148,20 @@ class CsharpServiceUtil(ServiceUtil):
     def secret_mgr_class1_cs(self) -> str:
         return path.join(self.secret_mgr_dir_path, CLASS_1_CS)
 
+    @property
+    def benchmark_proj_name(self) -> str:
+        return f"{self.service_name}Benchmarks"
+
+    @property
+    def benchmark_full_name(self) -> str:
+        return path.join(
+            self.benchmark_dir_path, self.benchmark_proj_name + ".csproj"
+        )
+
+    @property
+    def benchmark_ns(self) -> str:
+        return self.benchmark_proj_name
+
     @property
     def service_class1_cs(self) -> str:
         return path.join(self.service_path, CLASS_1_CS)
@@ -151,6 +184,15 @@ class CsharpServiceUtil(ServiceUtil):
     def get_list_param_name(self, cls_name: str) -> str:
         return f"{cls_name}ListParam"
 
+    def get_patch_param_name(self, cls_name: str) -> str:
+        return f"{cls_name}PatchParam"
+
+    def get_projection_name(self, cls_name: str, projection: str) -> str:
+        return f"{cls_name}{self.normalize_name(projection)}"
+
+    def get_with_refs_name(self, cls_name: str) -> str:
+        return f"{cls_name}WithRefs"
+
     def get_interface_name(self, cls_name: str) -> str:
         return f"I{cls_name}"
 
@@ -172,5 +214,17 @@ class CsharpServiceUtil(ServiceUtil):
     def normalize_name(self, cls_name: str) -> str:
         return cls_name[ZERO].upper() + cls_name[ONE:]
 
+    def get_cached_repo_name(self, cls_name: str) -> str:
+        return f"Cached{cls_name}Repo"
+
+    def get_batched_repo_name(self, cls_name: str) -> str:
+        return f"Batched{cls_name}Repo"
+
+    def get_row_mapper_name(self, cls_name: str) -> str:
+        return f"{cls_name}RowMapper"
+
     def get_sql_cmd_name(self, cls_name: str) -> str:
         return f"{cls_name}SqlCommand"
+
+    def get_benchmark_name(self, cls_name: str) -> str:
+        return f"{cls_name}RepoBenchmarks"
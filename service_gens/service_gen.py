@@ -19,6 +19,9 @@ from data_type_mapper.data_type_mapper import (
     TypeMapper,
 )
 from entity_parser.entity import Entity, EntityField, FieldFormat, FieldType
+from instrumentation.instrumentation import (
+    NULL_INSTRUMENTATION, Instrumentation
+)
 from utils.utils import FileData
 
 
@@ -181,12 +184,14 @@ class ServiceGenerator(ABC):
         service_name: str,
         entities: List[Entity],
         pl_type_mapper: TypeMapper,
-        db_type_mapper: TypeMapper = None
+        db_type_mapper: TypeMapper = None,
+        instrumentation: Instrumentation = None
     ):
         self.service_name = service_name
         self.entities = entities
         self.pl_type_mapper = pl_type_mapper
         self.db_type_mapper = db_type_mapper
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
 
     @abstractmethod
     def gen_service(self) -> Generator[FileData, None, None]:
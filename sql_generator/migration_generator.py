@@ -0,0 +1,412 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, fields
+from typing import Iterator, List, Set, Tuple
+
+from data_type_mapper.data_type_mapper import TypeMapper
+from data_type_mapper.sql_type_mapper import PgSQLDataType
+from entity_parser.entity import Entity, EntityStorage, FieldData
+from sql_generator.sql_generator import (
+    PgsqlTableSqlGenerator,
+    _get_deferred_fks,
+    _get_table_levels
+)
+from utils.utils import EntityFieldData, FileData
+
+
+CONCURRENTLY: str = "CONCURRENTLY"
+WARNING_PREFIX: str = "-- WARNING: "
+
+
+@dataclass
+class MigrationStatement:
+    sql: str
+    # Set when the statement rewrites or locks the table for its whole
+    # duration, or drops data
+    warning: str = None
+
+
+@dataclass
+class _MigrationPhases:
+    # Emitted in field order so columns exist before the keys, constraints
+    # and indexes that use them, and data is only dropped at the end
+    create_tables: List[MigrationStatement] = field(default_factory=list)
+    add_columns: List[MigrationStatement] = field(default_factory=list)
+    alter_keys: List[MigrationStatement] = field(default_factory=list)
+    alter_tables: List[MigrationStatement] = field(default_factory=list)
+    add_constraints: List[MigrationStatement] = field(default_factory=list)
+    validate_constraints: List[MigrationStatement] = field(
+        default_factory=list
+    )
+    set_not_null: List[MigrationStatement] = field(default_factory=list)
+    drop_indexes: List[MigrationStatement] = field(default_factory=list)
+    create_indexes: List[MigrationStatement] = field(default_factory=list)
+    drop_columns: List[MigrationStatement] = field(default_factory=list)
+    drop_tables: List[MigrationStatement] = field(default_factory=list)
+
+    def get_statements(self) -> List[MigrationStatement]:
+        return [
+            statement
+            for phase in fields(self)
+            for statement in getattr(self, phase.name)
+        ]
+
+
+class MigrationGenerator(ABC):
+    @abstractmethod
+    def gen_migration(
+        self,
+        old_entities: List[Entity],
+        new_entities: List[Entity],
+        type_mapper: TypeMapper
+    ) -> List[MigrationStatement]:
+        pass
+
+    def gen_migration_file_data(
+        self,
+        old_entities: List[Entity],
+        new_entities: List[Entity],
+        type_mapper: TypeMapper,
+        file_path: str,
+        file_name: str
+    ) -> FileData:
+        return FileData(
+            file_path=file_path,
+            file_name=file_name,
+            file_content=self._gen_migration_script(
+                self.gen_migration(old_entities, new_entities, type_mapper)
+            )
+        )
+
+    def _gen_migration_script(
+        self, statements: List[MigrationStatement]
+    ) -> Iterator[str]:
+        if any(CONCURRENTLY in statement.sql for statement in statements):
+            yield (
+                "-- Concurrent index statements cannot run inside a "
+                "transaction block"
+            )
+
+        for statement in statements:
+            if statement.warning:
+                yield f"{WARNING_PREFIX}{statement.warning}"
+            yield statement.sql
+
+
+class PgsqlMigrationGenerator(MigrationGenerator):
+    """_summary_
+    Diffs two parsed schemas into ordered statements that migrate the tables
+    of the old schema to the new one. Online operations are preferred:
+    columns are added as nullable, NOT NULL and foreign keys are added as
+    NOT VALID constraints validated afterwards, and indexes are built
+    concurrently. Statements that still rewrite or lock a table, or drop
+    data, carry a warning.
+    """
+
+    def __init__(self, table_sql_gen: PgsqlTableSqlGenerator = None):
+        self.table_sql_gen = table_sql_gen or PgsqlTableSqlGenerator()
+
+    def gen_migration(
+        self,
+        old_entities: List[Entity],
+        new_entities: List[Entity],
+        type_mapper: TypeMapper
+    ) -> List[MigrationStatement]:
+        old_tables = {
+            entity.name: EntityFieldData.from_entity(entity, type_mapper)
+            for entity in old_entities
+        }
+        phases = _MigrationPhases()
+        new_names: Set[str] = set()
+        created_tables: List[EntityFieldData] = []
+        for entity in new_entities:
+            new_names.add(entity.name)
+            new_table = EntityFieldData.from_entity(entity, type_mapper)
+            old_table = old_tables.get(entity.name)
+            if old_table:
+                self._diff_table(old_table, new_table, phases)
+            else:
+                created_tables.append(new_table)
+
+        # New tables are created after the new tables they reference
+        levels = _get_table_levels(created_tables)
+        deferred_fks = _get_deferred_fks(levels)
+        for level in levels:
+            for table in level:
+                self._create_table(
+                    table, deferred_fks[table.entity_name], phases
+                )
+
+        # Tables are dropped in reverse schema order
+        for name in reversed(old_tables):
+            if name not in new_names:
+                phases.drop_tables.append(MigrationStatement(
+                    f"DROP TABLE {name};",
+                    warning=f"drops table `{name}` and its data"
+                ))
+
+        return phases.get_statements()
+
+    def _create_table(
+        self,
+        table: EntityFieldData,
+        deferred_fks: Set[str],
+        phases: _MigrationPhases
+    ) -> None:
+        # The table is empty, so its indexes are built with it
+        table_sql = self.table_sql_gen.gen_table_sql(table, deferred_fks)
+        end = next(
+            idx for idx, line in enumerate(table_sql) if line.startswith(")")
+        )
+        phases.create_tables.append(
+            MigrationStatement("\n".join(table_sql[:end + 1]))
+        )
+        phases.create_tables.extend(
+            MigrationStatement(index_sql) for index_sql in table_sql[end + 1:]
+        )
+
+        # Foreign keys on a reference cycle wait for the other tables
+        for fld in table.fk_field_data:
+            if fld.name in deferred_fks:
+                self._add_fk(table.entity_name, fld, phases)
+
+    def _diff_table(
+        self,
+        old_table: EntityFieldData,
+        new_table: EntityFieldData,
+        phases: _MigrationPhases
+    ) -> None:
+        table = new_table.entity_name
+        old_fields = {fld.name: fld for fld in old_table.get_field_data()}
+        old_pks = [fld.name for fld in old_table.pk_field_data]
+        new_pks = [fld.name for fld in new_table.pk_field_data]
+        old_fks = {fld.name: fld for fld in old_table.fk_field_data}
+        new_fks = {fld.name: fld for fld in new_table.fk_field_data}
+
+        self._diff_storage(
+            table, old_table.entity.storage, new_table.entity.storage, phases
+        )
+
+        for fld in new_table.get_field_data():
+            old_fld = old_fields.get(fld.name)
+            is_not_null = fld.is_required or fld.name in new_pks
+            if old_fld is None:
+                phases.add_columns.append(MigrationStatement(
+                    f"ALTER TABLE {table} ADD COLUMN {fld.name} "
+                    f"{self.table_sql_gen.get_column_type(fld)};"
+                ))
+                # The primary key sets its own columns NOT NULL
+                if is_not_null and fld.name not in new_pks:
+                    self._set_not_null(table, fld.name, True, phases)
+                continue
+
+            self._diff_column(table, old_fld, fld, phases)
+            was_not_null = old_fld.is_required or fld.name in old_pks
+            if is_not_null and not was_not_null and fld.name not in new_pks:
+                self._set_not_null(table, fld.name, False, phases)
+            elif was_not_null and not is_not_null:
+                phases.alter_tables.append(MigrationStatement(
+                    f"ALTER TABLE {table} ALTER COLUMN {fld.name} "
+                    "DROP NOT NULL;"
+                ))
+
+        for name, fld in new_fks.items():
+            old_fk = old_fks.get(name)
+            if old_fk and _get_fk_target(old_fk) == _get_fk_target(fld):
+                continue
+            elif old_fk:
+                phases.alter_tables.append(MigrationStatement(
+                    f"ALTER TABLE {table} DROP CONSTRAINT "
+                    f"{self.table_sql_gen.get_fk_name(table, name)};"
+                ))
+            self._add_fk(table, fld, phases)
+
+        new_fields = {fld.name for fld in new_table.get_field_data()}
+        for name in old_fks:
+            if name not in new_fks and name in new_fields:
+                phases.alter_tables.append(MigrationStatement(
+                    f"ALTER TABLE {table} DROP CONSTRAINT "
+                    f"{self.table_sql_gen.get_fk_name(table, name)};"
+                ))
+
+        if old_pks != new_pks:
+            self._alter_pk(table, old_pks, new_pks, phases)
+
+        self._diff_indexes(old_table, new_table, phases)
+
+        for name in old_fields:
+            if name not in new_fields:
+                phases.drop_columns.append(MigrationStatement(
+                    f"ALTER TABLE {table} DROP COLUMN {name};",
+                    warning=f"drops column `{table}.{name}` and its data"
+                ))
+
+    def _diff_storage(
+        self,
+        table: str,
+        old_storage: EntityStorage,
+        new_storage: EntityStorage,
+        phases: _MigrationPhases
+    ) -> None:
+        old_storage = old_storage or EntityStorage()
+        new_storage = new_storage or EntityStorage()
+
+        # Only pages written afterwards use the new fillfactor
+        if new_storage.fillfactor != old_storage.fillfactor:
+            if new_storage.fillfactor is None:
+                sql = f"ALTER TABLE {table} RESET (fillfactor);"
+            else:
+                sql = (
+                    f"ALTER TABLE {table} SET "
+                    f"(fillfactor = {new_storage.fillfactor});"
+                )
+            phases.alter_tables.append(MigrationStatement(sql))
+
+        if new_storage.unlogged != old_storage.unlogged:
+            persistence = "UNLOGGED" if new_storage.unlogged else "LOGGED"
+            phases.alter_tables.append(MigrationStatement(
+                f"ALTER TABLE {table} SET {persistence};",
+                warning=f"rewrites table `{table}` under an ACCESS EXCLUSIVE "
+                "lock"
+            ))
+
+    def _diff_column(
+        self,
+        table: str,
+        old_fld: FieldData,
+        new_fld: FieldData,
+        phases: _MigrationPhases
+    ) -> None:
+        if new_fld.data_type != old_fld.data_type:
+            warning = None
+            if not _is_binary_coercible(old_fld.data_type, new_fld.data_type):
+                warning = (
+                    f"rewrites table `{table}` under an ACCESS EXCLUSIVE "
+                    f"lock, `{new_fld.name}` changes from "
+                    f"{old_fld.data_type} to {new_fld.data_type}"
+                )
+            phases.alter_tables.append(MigrationStatement(
+                f"ALTER TABLE {table} ALTER COLUMN {new_fld.name} TYPE "
+                f"{new_fld.data_type} USING {new_fld.name}::"
+                f"{new_fld.data_type};",
+                warning=warning
+            ))
+
+        # Existing values keep their compression until they are rewritten
+        if new_fld.compression != old_fld.compression:
+            phases.alter_tables.append(MigrationStatement(
+                f"ALTER TABLE {table} ALTER COLUMN {new_fld.name} SET "
+                f"COMPRESSION {new_fld.compression or 'default'};"
+            ))
+
+    def _set_not_null(
+        self,
+        table: str,
+        column: str,
+        is_new_column: bool,
+        phases: _MigrationPhases
+    ) -> None:
+        # A validated check lets SET NOT NULL skip its full table scan under
+        # an ACCESS EXCLUSIVE lock
+        constraint = f"{table}_{column}_not_null".lower()
+        phases.add_constraints.append(MigrationStatement(
+            f"ALTER TABLE {table} ADD CONSTRAINT {constraint} "
+            f"CHECK ({column} IS NOT NULL) NOT VALID;"
+        ))
+        phases.validate_constraints.append(MigrationStatement(
+            f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint};",
+            warning=(
+                f"fails until `{table}.{column}` is backfilled"
+                if is_new_column else None
+            )
+        ))
+        phases.set_not_null.extend([
+            MigrationStatement(
+                f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL;"
+            ),
+            MigrationStatement(
+                f"ALTER TABLE {table} DROP CONSTRAINT {constraint};"
+            )
+        ])
+
+    def _add_fk(
+        self, table: str, fld: FieldData, phases: _MigrationPhases
+    ) -> None:
+        constraint = self.table_sql_gen.get_fk_name(table, fld.name)
+        phases.add_constraints.append(MigrationStatement(
+            f"ALTER TABLE {table} ADD CONSTRAINT {constraint} FOREIGN KEY "
+            f"({fld.name}) REFERENCES {fld.ref_entity_name} "
+            f"({fld.ref_field_name}) NOT VALID;"
+        ))
+        phases.validate_constraints.append(MigrationStatement(
+            f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint};"
+        ))
+
+    def _alter_pk(
+        self,
+        table: str,
+        old_pks: List[str],
+        new_pks: List[str],
+        phases: _MigrationPhases
+    ) -> None:
+        actions: List[str] = []
+        if old_pks:
+            actions.append(f"DROP CONSTRAINT {table.lower()}_pkey")
+        if new_pks:
+            actions.append(f"ADD PRIMARY KEY ({', '.join(new_pks)})")
+
+        phases.alter_keys.append(MigrationStatement(
+            f"ALTER TABLE {table} {', '.join(actions)};",
+            warning=(
+                f"builds the primary key index of `{table}` under an ACCESS "
+                "EXCLUSIVE lock"
+                if new_pks else None
+            )
+        ))
+
+    def _diff_indexes(
+        self,
+        old_table: EntityFieldData,
+        new_table: EntityFieldData,
+        phases: _MigrationPhases
+    ) -> None:
+        table = new_table.entity_name
+        old_indexes = self.table_sql_gen.get_indexes(old_table)
+        new_indexes = self.table_sql_gen.get_indexes(new_table)
+        for name, index in old_indexes.items():
+            if new_indexes.get(name) != index:
+                phases.drop_indexes.append(MigrationStatement(
+                    f"DROP INDEX {CONCURRENTLY} IF EXISTS {name};"
+                ))
+
+        for name, index in new_indexes.items():
+            if old_indexes.get(name) != index:
+                phases.create_indexes.append(MigrationStatement(
+                    self.table_sql_gen.get_index_sql(
+                        table, index, concurrently=True
+                    )
+                ))
+
+
+def _get_fk_target(fld: FieldData) -> Tuple[str, str]:
+    return fld.ref_entity_name, fld.ref_field_name
+
+
+def _get_varchar_length(data_type: str) -> int:
+    prefix = f"{PgSQLDataType.VARCHAR.name}("
+    if not data_type.startswith(prefix):
+        return None
+
+    length = data_type[len(prefix):-1]
+    return int(length) if length.isdigit() else None
+
+
+def _is_binary_coercible(old_type: str, new_type: str) -> bool:
+    # Widening or removing a varchar limit only updates the catalog
+    old_length = _get_varchar_length(old_type)
+    if old_length is None:
+        return False
+    elif new_type == PgSQLDataType.TEXT.name:
+        return True
+
+    new_length = _get_varchar_length(new_type)
+    return new_length is not None and new_length >= old_length
@@ -1,19 +1,52 @@
 from abc import ABC, abstractmethod
-from typing import List, Tuple
+from typing import Dict, Iterator, List, NamedTuple, Set, Tuple
 
 from data_type_mapper.data_type_mapper import TypeMapper
-from entity_parser.entity import Entity, FieldData
+from data_type_mapper.sql_type_mapper import PgSQLDataType
+from entity_parser.entity import Entity, EntityIndex, FieldData, IndexMethod
 from utils.constants import TAB_4
-from utils.utils import EntityFieldData, FileData, remove_last_comma
+from utils.utils import (
+    EntityFieldData, FileData, get_field_data, remove_last_comma
+)
 
 
+DEFAULT_LOAD_DATA_HOOK: str = "-- Load the data here"
 END_TOKEN: str = ";"
 FROM: str = "FROM"
 PRIMARY_KEY: str = "PRIMARY KEY"
+ROOT_ALIAS: str = "t0"
+# Column types indexed with BRIN on append only tables
+BRIN_DATA_TYPES: Tuple[str, ...] = (
+    PgSQLDataType.TIMESTAMPTZ.name,
+    PgSQLDataType.TIMESTAMP.name,
+    PgSQLDataType.DATE.name,
+)
+# Variable length column types left out of covering indexes, large values
+# would bloat the index and can exceed its row size limit
+NON_COVERING_DATA_TYPES: Tuple[str, ...] = (
+    PgSQLDataType.TEXT.name,
+    PgSQLDataType.BYTEA.name,
+    PgSQLDataType.JSON.name,
+    PgSQLDataType.JSONB.name,
+    PgSQLDataType.XML.name,
+)
 SELECT: str = "SELECT"
+SET_FLAG_SUFFIX: str = "_set"
 WHERE: str = "WHERE"
 
 
+class RefJoin(NamedTuple):
+    alias: str
+    parent_alias: str
+    # Names of the reference fields followed from the root entity
+    path: List[str]
+    entity: Entity
+    # Pairs of the referenced key column and the referencing column
+    matched_fields: List[Tuple[str, str]]
+    # Inner joined only when it and all of its parents are required
+    is_required: bool
+
+
 class SqlCommandGenerator(ABC):
     def __init__(
         self,
@@ -27,11 +60,25 @@ class SqlCommandGenerator(ABC):
     def _get_list_where_clause(self) -> str:
         pass
 
-    def _get_joined_fields(self, param_marker: str = "") -> str:
-        field_names = [
-            f"{param_marker}{fld.name}"
-            for fld in self.entity_field_data.get_field_data()
-        ]
+    @abstractmethod
+    def _get_get_many_where_clause(self) -> str:
+        pass
+
+    @abstractmethod
+    def gen_estimate_count_sql_statement(self) -> str:
+        pass
+
+    @abstractmethod
+    def gen_list_by_containment_sql_statement(self, field: FieldData) -> str:
+        pass
+
+    def _get_joined_fields(
+        self, param_marker: str = "", field_data: List[FieldData] = None
+    ) -> str:
+        if field_data is None:
+            field_data = self.entity_field_data.get_field_data()
+
+        field_names = [f"{param_marker}{fld.name}" for fld in field_data]
         return ", ".join(field_names)
 
     def _get_matched_fields(
@@ -50,21 +97,33 @@ class SqlCommandGenerator(ABC):
         pk_fields = self.entity_field_data.pk_field_data
         return f"{WHERE} {self._get_matched_fields(pk_fields, " AND ")}"
 
-    def gen_get_sql_statement(self) -> str:
-        select_part = (
-            f"{SELECT} {self._get_joined_fields()} {FROM} "
+    def _get_select_part(self, field_data: List[FieldData] = None) -> str:
+        joined_fields = self._get_joined_fields(field_data=field_data)
+        return (
+            f"{SELECT} {joined_fields} {FROM} "
             f"{self.entity_field_data.entity_name}"
         )
+
+    def gen_get_sql_statement(
+        self, field_data: List[FieldData] = None
+    ) -> str:
+        select_part = self._get_select_part(field_data)
         if (where_part := self._get_where_clause()):
             return f"{select_part} {where_part}{END_TOKEN}"
         else:
             return select_part + END_TOKEN
 
-    def gen_list_sql_statement(self) -> str:
-        select_part = (
-            f"{SELECT} {self._get_joined_fields()} {FROM} "
-            f"{self.entity_field_data.entity_name}"
-        )
+    def gen_get_many_sql_statement(self) -> str:
+        select_part = self._get_select_part()
+        if (where_part := self._get_get_many_where_clause()):
+            return f"{select_part} {where_part}{END_TOKEN}"
+        else:
+            return select_part + END_TOKEN
+
+    def gen_list_sql_statement(
+        self, field_data: List[FieldData] = None
+    ) -> str:
+        select_part = self._get_select_part(field_data)
         where_part = self._get_list_where_clause()
         if not where_part:
             return select_part + END_TOKEN
@@ -77,6 +136,16 @@ class SqlCommandGenerator(ABC):
             f" LIMIT @limit OFFSET @offset{END_TOKEN}"
         )
 
+    def gen_count_sql_statement(self) -> str:
+        # Counts the rows the list command pages through
+        count_part = (
+            f"{SELECT} COUNT(*) {FROM} {self.entity_field_data.entity_name}"
+        )
+        if (where_part := self._get_list_where_clause()):
+            return f"{count_part} {where_part}{END_TOKEN}"
+        else:
+            return count_part + END_TOKEN
+
     def gen_create_sql_statement(self) -> str:
         return (
             f"INSERT INTO {self.entity_field_data.entity_name}"
@@ -97,6 +166,23 @@ class SqlCommandGenerator(ABC):
         else:
             return update_part + END_TOKEN
 
+    def gen_update_partial_sql_statement(self) -> str:
+        # Columns whose flag is not set keep their value, so the statement
+        # stays static while the caller only sends the changed columns
+        set_fields = ", ".join(
+            f"{fld.name} = CASE WHEN "
+            f"{self.param_marker}{fld.name}{SET_FLAG_SUFFIX} "
+            f"THEN {self.param_marker}{fld.name} ELSE {fld.name} END"
+            for fld in self.entity_field_data.get_non_pk_field_data()
+        )
+        update_part = (
+            f"UPDATE {self.entity_field_data.entity_name} SET {set_fields}"
+        )
+        if (where_clause := self._get_where_clause()):
+            return f"{update_part} {where_clause}{END_TOKEN}"
+        else:
+            return update_part + END_TOKEN
+
     def gen_delete_sql_statement(self) -> str:
         delete_part = f"DELETE {FROM} {self.entity_field_data.entity_name}"
 
@@ -105,10 +191,184 @@ class SqlCommandGenerator(ABC):
         else:
             return delete_part + END_TOKEN
 
+    def get_ref_joins(self, depth: int) -> List[RefJoin]:
+        # Referenced entities without a primary key cannot be joined, the
+        # joins of an entity come right after the join of its parent
+        joins: List[RefJoin] = []
+
+        def visit(
+            entity: Entity,
+            alias: str,
+            path: List[str],
+            is_required: bool,
+            level: int
+        ) -> None:
+            if level > depth:
+                return
+
+            for fld in entity.get_table_ref_fields():
+                ref_entity = fld.ref_entity
+                if not ref_entity.pk_fields:
+                    continue
+
+                # The same names `get_ref_field_data` gives the columns
+                fk_field_data = get_field_data(
+                    non_ref_fields=ref_entity.pk_fields,
+                    parent_field_name=fld.name
+                )
+                join = RefJoin(
+                    alias=f"t{len(joins) + 1}",
+                    parent_alias=alias,
+                    path=path + [fld.name],
+                    entity=ref_entity,
+                    matched_fields=[
+                        (pk.name, fk.name) for pk, fk in zip(
+                            ref_entity.pk_fields, fk_field_data
+                        )
+                    ],
+                    is_required=is_required and fld.is_required
+                )
+                joins.append(join)
+                visit(
+                    ref_entity,
+                    join.alias,
+                    join.path,
+                    join.is_required,
+                    level + 1
+                )
+
+        visit(self.entity_field_data.entity, ROOT_ALIAS, [], True, 1)
+        return joins
+
+    def gen_get_with_refs_sql_statement(self, joins: List[RefJoin]) -> str:
+        columns: List[str] = [
+            f"{ROOT_ALIAS}.{fld.name}"
+            for fld in self.entity_field_data.get_field_data()
+        ]
+        join_parts: List[str] = []
+        for join in joins:
+            columns.extend(
+                f"{join.alias}.{fld.name}"
+                for fld in EntityFieldData.from_entity(
+                    join.entity
+                ).get_field_data()
+            )
+            on_part = " AND ".join(
+                f"{join.alias}.{ref_name} = {join.parent_alias}.{fk_name}"
+                for ref_name, fk_name in join.matched_fields
+            )
+            join_type = "JOIN" if join.is_required else "LEFT JOIN"
+            join_parts.append(
+                f"{join_type} {join.entity.name} {join.alias} ON {on_part}"
+            )
+
+        select_part = (
+            f"{SELECT} {', '.join(columns)} {FROM} "
+            f"{self.entity_field_data.entity_name} {ROOT_ALIAS}"
+        )
+        if join_parts:
+            select_part += " " + " ".join(join_parts)
+
+        pk_fields = self.entity_field_data.pk_field_data
+        if not pk_fields:
+            return select_part + END_TOKEN
+
+        matched_fields = " AND ".join(
+            f"{ROOT_ALIAS}.{fld.name} = {self.param_marker}{fld.name}"
+            for fld in pk_fields
+        )
+        return f"{select_part} {WHERE} {matched_fields}{END_TOKEN}"
+
     def update_entity(self, entity: EntityFieldData) -> None:
         self.entity_field_data = entity
 
 
+def _get_table_levels(
+    tables: List[EntityFieldData]
+) -> List[List[EntityFieldData]]:
+    # Each level holds the tables whose references are all created by the
+    # previous levels
+    names = {table.entity_name for table in tables}
+    references = {
+        table.entity_name: [
+            fld.ref_entity_name for fld in table.fk_field_data
+            if fld.ref_entity_name != table.entity_name
+            and fld.ref_entity_name in names
+        ]
+        for table in tables
+    }
+    placed: Set[str] = set()
+    levels: List[List[EntityFieldData]] = []
+    remaining = tables
+    while remaining:
+        level = [
+            table for table in remaining
+            if placed.issuperset(references[table.entity_name])
+        ]
+        if not level:
+            # Every remaining table waits on another one, so break the cycle
+            # at a table on it and defer its foreign keys
+            cycle_name = _find_cycle_table(remaining[0], references, placed)
+            level = [
+                table for table in remaining
+                if table.entity_name == cycle_name
+            ]
+
+        placed.update(table.entity_name for table in level)
+        levels.append(level)
+        remaining = [
+            table for table in remaining if table.entity_name not in placed
+        ]
+
+    return levels
+
+
+def _get_deferred_fks(
+    levels: List[List[EntityFieldData]]
+) -> Dict[str, Set[str]]:
+    # Foreign keys to a table of the same or a later level are added once
+    # all the tables exist, self references are created with the table
+    table_levels = {
+        table.entity_name: idx
+        for idx, level in enumerate(levels)
+        for table in level
+    }
+    return {
+        table.entity_name: {
+            fld.name for fld in table.fk_field_data
+            if fld.ref_entity_name != table.entity_name
+            and table_levels.get(fld.ref_entity_name, -1) >= idx
+        }
+        for idx, level in enumerate(levels)
+        for table in level
+    }
+
+
+def _find_cycle_table(
+    table: EntityFieldData,
+    references: Dict[str, List[str]],
+    placed: Set[str]
+) -> str:
+    # Follow unplaced references until a table is seen twice
+    seen: Set[str] = set()
+    name = table.entity_name
+    while name not in seen:
+        seen.add(name)
+        name = next(
+            ref_name for ref_name in references[name]
+            if ref_name not in placed
+        )
+    return name
+
+
+def _check_columns(
+    path: str, columns: List[str], column_names: Set[str]
+) -> None:
+    for column in columns:
+        if column not in column_names:
+            raise ValueError(f"`{path}` has no column `{column}`")
+
+
 class PgsqlCommandGenerator(SqlCommandGenerator):
     def _get_list_where_clause(self) -> str:
         matched_field_names: List[str] = [
@@ -125,10 +385,62 @@ class PgsqlCommandGenerator(SqlCommandGenerator):
         joined_matched_fields: str = " AND ".join(matched_field_names)
         return f"{WHERE} {joined_matched_fields}"
 
+    def _get_get_many_where_clause(self) -> str:
+        pk_fields = self.entity_field_data.pk_field_data
+        if not pk_fields:
+            return ""
+        elif len(pk_fields) == 1:
+            fld = pk_fields[0]
+            return f"{WHERE} {fld.name} = ANY({self.param_marker}{fld.name}s)"
+
+        # Composite keys are matched against the rows of the unnested key
+        # arrays, which the planner runs as a semi join
+        pk_names = ", ".join(fld.name for fld in pk_fields)
+        pk_arrays = ", ".join(
+            f"{self.param_marker}{fld.name}s" for fld in pk_fields
+        )
+        return f"{WHERE} ({pk_names}) IN (SELECT * FROM UNNEST({pk_arrays}))"
+
+    def gen_estimate_count_sql_statement(self) -> str:
+        # Scales the tuple density of the last ANALYZE by the current size of
+        # the table, as the planner does, and returns -1 when the table was
+        # never analyzed
+        return (
+            f"{SELECT} CASE WHEN c.reltuples < 0 OR c.relpages = 0 THEN -1 "
+            "ELSE (c.reltuples / c.relpages * (pg_relation_size(c.oid) / "
+            "current_setting('block_size')::int))::bigint END "
+            f"{FROM} pg_class c {WHERE} c.oid = "
+            f"'{self.entity_field_data.entity_name}'::regclass{END_TOKEN}"
+        )
+
+    def gen_list_by_containment_sql_statement(self, field: FieldData) -> str:
+        # `@>` on a jsonb column is answered by its GIN index
+        select_part = self._get_select_part()
+        where_part = (
+            f"{WHERE} {field.name} @> {self.param_marker}{field.name}::jsonb"
+        )
+        order_by_fields: List[str] = [
+            f"{fld.name} ASC" for fld in self.entity_field_data.pk_field_data
+        ]
+        if order_by_fields:
+            where_part += f" ORDER BY {', '.join(order_by_fields)}"
+        return (
+            f"{select_part} {where_part} "
+            f"LIMIT @limit OFFSET @offset{END_TOKEN}"
+        )
+
 
 class TableSqlGenerator(ABC):
     @abstractmethod
-    def gen_table_sql(self, entity: EntityFieldData) -> List[str]:
+    def gen_table_sql(
+        self, entity: EntityFieldData, deferred_fks: Set[str] = frozenset()
+    ) -> List[str]:
+        pass
+
+    @abstractmethod
+    def gen_db_script_batches(
+        self, entities: List[Entity], type_mapper: TypeMapper
+    ) -> List[List[str]]:
         pass
 
     @abstractmethod
@@ -142,9 +454,33 @@ class TableSqlGenerator(ABC):
 
 
 class PgsqlTableSqlGenerator(TableSqlGenerator):
+    def __init__(
+        self,
+        bulk_load: bool = False,
+        load_data_hook: str = DEFAULT_LOAD_DATA_HOOK
+    ):
+        """
+        Args:
+            bulk_load (bool, optional): Whether the db script creates bare
+                tables, then runs `load_data_hook` and only then adds the
+                primary keys, indexes and foreign keys and analyzes the
+                tables, so the load does not maintain them row by row.
+                Defaults to False.
+            load_data_hook (str, optional): The statement of the data load
+                phase of a bulk load script. Defaults to a comment marking
+                where the data is loaded.
+        """
+        self.bulk_load = bulk_load
+        self.load_data_hook = load_data_hook
+
     def _get_nullable_part(self, field: FieldData) -> str:
         return "NOT NULL" if field.is_required else "NULL"
 
+    def get_column_type(self, field: FieldData) -> str:
+        if field.compression:
+            return f"{field.data_type} COMPRESSION {field.compression}"
+        return field.data_type
+
     def _get_pk_field_sql(
         self, pk_fields: List[FieldData]
     ) -> Tuple[List[str], str]:
@@ -155,12 +491,15 @@ class PgsqlTableSqlGenerator(TableSqlGenerator):
         # Handle the case where there is only one primary key field
         elif len(pk_fields) == 1:
             fld = pk_fields[0]
-            field_sql = f"{TAB_4}{fld.name} {fld.data_type} {PRIMARY_KEY},"
+            field_sql = (
+                f"{TAB_4}{fld.name} {self.get_column_type(fld)} "
+                f"{PRIMARY_KEY},"
+            )
             return [field_sql], ""
 
         # Handle the case where there are multiple primary key fields
         field_sql = [
-            f"{TAB_4}{fld.name} {fld.data_type},"
+            f"{TAB_4}{fld.name} {self.get_column_type(fld)},"
             for fld in pk_fields
         ]
         pk_field_names = [fld.name for fld in pk_fields]
@@ -168,14 +507,16 @@ class PgsqlTableSqlGenerator(TableSqlGenerator):
         return field_sql, pk_statement
 
     def _get_fk_field_sql(
-        self, fk_fields: List[FieldData]
+        self, fk_fields: List[FieldData], deferred_fks: Set[str] = frozenset()
     ) -> Tuple[List[str], List[str]]:
         fk_sql, fk_stmts = [], []
         for fld in fk_fields:
             fk_sql.append(
-                f"{TAB_4}{fld.name} {fld.data_type} "
+                f"{TAB_4}{fld.name} {self.get_column_type(fld)} "
                 f"{self._get_nullable_part(fld)},"
             )
+            if fld.name in deferred_fks:
+                continue
             fk_stmts.append(
                 f"{TAB_4}FOREIGN KEY ({fld.name}) REFERENCES "
                 f"{fld.ref_entity_name} ({fld.ref_field_name}),"
@@ -184,22 +525,38 @@ class PgsqlTableSqlGenerator(TableSqlGenerator):
         return fk_sql, fk_stmts
 
     def _get_field_sqls(
-        self, entity: EntityFieldData
+        self,
+        entity: EntityFieldData,
+        deferred_fks: Set[str] = frozenset(),
+        bare: bool = False
     ) -> List[str]:
-        # Get sql field statement for primary key fields
-        sql_strs, pk_statement = self._get_pk_field_sql(entity.pk_field_data)
+        # Get sql field statement for primary key fields, a bare table only
+        # keeps them NOT NULL
+        if bare:
+            sql_strs = [
+                f"{TAB_4}{fld.name} {self.get_column_type(fld)} NOT NULL,"
+                for fld in entity.pk_field_data
+            ]
+            pk_statement = ""
+            deferred_fks = {fld.name for fld in entity.fk_field_data}
+        else:
+            sql_strs, pk_statement = self._get_pk_field_sql(
+                entity.pk_field_data
+            )
 
         # Add non ref fields
         sql_strs.extend([
             (
-                f"{TAB_4}{fld.name} "
-                f"{fld.data_type} {self._get_nullable_part(fld)},"
+                f"{TAB_4}{fld.name} {self.get_column_type(fld)} "
+                f"{self._get_nullable_part(fld)},"
             )
             for fld in entity.other_field_data
         ])
 
         # Add foreign key fields
-        fk_sqls, fk_stmts = self._get_fk_field_sql(entity.fk_field_data)
+        fk_sqls, fk_stmts = self._get_fk_field_sql(
+            entity.fk_field_data, deferred_fks
+        )
         sql_strs.extend(fk_sqls)
 
         # Add primary key statement
@@ -211,35 +568,323 @@ class PgsqlTableSqlGenerator(TableSqlGenerator):
         return sql_strs
 
     def gen_table_sql(
-        self, entity: EntityFieldData
+        self, entity: EntityFieldData, deferred_fks: Set[str] = frozenset()
     ) -> List[str]:
+        sql_strs = self._get_create_table_sql(entity, deferred_fks)
+
+        # Add the indexes of the table
+        sql_strs.extend(
+            self.get_index_sql(entity.entity_name, index)
+            for index in self._get_indexes(entity)
+        )
+        return sql_strs
+
+    def _get_create_table_sql(
+        self,
+        entity: EntityFieldData,
+        deferred_fks: Set[str] = frozenset(),
+        bare: bool = False
+    ) -> List[str]:
+        storage = entity.entity.storage
+
         # create table statement
-        sql_strs = [f"CREATE TABLE IF NOT EXISTS {entity.entity_name} ("]
+        table_kind = (
+            "UNLOGGED TABLE" if storage and storage.unlogged else "TABLE"
+        )
+        sql_strs = [
+            f"CREATE {table_kind} IF NOT EXISTS {entity.entity_name} ("
+        ]
 
         # Add field statements
-        sql_strs.extend(self._get_field_sqls(entity))
+        sql_strs.extend(self._get_field_sqls(entity, deferred_fks, bare))
 
         # trim off last comma
         sql_strs[-1] = remove_last_comma(sql_strs[-1])
 
-        # Close and return create table statement
-        sql_strs.append(");")
+        # Close create table statement
+        if storage and storage.fillfactor is not None:
+            sql_strs.append(f") WITH (fillfactor = {storage.fillfactor});")
+        else:
+            sql_strs.append(");")
         return sql_strs
 
+    def get_indexes(self, entity: EntityFieldData) -> Dict[str, EntityIndex]:
+        # Keyed by the name of the index in the database
+        return {
+            self._get_index_name(entity.entity_name, index): index
+            for index in self._get_indexes(entity)
+        }
+
+    def _get_indexes(self, entity: EntityFieldData) -> List[EntityIndex]:
+        column_names = {fld.name for fld in entity.get_field_data()}
+        indexes: List[EntityIndex] = []
+        for idx, index in enumerate(entity.entity.indexes or []):
+            _check_columns(
+                f"{entity.entity_name}.indexes[{idx}]",
+                index.columns + index.include,
+                column_names
+            )
+            indexes.append(index)
+
+        # Default to GIN on jsonb columns and, when rows are only appended,
+        # BRIN on timestamp columns, unless hinted otherwise
+        hinted = {tuple(index.columns) for index in indexes}
+        for fld in entity.other_field_data:
+            if (fld.name,) in hinted:
+                continue
+            elif fld.data_type == PgSQLDataType.JSONB.name:
+                indexes.append(EntityIndex([fld.name], IndexMethod.GIN))
+            elif (
+                entity.entity.append_only
+                and fld.data_type in BRIN_DATA_TYPES
+            ):
+                indexes.append(EntityIndex([fld.name], IndexMethod.BRIN))
+
+        # Cover the projections hinted as covering so reading them by key
+        # is an index only scan
+        pk_names = [fld.name for fld in entity.pk_field_data]
+        large_names = {
+            fld.name for fld in entity.get_field_data()
+            if fld.data_type in NON_COVERING_DATA_TYPES
+        }
+        projections = entity.entity.projections or {}
+        for name in entity.entity.covering_projections or []:
+            columns = projections[name]
+            _check_columns(
+                f"{entity.entity_name}.projections.{name}",
+                columns,
+                column_names
+            )
+            include = [
+                column for column in columns
+                if column not in pk_names and column not in large_names
+            ]
+            if pk_names and include:
+                indexes.append(EntityIndex(
+                    columns=pk_names,
+                    include=include,
+                    name=f"{entity.entity_name}_{name}_idx".lower()
+                ))
+
+        # `IF NOT EXISTS` would silently skip an index reusing a name
+        names: Set[str] = set()
+        for index in indexes:
+            name = self._get_index_name(entity.entity_name, index)
+            if name in names:
+                raise ValueError(
+                    f"`{entity.entity_name}` has more than one index named "
+                    f"`{name}`, name them with the `name` hint"
+                )
+            names.add(name)
+
+        return indexes
+
+    def _get_index_name(self, table_name: str, index: EntityIndex) -> str:
+        name_parts = [table_name, *index.columns]
+        if index.method != IndexMethod.BTREE:
+            name_parts.append(index.method.value)
+        if index.include:
+            name_parts.append("covering")
+        if index.where:
+            name_parts.append("partial")
+        return index.name or "_".join(name_parts + ["idx"]).lower()
+
+    def get_index_sql(
+        self, table_name: str, index: EntityIndex, concurrently: bool = False
+    ) -> str:
+        # Concurrent builds do not block writes but cannot run inside a
+        # transaction
+        create = "CREATE INDEX"
+        if concurrently:
+            create += " CONCURRENTLY"
+        name = self._get_index_name(table_name, index)
+        index_sql = f"{create} IF NOT EXISTS {name} ON {table_name}"
+        if index.method != IndexMethod.BTREE:
+            index_sql += f" USING {index.method.name}"
+
+        index_sql += f" ({', '.join(index.columns)})"
+        if index.include:
+            index_sql += f" INCLUDE ({', '.join(index.include)})"
+        if index.where:
+            index_sql += f" {WHERE} {index.where}"
+        return index_sql + END_TOKEN
+
+    def get_fk_name(self, table_name: str, column: str) -> str:
+        # The name PostgreSQL gives the inline foreign keys of the script
+        return f"{table_name}_{column}_fkey".lower()
+
+    def get_fk_sql(self, table_name: str, field: FieldData) -> str:
+        return (
+            f"ALTER TABLE {table_name} ADD CONSTRAINT "
+            f"{self.get_fk_name(table_name, field.name)} FOREIGN KEY "
+            f"({field.name}) REFERENCES {field.ref_entity_name} "
+            f"({field.ref_field_name}){END_TOKEN}"
+        )
+
+    def _get_guarded_constraint_sql(
+        self, constraint_name: str, constraint_sql: str
+    ) -> str:
+        # `ADD CONSTRAINT` has no `IF NOT EXISTS`, so the script checks the
+        # catalog to stay re-runnable like the rest of its statements
+        return "\n".join([
+            "DO $$",
+            "BEGIN",
+            f"{TAB_4}IF NOT EXISTS (",
+            f"{TAB_4 * 2}SELECT 1 FROM pg_constraint "
+            f"WHERE conname = '{constraint_name}'",
+            f"{TAB_4}) THEN",
+            f"{TAB_4 * 2}{constraint_sql}",
+            f"{TAB_4}END IF;",
+            f"END $${END_TOKEN}"
+        ])
+
+    def gen_db_script_batches(
+        self, entities: List[Entity], type_mapper: TypeMapper
+    ) -> List[List[str]]:
+        """ Splits the db script into batches that run in order. The
+        statements of a batch do not depend on each other, so they can run
+        concurrently on separate connections.
+
+        Tables come first, one batch per dependency level, followed by the
+        indexes and then the foreign keys deferred to break reference
+        cycles. With `bulk_load` the bare tables come first, followed by the
+        load data hook, the primary keys, the indexes, the foreign keys and
+        the statements analyzing the loaded tables. Constraints are only
+        added when missing, so the script can run again.
+
+        Args:
+            entities (List[Entity]): The entities to create tables for.
+            type_mapper (TypeMapper): Maps the fields to column types.
+
+        Returns:
+            List[List[str]]: The batches of sql statements.
+        """
+        return list(self._iter_db_script_batches(entities, type_mapper))
+
+    def _iter_db_script_batches(
+        self, entities: List[Entity], type_mapper: TypeMapper
+    ) -> Iterator[List[str]]:
+        # Only the table order and the deferred foreign keys are computed up
+        # front, the sql of each batch is built when the batch is reached
+        tables = [
+            EntityFieldData.from_entity(entity, type_mapper)
+            for entity in entities
+        ]
+        if self.bulk_load:
+            yield from self._gen_bulk_load_batches(tables)
+            return
+
+        levels = _get_table_levels(tables)
+        table_deferred_fks = _get_deferred_fks(levels)
+        for level in levels:
+            yield [
+                "\n".join(self._get_create_table_sql(
+                    table, table_deferred_fks[table.entity_name]
+                ))
+                for table in level
+            ]
+
+        index_batch = self._get_index_batch(tables)
+        if index_batch:
+            yield index_batch
+
+        yield from self._get_fk_batches([
+            (table.entity_name, fld)
+            for table in tables
+            for fld in table.fk_field_data
+            if fld.name in table_deferred_fks[table.entity_name]
+        ])
+
+    def _gen_bulk_load_batches(
+        self, tables: List[EntityFieldData]
+    ) -> Iterator[List[str]]:
+        # Bare tables have no foreign keys, so they are all created at once
+        yield [
+            "\n".join(self._get_create_table_sql(table, bare=True))
+            for table in tables
+        ]
+        yield [self.load_data_hook]
+        pk_batch = [
+            self._get_guarded_constraint_sql(
+                f"{table.entity_name}_pkey".lower(),
+                f"ALTER TABLE {table.entity_name} ADD {PRIMARY_KEY} "
+                f"({', '.join(fld.name for fld in table.pk_field_data)})"
+                f"{END_TOKEN}"
+            )
+            for table in tables
+            if table.pk_field_data
+        ]
+        if pk_batch:
+            yield pk_batch
+
+        index_batch = self._get_index_batch(tables)
+        if index_batch:
+            yield index_batch
+
+        yield from self._get_fk_batches([
+            (table.entity_name, fld)
+            for table in tables
+            for fld in table.fk_field_data
+        ])
+
+        # Refresh the planner statistics of the loaded tables
+        if tables:
+            yield [
+                f"ANALYZE {table.entity_name}{END_TOKEN}" for table in tables
+            ]
+
+    def _get_index_batch(self, tables: List[EntityFieldData]) -> List[str]:
+        return [
+            self.get_index_sql(table.entity_name, index)
+            for table in tables
+            for index in self._get_indexes(table)
+        ]
+
+    def _get_fk_batches(
+        self, foreign_keys: List[Tuple[str, FieldData]]
+    ) -> List[List[str]]:
+        # Adding a foreign key locks both tables, so statements sharing a
+        # table are kept in separate batches to rule out deadlocks
+        fk_batches: List[Tuple[Set[str], List[str]]] = []
+        for table_name, fld in foreign_keys:
+            locked = {table_name, fld.ref_entity_name}
+            fk_batch = next(
+                (
+                    fk_batch for fk_batch in fk_batches
+                    if not fk_batch[0] & locked
+                ),
+                None
+            )
+            if fk_batch is None:
+                fk_batch = (set(), [])
+                fk_batches.append(fk_batch)
+            fk_batch[0].update(locked)
+            fk_batch[1].append(self._get_guarded_constraint_sql(
+                self.get_fk_name(table_name, fld.name),
+                self.get_fk_sql(table_name, fld)
+            ))
+
+        return [fk_batch for _, fk_batch in fk_batches]
+
     def gen_db_scripts_file_data(
         self, entities: List[Entity],
         type_mapper: TypeMapper,
         file_path: str,
         file_name: str
     ) -> FileData:
-        file_content: List[str] = []
-        for entity in entities:
-            entity_data = EntityFieldData.from_entity(entity, type_mapper)
-            file_content += self.gen_table_sql(entity_data)
-            file_content.append("")
-
         return FileData(
             file_path=file_path,
             file_name=file_name,
-            file_content=file_content
+            file_content=self._gen_db_scripts(entities, type_mapper)
         )
+
+    def _gen_db_scripts(
+        self, entities: List[Entity], type_mapper: TypeMapper
+    ) -> Iterator[str]:
+        # Each batch is built when the content reaches it
+        batches = self._iter_db_script_batches(entities, type_mapper)
+        for idx, batch in enumerate(batches, 1):
+            yield f"-- Batch {idx}"
+            for statement in batch:
+                yield from statement.split("\n")
+                yield ""
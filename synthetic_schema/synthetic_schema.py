@@ -0,0 +1,381 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import json
+import random
+from typing import Any, Dict, Iterator, List, Tuple
+import uuid
+
+from data_type_mapper.data_type_mapper import TypeMapper
+from data_type_mapper.sql_type_mapper import PgsqlTypeMapper, PgSQLDataType
+from entity_parser.entity import Entity, FieldData
+from utils.utils import EntityFieldData
+
+
+DEFINITIONS: str = "definitions"
+SUB_DEFINITION: str = "$defs"
+BASE_DATETIME: datetime = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+FIELD_DEFS: List[Dict[str, Any]] = [
+    {"type": "string", "maxLength": 50},
+    {"type": "string", "maxLength": 200},
+    {"type": "string"},
+    {"type": "string", "format": "uuid"},
+    {"type": "string", "format": "date-time"},
+    {"type": "string", "format": "date"},
+    {"type": "string", "format": "json"},
+    {"type": "integer"},
+    {"type": "integer", "minimum": 1, "maximum": 1000},
+    {"type": "number", "format": "decimal"},
+    {"type": "boolean"},
+]
+# Production schemas are dominated by short strings and integers
+FIELD_DEF_WEIGHTS: List[int] = [30, 10, 8, 6, 8, 3, 2, 12, 6, 8, 7]
+SUB_DEF_FIELDS: List[List[str]] = [
+    ["street", "city", "postal_code"],
+    ["region", "country_code"],
+    ["district", "zone"],
+]
+
+
+@dataclass
+class SchemaProfile:
+    entity_count: int = 50
+    # Field counts follow a Zipf distribution between min and max fields
+    min_fields: int = 2
+    max_fields: int = 40
+    zipf_exponent: float = 1.2
+    ref_density: float = 0.1
+    self_ref_ratio: float = 0.1
+    defs_depth: int = 2
+    sub_def_ratio: float = 0.2
+    composite_key_ratio: float = 0.1
+    enum_ratio: float = 0.1
+
+
+PROFILES: Dict[str, SchemaProfile] = {
+    "small": SchemaProfile(entity_count=10, max_fields=12),
+    "production": SchemaProfile(),
+    "wide": SchemaProfile(
+        entity_count=30, min_fields=20, max_fields=200, zipf_exponent=0.8
+    ),
+    "deep": SchemaProfile(
+        entity_count=30, ref_density=0.3, defs_depth=5, sub_def_ratio=0.5
+    ),
+}
+
+
+class SyntheticSchemaGenerator:
+    """_summary_
+    Generates reproducible json schemas shaped like production schemas and
+    sample rows for the tables generated from them. The same seed and
+    profile always produce the same output.
+    """
+
+    def __init__(self, profile: SchemaProfile = None, seed: int = 0):
+        self.profile = profile or SchemaProfile()
+        self.seed = seed
+
+    def gen_schema(self) -> Dict[str, Any]:
+        rand = random.Random(self.seed)
+        profile = self.profile
+        enum_names = [
+            f"Enum{idx}"
+            for idx in range(int(profile.entity_count * profile.enum_ratio))
+        ]
+        sub_def_names = [f"Address{idx}" for idx in range(profile.defs_depth)]
+
+        definitions: Dict[str, Any] = {
+            name: {
+                "enum": [f"VALUE_{idx}" for idx in range(rand.randint(2, 8))]
+            }
+            for name in enum_names
+        }
+        for idx in range(profile.entity_count):
+            definitions[f"Entity{idx}"] = self._gen_entity_def(
+                rand, idx, enum_names, sub_def_names
+            )
+
+        schema: Dict[str, Any] = {
+            "$schema": "http://json-schema.org/draft-07/schema#",
+            DEFINITIONS: definitions
+        }
+        if sub_def_names:
+            schema[SUB_DEFINITION] = self._gen_sub_defs(sub_def_names)
+
+        return schema
+
+    def gen_schema_content(self) -> str:
+        return json.dumps(self.gen_schema())
+
+    def gen_rows(
+        self,
+        entities: List[Entity],
+        row_count: int,
+        type_mapper: TypeMapper = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """ Generates sample rows for the tables of the given entities.
+
+        Foreign keys point at rows generated for the referenced tables, and
+        self-references point at earlier rows of the same table or the row
+        itself. A required foreign key to a table on a reference cycle,
+        whose rows come later, points at a key those rows will have.
+
+        Args:
+            entities (List[Entity]): The entities parsed from the schema.
+            row_count (int): The number of rows generated per table.
+            type_mapper (TypeMapper, optional): Maps the fields to the column
+                types the rows are inserted into. Defaults to
+                PgsqlTypeMapper().
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: The rows keyed by table name.
+        """
+        rand = random.Random(self.seed)
+        type_mapper = type_mapper or PgsqlTypeMapper()
+        entities_by_name = {entity.name: entity for entity in entities}
+        rows: Dict[str, List[Dict[str, Any]]] = {}
+        for entity in self._get_table_entities(entities):
+            entity_data = EntityFieldData.from_entity(entity, type_mapper)
+            table_rows: List[Dict[str, Any]] = []
+            rows[entity.name] = table_rows
+            for row_idx in range(row_count):
+                row = {
+                    fld.name: self._gen_pk_value(fld, row_idx)
+                    for fld in entity_data.pk_field_data
+                }
+                for fld in entity_data.other_field_data:
+                    row[fld.name] = self._gen_value(
+                        rand, fld, entities_by_name
+                    )
+
+                for ref_fields in self._group_fk_fields(
+                    entity_data.fk_field_data
+                ).values():
+                    ref_name = ref_fields[0].ref_entity_name
+                    ref_rows = rows.get(ref_name, [])
+                    if ref_name == entity.name:
+                        ref_rows = table_rows + [row]
+                    ref_row = rand.choice(ref_rows) if ref_rows else None
+                    is_required = any(fld.is_required for fld in ref_fields)
+                    ref_idx = rand.randrange(row_count)
+                    for fld in ref_fields:
+                        if ref_row:
+                            row[fld.name] = ref_row[fld.ref_field_name]
+                        elif is_required:
+                            row[fld.name] = self._gen_pk_value(fld, ref_idx)
+                        else:
+                            row[fld.name] = None
+
+                table_rows.append(row)
+
+        return rows
+
+    def gen_insert_sql(
+        self,
+        rows: Dict[str, List[Dict[str, Any]]],
+        skip_existing: bool = False
+    ) -> Iterator[str]:
+        # Skipping the rows whose keys exist lets the script run again
+        conflict = " ON CONFLICT DO NOTHING" if skip_existing else ""
+        for table_name, table_rows in rows.items():
+            for row in table_rows:
+                columns = ", ".join(row)
+                values = ", ".join(
+                    _to_sql_literal(value) for value in row.values()
+                )
+                yield (
+                    f"INSERT INTO {table_name} ({columns}) "
+                    f"VALUES ({values}){conflict};"
+                )
+
+    def _gen_entity_def(
+        self,
+        rand: random.Random,
+        idx: int,
+        enum_names: List[str],
+        sub_def_names: List[str]
+    ) -> Dict[str, Any]:
+        profile = self.profile
+        properties: Dict[str, Any] = {}
+        if rand.random() < profile.composite_key_ratio:
+            properties["tenant_id"] = {"type": "integer", "primaryKey": True}
+            properties["local_id"] = {"type": "integer", "primaryKey": True}
+        else:
+            properties["id"] = {"type": "integer"}
+
+        for fld_idx in range(self._gen_field_count(rand)):
+            fld_name = f"field_{fld_idx}"
+            if idx and rand.random() < profile.ref_density:
+                ref_name = f"Entity{rand.randrange(idx)}"
+                properties[fld_name] = {"$ref": f"#/{DEFINITIONS}/{ref_name}"}
+            elif enum_names and rand.random() < profile.enum_ratio:
+                ref_name = rand.choice(enum_names)
+                properties[fld_name] = {"$ref": f"#/{DEFINITIONS}/{ref_name}"}
+            else:
+                properties[fld_name] = dict(
+                    rand.choices(FIELD_DEFS, weights=FIELD_DEF_WEIGHTS)[0]
+                )
+
+        if rand.random() < profile.self_ref_ratio:
+            properties["parent"] = {"$ref": f"#/{DEFINITIONS}/Entity{idx}"}
+
+        if sub_def_names and rand.random() < profile.sub_def_ratio:
+            properties["address"] = {
+                "$ref": f"#/{SUB_DEFINITION}/{sub_def_names[0]}"
+            }
+
+        required = [
+            name for name, prop in properties.items()
+            if name != "parent" and (
+                prop.get("primaryKey") or rand.random() < 0.5
+            )
+        ]
+        return {
+            "type": "object",
+            "properties": properties,
+            "required": required
+        }
+
+    def _gen_field_count(self, rand: random.Random) -> int:
+        counts = range(self.profile.min_fields, self.profile.max_fields + 1)
+        weights = [
+            1 / (rank ** self.profile.zipf_exponent)
+            for rank in range(1, len(counts) + 1)
+        ]
+        return rand.choices(counts, weights=weights)[0]
+
+    def _gen_sub_defs(self, sub_def_names: List[str]) -> Dict[str, Any]:
+        # Each level embeds the next one and declares it in its own `$defs`
+        name = sub_def_names[0]
+        prefix = name.lower()
+        field_names = SUB_DEF_FIELDS[len(sub_def_names) % len(SUB_DEF_FIELDS)]
+        properties: Dict[str, Any] = {
+            f"{prefix}_{fld_name}": {"type": "string", "maxLength": 100}
+            for fld_name in field_names
+        }
+        sub_def: Dict[str, Any] = {
+            "type": "object",
+            "properties": properties,
+            "required": list(properties)
+        }
+        if len(sub_def_names) > 1:
+            properties[f"{prefix}_detail"] = {
+                "$ref": f"#/{SUB_DEFINITION}/{sub_def_names[1]}"
+            }
+            sub_def[SUB_DEFINITION] = self._gen_sub_defs(sub_def_names[1:])
+
+        return {name: sub_def}
+
+    def _get_table_entities(self, entities: List[Entity]) -> List[Entity]:
+        # Referenced tables come first so their rows exist for foreign keys
+        ordered: Dict[str, Entity] = {}
+
+        def visit(entity: Entity) -> None:
+            if entity.name in ordered or entity.is_enum or entity.is_sub_def:
+                return
+
+            ordered[entity.name] = entity
+            for fld in entity.ref_fields:
+                if fld.ref_entity.name != entity.name:
+                    visit(fld.ref_entity)
+
+            # Move after its references
+            ordered[entity.name] = ordered.pop(entity.name)
+
+        for entity in entities:
+            visit(entity)
+
+        return list(ordered.values())
+
+    def _group_fk_fields(
+        self, fk_field_data: List[FieldData]
+    ) -> Dict[Tuple[str, str], List[FieldData]]:
+        # The fields of a composite foreign key share the referencing
+        # field name as a prefix
+        groups: Dict[Tuple[str, str], List[FieldData]] = {}
+        for fld in fk_field_data:
+            prefix = fld.name[:len(fld.name) - len(fld.ref_field_name)]
+            groups.setdefault((fld.ref_entity_name, prefix), []).append(fld)
+
+        return groups
+
+    def _gen_pk_value(self, fld: FieldData, row_idx: int) -> Any:
+        if fld.data_type == PgSQLDataType.UUID.name:
+            return str(uuid.UUID(int=row_idx + 1))
+        elif fld.data_type.startswith(PgSQLDataType.VARCHAR.name):
+            return f"key-{row_idx + 1}"
+        return row_idx + 1
+
+    def _gen_value(
+        self,
+        rand: random.Random,
+        fld: FieldData,
+        entities_by_name: Dict[str, Entity]
+    ) -> Any:
+        ref_entity = entities_by_name.get(fld.ref_entity_name)
+        if ref_entity and ref_entity.is_enum:
+            return rand.choice(ref_entity.enum_values)
+
+        data_type = fld.data_type
+        if data_type in (
+            PgSQLDataType.SMALLINT.name,
+            PgSQLDataType.INTEGER.name,
+            PgSQLDataType.BIGINT.name
+        ):
+            return rand.randint(1, 1000)
+        elif data_type in (
+            PgSQLDataType.DOUBLE.name, PgSQLDataType.REAL.name
+        ):
+            return round(rand.uniform(0, 1000), 2)
+        elif data_type == PgSQLDataType.BOOLEAN.name:
+            return rand.random() < 0.5
+        elif data_type == PgSQLDataType.UUID.name:
+            return str(uuid.UUID(int=rand.getrandbits(128)))
+        elif data_type == PgSQLDataType.TIME.name:
+            delta = timedelta(seconds=rand.randrange(24 * 3600))
+            return (BASE_DATETIME + delta).time().isoformat()
+        elif data_type == PgSQLDataType.TIMESTAMPTZ.name:
+            delta = timedelta(seconds=rand.randrange(365 * 24 * 3600))
+            return (BASE_DATETIME + delta).isoformat()
+        elif data_type == PgSQLDataType.DATE.name:
+            delta = timedelta(days=rand.randrange(365))
+            return (BASE_DATETIME + delta).date().isoformat()
+        elif data_type in (PgSQLDataType.JSON.name, PgSQLDataType.JSONB.name):
+            return json.dumps({"value": rand.randint(1, 1000)})
+        elif data_type == PgSQLDataType.CIDR.name:
+            return f"10.{rand.randrange(256)}.{rand.randrange(256)}.0/24"
+        elif data_type == PgSQLDataType.INET.name:
+            return "10." + ".".join(
+                str(rand.randrange(256)) for _ in range(3)
+            )
+        elif data_type == PgSQLDataType.MACADDR.name:
+            return "08:00:2b:" + ":".join(
+                f"{rand.randrange(256):02x}" for _ in range(3)
+            )
+        elif data_type == PgSQLDataType.BYTEA.name:
+            return rand.getrandbits(64).to_bytes(8, "big")
+
+        max_length = _get_max_length(data_type)
+        value = f"{fld.name}-{rand.getrandbits(32):08x}"
+        return value[:max_length] if max_length else value
+
+
+def _get_max_length(data_type: str) -> int:
+    if not data_type.startswith(f"{PgSQLDataType.VARCHAR.name}("):
+        return None
+
+    length = data_type[len(PgSQLDataType.VARCHAR.name) + 1:-1]
+    return int(length) if length.isdigit() else None
+
+
+def _to_sql_literal(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    elif isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    elif isinstance(value, (int, float)):
+        return str(value)
+    elif isinstance(value, bytes):
+        return f"'\\x{value.hex()}'"
+    escaped = str(value).replace("'", "''")
+    return f"'{escaped}'"
@@ -5,7 +5,8 @@ from unittest.mock import mock_open, patch
 from parameterized import parameterized
 
 from entity_parser.entity import (
-    Entity, EntityField, FieldFormat, FieldType, RefEntityField
+    Entity, EntityCache, EntityField, EntityIndex, EntityStorage, FieldFormat,
+    FieldType, IndexMethod, RefEntityField
 )
 from entity_parser.entity_parser import JsonSchemaParser
 
@@ -437,6 +438,280 @@ INVALID_JSON_TYPE: str = '''
 }
 '''
 
+CACHE_HINT_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Brand": {
+      "type": "object",
+      "cache": {"ttlSeconds": 30},
+      "properties": {
+        "id": {"type": "integer"},
+        "name": {"type": "string", "maxLength": 50}
+      },
+      "required": ["id", "name"]
+    },
+    "Category": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"}
+      }
+    }
+  }
+}
+'''
+
+INVALID_CACHE_HINT_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Brand": {
+      "type": "object",
+      "cache": {"ttlSeconds": 0},
+      "properties": {
+        "id": {"type": "integer"}
+      }
+    }
+  }
+}
+'''
+
+PROJECTIONS_HINT_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Brand": {
+      "type": "object",
+      "projections": {
+        "Summary": ["id", "name"],
+        "Detail": {"columns": ["id", "description"], "covering": true}
+      },
+      "properties": {
+        "id": {"type": "integer"},
+        "name": {"type": "string", "maxLength": 50},
+        "description": {"type": "string", "maxLength": "max"}
+      },
+      "required": ["id", "name"]
+    }
+  }
+}
+'''
+
+INVALID_PROJECTIONS_HINT_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Brand": {
+      "type": "object",
+      "projections": {"Summary": []},
+      "properties": {
+        "id": {"type": "integer"}
+      }
+    }
+  }
+}
+'''
+
+INVALID_COVERING_PROJECTION_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Brand": {
+      "type": "object",
+      "projections": {"Summary": {"columns": ["id"], "covering": "yes"}},
+      "properties": {
+        "id": {"type": "integer"}
+      }
+    }
+  }
+}
+'''
+
+INDEXES_HINT_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Event": {
+      "type": "object",
+      "appendOnly": true,
+      "indexes": [
+        {"columns": ["kind"], "include": ["name"]},
+        {
+          "columns": ["payload"],
+          "method": "gin",
+          "where": "deleted_at IS NULL",
+          "name": "event_payload_live_idx"
+        }
+      ],
+      "properties": {
+        "id": {"type": "integer"},
+        "kind": {"type": "string", "maxLength": 20},
+        "name": {"type": "string", "maxLength": 50},
+        "payload": {"type": "string", "format": "json"},
+        "deleted_at": {"type": "string", "format": "date-time"}
+      },
+      "required": ["id", "kind"]
+    }
+  }
+}
+'''
+
+INVALID_INDEX_METHOD_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Event": {
+      "type": "object",
+      "indexes": [{"columns": ["id"], "method": "bitmap"}],
+      "properties": {
+        "id": {"type": "integer"}
+      }
+    }
+  }
+}
+'''
+
+INVALID_INDEX_INCLUDE_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Event": {
+      "type": "object",
+      "indexes": [{"columns": ["id"], "method": "brin", "include": ["id"]}],
+      "properties": {
+        "id": {"type": "integer"}
+      }
+    }
+  }
+}
+'''
+
+FILTERABLE_HINT_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Event": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"},
+        "payload": {"type": "string", "format": "json", "filterable": true},
+        "meta": {"type": "string", "format": "json"}
+      },
+      "required": ["id"]
+    }
+  }
+}
+'''
+
+INVALID_FILTERABLE_HINT_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Event": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"},
+        "name": {"type": "string", "filterable": true}
+      }
+    }
+  }
+}
+'''
+
+STORAGE_HINT_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Product": {
+      "type": "object",
+      "storage": {"fillfactor": 80},
+      "properties": {
+        "id": {"type": "integer"},
+        "description": {"type": "string", "compression": "lz4"},
+        "image": {"type": "string", "format": "byte", "compression": "pglz"},
+        "name": {"type": "string", "maxLength": 50}
+      }
+    },
+    "ProductStaging": {
+      "type": "object",
+      "storage": {"unlogged": true},
+      "properties": {
+        "id": {"type": "integer"},
+        "product": {"$ref": "#/definitions/Product"}
+      }
+    }
+  }
+}
+'''
+
+INVALID_FILLFACTOR_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Product": {
+      "type": "object",
+      "storage": {"fillfactor": 5},
+      "properties": {
+        "id": {"type": "integer"}
+      }
+    }
+  }
+}
+'''
+
+APPEND_ONLY_FILLFACTOR_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Event": {
+      "type": "object",
+      "appendOnly": true,
+      "storage": {"fillfactor": 90},
+      "properties": {
+        "id": {"type": "integer"}
+      }
+    }
+  }
+}
+'''
+
+INVALID_COMPRESSION_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Product": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"},
+        "price": {"type": "number", "compression": "lz4"}
+      }
+    }
+  }
+}
+'''
+
+UNLOGGED_REF_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "ProductStaging": {
+      "type": "object",
+      "storage": {"unlogged": true},
+      "properties": {
+        "id": {"type": "integer"}
+      }
+    },
+    "Product": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"},
+        "staging": {"$ref": "#/definitions/ProductStaging"}
+      }
+    }
+  }
+}
+'''
+
 COMPOSITE_PRIMARY_KEY_SCHEMA: str = '''
 {
   "$schema": "http://json-schema.org/draft-07/schema#",
@@ -1474,6 +1749,50 @@ class TestJsonSchemaParser(unittest.TestCase):
         (
             INVALID_REF_JSON_SCHEMA,
             "Json schema contains invalid ref `#/definitions/files/Category`",
+        ),
+        (
+            INVALID_CACHE_HINT_SCHEMA,
+            "`Brand.cache.ttlSeconds` must be a positive integer"
+        ),
+        (
+            INVALID_PROJECTIONS_HINT_SCHEMA,
+            "`Brand.projections.Summary` must be a non-empty list of column "
+            "names"
+        ),
+        (
+            INVALID_COVERING_PROJECTION_SCHEMA,
+            "`Brand.projections.Summary.covering` must be a boolean"
+        ),
+        (
+            INVALID_INDEX_METHOD_SCHEMA,
+            "`Event.indexes[0].method` must be one of btree, hash, brin, "
+            "gin, gist"
+        ),
+        (
+            INVALID_INDEX_INCLUDE_SCHEMA,
+            "`Event.indexes[0].include` is not supported by brin indexes"
+        ),
+        (
+            INVALID_FILTERABLE_HINT_SCHEMA,
+            "`Event.name.filterable` is only supported on json fields"
+        ),
+        (
+            INVALID_FILLFACTOR_SCHEMA,
+            "`Product.storage.fillfactor` must be an integer between 10 and "
+            "100"
+        ),
+        (
+            APPEND_ONLY_FILLFACTOR_SCHEMA,
+            "`Event.storage.fillfactor` cannot be set on an append only table"
+        ),
+        (
+            INVALID_COMPRESSION_SCHEMA,
+            "`Product.price.compression` is only supported on text, json and "
+            "byte fields"
+        ),
+        (
+            UNLOGGED_REF_SCHEMA,
+            "`Product.staging` references the unlogged table `ProductStaging`"
         )
     ])
     def test_parser_errors(self, file_content: str, error_message: str):
@@ -1484,3 +1803,105 @@ class TestJsonSchemaParser(unittest.TestCase):
             textwrap.dedent(error_message),
             textwrap.dedent(str(context.exception))
         )
+
+    def test_parser_cache_hint(self):
+        entities = {
+            entity.name: entity
+            for entity in self.parser.parse(file_content=CACHE_HINT_SCHEMA)
+        }
+        self.assertEqual(
+            EntityCache(ttl_seconds=30, size_limit=10000),
+            entities[BRAND].cache
+        )
+        self.assertIsNone(entities[CATEGORY].cache)
+
+    def test_parser_projections_hint(self):
+        entities = self.parser.parse(file_content=PROJECTIONS_HINT_SCHEMA)
+        self.assertEqual(
+            {"Summary": ["id", "name"], "Detail": ["id", "description"]},
+            entities[0].projections
+        )
+        self.assertEqual(["Detail"], entities[0].covering_projections)
+
+    def test_parser_filterable_hint(self):
+        entities = self.parser.parse(file_content=FILTERABLE_HINT_SCHEMA)
+        self.assertEqual(
+            {"payload": True, "meta": False},
+            {
+                fld.name: fld.is_filterable
+                for fld in entities[0].non_ref_fields
+            }
+        )
+
+    def test_parser_indexes_hint(self):
+        entities = self.parser.parse(file_content=INDEXES_HINT_SCHEMA)
+        self.assertTrue(entities[0].append_only)
+        self.assertEqual(
+            [
+                EntityIndex(columns=["kind"], include=["name"]),
+                EntityIndex(
+                    columns=["payload"],
+                    method=IndexMethod.GIN,
+                    where="deleted_at IS NULL",
+                    name="event_payload_live_idx"
+                ),
+            ],
+            entities[0].indexes
+        )
+
+    def test_parser_storage_hint(self):
+        entities = {
+            entity.name: entity
+            for entity in self.parser.parse(file_content=STORAGE_HINT_SCHEMA)
+        }
+        self.assertEqual(
+            EntityStorage(fillfactor=80), entities["Product"].storage
+        )
+        self.assertEqual(
+            EntityStorage(unlogged=True), entities["ProductStaging"].storage
+        )
+        self.assertEqual(
+            {"description": "lz4", "image": "pglz", "name": None},
+            {
+                fld.name: fld.compression
+                for fld in entities["Product"].non_ref_fields
+            }
+        )
+
+    @parameterized.expand([
+        (
+            "entity_ref",
+            SELF_REF_AND_ENTITY_REF_SCHEMA,
+            [BRAND],
+            {BRAND, "Product"}
+        ),
+        (
+            "self_ref",
+            SELF_REF_AND_ENTITY_REF_SCHEMA,
+            [CATEGORY],
+            {CATEGORY, "Product"}
+        ),
+        (
+            "not_referenced",
+            SELF_REF_AND_ENTITY_REF_SCHEMA,
+            ["Product"],
+            {"Product"}
+        ),
+        (
+            "transitive_sub_def_and_enum",
+            ID_DEFS_DEFINITIONS_ENUM_SCHEMA,
+            [STATE],
+            {STATE, ADDRESS, "customer"}
+        )
+    ])
+    def test_affected_by(
+        self,
+        name: str,
+        file_content: str,
+        entity_names: List[str],
+        expected_names: set
+    ):
+        self.parser.parse(file_content=file_content)
+        self.assertEqual(
+            expected_names, self.parser.affected_by(entity_names)
+        )
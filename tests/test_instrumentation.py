@@ -0,0 +1,68 @@
+import io
+import tracemalloc
+import unittest
+
+from instrumentation.instrumentation import NULL_INSTRUMENTATION, SpanRecorder
+
+
+class TestSpanRecorder(unittest.TestCase):
+    def test_null_instrumentation(self):
+        with NULL_INSTRUMENTATION.span("stage", entity="Brand") as span:
+            span.item_count = 1
+
+        self.assertEqual("stage", span.name)
+        self.assertEqual({"entity": "Brand"}, span.attributes)
+
+    def test_nested_spans(self):
+        recorder = SpanRecorder()
+        with recorder.span("outer") as outer:
+            with recorder.span("inner", entity="Brand") as inner:
+                inner.item_count = 2
+            outer.item_count = 1
+
+        self.assertEqual(["inner", "outer"], [s.name for s in recorder.spans])
+        self.assertEqual(0, outer.depth)
+        self.assertEqual(1, inner.depth)
+        self.assertGreaterEqual(outer.wall_seconds, inner.wall_seconds)
+        self.assertIsNone(outer.memory_peak)
+
+    def test_memory_peak(self):
+        with SpanRecorder(trace_memory=True) as recorder:
+            with recorder.span("outer") as outer:
+                with recorder.span("inner") as inner:
+                    data = bytearray(1024 * 1024)
+                    del data
+
+        self.assertGreaterEqual(inner.memory_peak, 1024 * 1024)
+        self.assertGreaterEqual(outer.memory_peak, inner.memory_peak)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_close_keeps_tracing_started_elsewhere(self):
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        with SpanRecorder(trace_memory=True):
+            pass
+
+        self.assertTrue(tracemalloc.is_tracing())
+
+    def test_summary_and_exports(self):
+        recorder = SpanRecorder()
+        for _ in range(3):
+            with recorder.span("write") as span:
+                span.item_count = 2
+
+        summary = recorder.get_summary()
+        self.assertEqual(3, summary["write"]["count"])
+        self.assertEqual(6, summary["write"]["item_count"])
+
+        output = io.StringIO()
+        recorder.print_summary(output)
+        self.assertIn("write", output.getvalue())
+
+        trace_events = recorder.to_chrome_trace()["traceEvents"]
+        self.assertEqual(3, len(trace_events))
+        self.assertEqual("X", trace_events[0]["ph"])
+        self.assertEqual(2, trace_events[0]["args"]["item_count"])
+
+        self.assertEqual(3, len(recorder.to_json()["spans"]))
+        self.assertNotIn("_memory_base", recorder.to_json()["spans"][0])
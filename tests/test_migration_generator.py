@@ -0,0 +1,350 @@
+from typing import List
+import unittest
+from parameterized import parameterized
+
+from data_type_mapper.sql_type_mapper import PgsqlTypeMapper
+from entity_parser.entity_parser import JsonSchemaParser
+from sql_generator.migration_generator import (
+    MigrationStatement, PgsqlMigrationGenerator
+)
+
+
+OLD_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Brand": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"}
+      }
+    },
+    "Product": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"},
+        "name": {"type": "string", "maxLength": 50},
+        "sku": {"type": "string", "maxLength": 20},
+        "price": {"type": "number", "format": "float"},
+        "legacy_code": {"type": "string", "maxLength": 10}
+      },
+      "required": ["id", "name"]
+    },
+    "Legacy": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"}
+      }
+    }
+  }
+}
+'''
+
+NEW_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Brand": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"}
+      }
+    },
+    "Product": {
+      "type": "object",
+      "storage": {"fillfactor": 80},
+      "indexes": [{"columns": ["sku"]}],
+      "properties": {
+        "id": {"type": "integer"},
+        "name": {"type": "string", "maxLength": 100},
+        "sku": {"type": "string", "maxLength": 20},
+        "price": {"type": "number", "format": "double"},
+        "description": {"type": "string", "compression": "lz4"},
+        "stock": {"type": "integer"},
+        "brand": {"$ref": "#/definitions/Brand"}
+      },
+      "required": ["id", "name", "sku", "stock"]
+    },
+    "Review": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"},
+        "product": {"$ref": "#/definitions/Product"}
+      }
+    }
+  }
+}
+'''
+
+
+def _get_schema(properties: str, hints: str = "") -> str:
+    return f'''
+    {{
+      "definitions": {{
+        "Event": {{
+          "type": "object",
+          {hints}
+          "properties": {{{properties}}}
+        }}
+      }}
+    }}
+    '''
+
+
+BRAND_DEFINITION: str = '''
+    "Brand": {"type": "object", "properties": {"id": {"type": "integer"}}}
+'''
+
+
+def _get_definitions_schema(definitions: str) -> str:
+    return f'''
+    {{
+      "definitions": {{{definitions}}}
+    }}
+    '''
+
+
+class TestPgsqlMigrationGenerator(unittest.TestCase):
+    def setUp(self):
+        self.migration_gen = PgsqlMigrationGenerator()
+        self.type_mapper = PgsqlTypeMapper()
+
+    def _gen_migration(
+        self, old_schema: str, new_schema: str
+    ) -> List[MigrationStatement]:
+        return self.migration_gen.gen_migration(
+            JsonSchemaParser().parse(file_content=old_schema),
+            JsonSchemaParser().parse(file_content=new_schema),
+            self.type_mapper
+        )
+
+    def test_gen_migration_file_data(self):
+        file_data = self.migration_gen.gen_migration_file_data(
+            JsonSchemaParser().parse(file_content=OLD_SCHEMA),
+            JsonSchemaParser().parse(file_content=NEW_SCHEMA),
+            self.type_mapper,
+            "migrations",
+            "0002.sql"
+        )
+        self.assertEqual(
+            [
+                "-- Concurrent index statements cannot run inside a "
+                "transaction block",
+                "CREATE TABLE IF NOT EXISTS Review (\n"
+                "    id INTEGER PRIMARY KEY,\n"
+                "    product_id INTEGER NOT NULL,\n"
+                "    FOREIGN KEY (product_id) REFERENCES Product (id)\n"
+                ");",
+                "ALTER TABLE Product ADD COLUMN description TEXT "
+                "COMPRESSION lz4;",
+                "ALTER TABLE Product ADD COLUMN stock INTEGER;",
+                "ALTER TABLE Product ADD COLUMN brand_id INTEGER;",
+                "ALTER TABLE Product SET (fillfactor = 80);",
+                "ALTER TABLE Product ALTER COLUMN name TYPE VARCHAR(100) "
+                "USING name::VARCHAR(100);",
+                "-- WARNING: rewrites table `Product` under an ACCESS "
+                "EXCLUSIVE lock, `price` changes from REAL to DOUBLE",
+                "ALTER TABLE Product ALTER COLUMN price TYPE DOUBLE "
+                "USING price::DOUBLE;",
+                "ALTER TABLE Product ADD CONSTRAINT product_sku_not_null "
+                "CHECK (sku IS NOT NULL) NOT VALID;",
+                "ALTER TABLE Product ADD CONSTRAINT product_stock_not_null "
+                "CHECK (stock IS NOT NULL) NOT VALID;",
+                "ALTER TABLE Product ADD CONSTRAINT product_brand_id_fkey "
+                "FOREIGN KEY (brand_id) REFERENCES Brand (id) NOT VALID;",
+                "ALTER TABLE Product VALIDATE CONSTRAINT "
+                "product_sku_not_null;",
+                "-- WARNING: fails until `Product.stock` is backfilled",
+                "ALTER TABLE Product VALIDATE CONSTRAINT "
+                "product_stock_not_null;",
+                "ALTER TABLE Product VALIDATE CONSTRAINT "
+                "product_brand_id_fkey;",
+                "ALTER TABLE Product ALTER COLUMN sku SET NOT NULL;",
+                "ALTER TABLE Product DROP CONSTRAINT product_sku_not_null;",
+                "ALTER TABLE Product ALTER COLUMN stock SET NOT NULL;",
+                "ALTER TABLE Product DROP CONSTRAINT product_stock_not_null;",
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS product_sku_idx "
+                "ON Product (sku);",
+                "-- WARNING: drops column `Product.legacy_code` and its data",
+                "ALTER TABLE Product DROP COLUMN legacy_code;",
+                "-- WARNING: drops table `Legacy` and its data",
+                "DROP TABLE Legacy;",
+            ],
+            list(file_data.file_content)
+        )
+
+    def test_gen_migration_orders_new_tables(self):
+        new_schema = _get_definitions_schema(f'''
+            {BRAND_DEFINITION},
+            "Review": {{
+              "type": "object",
+              "properties": {{
+                "id": {{"type": "integer"}},
+                "item": {{"$ref": "#/definitions/Item"}}
+              }}
+            }},
+            "Item": {{
+              "type": "object",
+              "properties": {{
+                "id": {{"type": "integer"}},
+                "brand": {{"$ref": "#/definitions/Brand"}}
+              }}
+            }}
+        ''')
+        self.assertEqual(
+            [
+                MigrationStatement(
+                    "CREATE TABLE IF NOT EXISTS Item (\n"
+                    "    id INTEGER PRIMARY KEY,\n"
+                    "    brand_id INTEGER NULL,\n"
+                    "    FOREIGN KEY (brand_id) REFERENCES Brand (id)\n"
+                    ");"
+                ),
+                MigrationStatement(
+                    "CREATE TABLE IF NOT EXISTS Review (\n"
+                    "    id INTEGER PRIMARY KEY,\n"
+                    "    item_id INTEGER NULL,\n"
+                    "    FOREIGN KEY (item_id) REFERENCES Item (id)\n"
+                    ");"
+                )
+            ],
+            self._gen_migration(
+                _get_definitions_schema(BRAND_DEFINITION), new_schema
+            )
+        )
+
+    def test_gen_migration_defers_new_table_cycles(self):
+        new_schema = _get_definitions_schema(f'''
+            {BRAND_DEFINITION},
+            "Review": {{
+              "type": "object",
+              "properties": {{
+                "id": {{"type": "integer"}},
+                "item": {{"$ref": "#/definitions/Item"}}
+              }}
+            }},
+            "Item": {{
+              "type": "object",
+              "properties": {{
+                "id": {{"type": "integer"}},
+                "featured_review": {{"$ref": "#/definitions/Review"}}
+              }}
+            }}
+        ''')
+        self.assertEqual(
+            [
+                MigrationStatement(
+                    "CREATE TABLE IF NOT EXISTS Review (\n"
+                    "    id INTEGER PRIMARY KEY,\n"
+                    "    item_id INTEGER NULL\n"
+                    ");"
+                ),
+                MigrationStatement(
+                    "CREATE TABLE IF NOT EXISTS Item (\n"
+                    "    id INTEGER PRIMARY KEY,\n"
+                    "    featured_review_id INTEGER NULL,\n"
+                    "    FOREIGN KEY (featured_review_id) REFERENCES "
+                    "Review (id)\n"
+                    ");"
+                ),
+                MigrationStatement(
+                    "ALTER TABLE Review ADD CONSTRAINT review_item_id_fkey "
+                    "FOREIGN KEY (item_id) REFERENCES Item (id) NOT VALID;"
+                ),
+                MigrationStatement(
+                    "ALTER TABLE Review VALIDATE CONSTRAINT "
+                    "review_item_id_fkey;"
+                )
+            ],
+            self._gen_migration(
+                _get_definitions_schema(BRAND_DEFINITION), new_schema
+            )
+        )
+
+    def test_gen_migration_without_changes(self):
+        self.assertEqual([], self._gen_migration(NEW_SCHEMA, NEW_SCHEMA))
+
+    @parameterized.expand([
+        (
+            "widen_varchar_to_text",
+            _get_schema('"id": {"type": "integer"}, '
+                        '"name": {"type": "string", "maxLength": 50}'),
+            _get_schema('"id": {"type": "integer"}, '
+                        '"name": {"type": "string"}'),
+            [
+                MigrationStatement(
+                    "ALTER TABLE Event ALTER COLUMN name TYPE TEXT "
+                    "USING name::TEXT;"
+                )
+            ]
+        ),
+        (
+            "drop_not_null",
+            _get_schema('"id": {"type": "integer"}, '
+                        '"kind": {"type": "integer"}',
+                        '"required": ["id", "kind"],'),
+            _get_schema('"id": {"type": "integer"}, '
+                        '"kind": {"type": "integer"}',
+                        '"required": ["id"],'),
+            [
+                MigrationStatement(
+                    "ALTER TABLE Event ALTER COLUMN kind DROP NOT NULL;"
+                )
+            ]
+        ),
+        (
+            "set_logged",
+            _get_schema('"id": {"type": "integer"}',
+                        '"storage": {"unlogged": true},'),
+            _get_schema('"id": {"type": "integer"}'),
+            [
+                MigrationStatement(
+                    "ALTER TABLE Event SET LOGGED;",
+                    warning="rewrites table `Event` under an ACCESS "
+                    "EXCLUSIVE lock"
+                )
+            ]
+        ),
+        (
+            "change_primary_key",
+            _get_schema('"id": {"type": "integer"}, '
+                        '"kind": {"type": "integer"}'),
+            _get_schema('"id": {"type": "integer", "primaryKey": true}, '
+                        '"kind": {"type": "integer", "primaryKey": true}'),
+            [
+                MigrationStatement(
+                    "ALTER TABLE Event DROP CONSTRAINT event_pkey, "
+                    "ADD PRIMARY KEY (id, kind);",
+                    warning="builds the primary key index of `Event` under "
+                    "an ACCESS EXCLUSIVE lock"
+                )
+            ]
+        ),
+        (
+            "change_index",
+            _get_schema('"id": {"type": "integer"}, '
+                        '"kind": {"type": "integer"}',
+                        '"indexes": [{"columns": ["kind"]}],'),
+            _get_schema('"id": {"type": "integer"}, '
+                        '"kind": {"type": "integer"}',
+                        '"indexes": [{"columns": ["kind"], '
+                        '"where": "kind > 0"}],'),
+            [
+                MigrationStatement(
+                    "DROP INDEX CONCURRENTLY IF EXISTS event_kind_idx;"
+                ),
+                MigrationStatement(
+                    "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                    "event_kind_partial_idx ON Event (kind) WHERE kind > 0;"
+                )
+            ]
+        )
+    ])
+    def test_gen_migration(
+        self,
+        name: str,
+        old_schema: str,
+        new_schema: str,
+        expected: List[MigrationStatement]
+    ):
+        self.assertEqual(expected, self._gen_migration(old_schema, new_schema))
@@ -0,0 +1,72 @@
+import io
+import tarfile
+import unittest
+import zipfile
+
+from output_sink.output_sink import (
+    MemoryOutputSink, TarOutputSink, ZipOutputSink
+)
+from utils.utils import FileData
+
+
+ROOT_PATH: str = "output/path"
+EXPECTED_FILES = {
+    "Ecommerce/DbScripts/init.sql": "CREATE TABLE t (\n);\n",
+    "Ecommerce/src/ProductDal/Models/Brand.cs":
+        "namespace ProductDal.Models\n{\n}\n"
+}
+
+
+def _get_file_data():
+    return [
+        FileData(
+            file_path="output/path/Ecommerce/DbScripts",
+            file_name="init.sql",
+            file_content=(line for line in ["CREATE TABLE t (", ");"])
+        ),
+        FileData(
+            file_path="output/path/Ecommerce/src/ProductDal/Models",
+            file_name="Brand.cs",
+            file_content=["namespace ProductDal.Models", "{", "}"]
+        )
+    ]
+
+
+class TestOutputSink(unittest.TestCase):
+    def setUp(self) -> None:
+        self.file_data = _get_file_data()
+
+    def test_memory_output_sink(self):
+        with MemoryOutputSink(ROOT_PATH) as sink:
+            for file_data in self.file_data:
+                sink.write(file_data)
+
+        self.assertEqual(EXPECTED_FILES, sink.files)
+
+    def test_zip_output_sink(self):
+        stream = io.BytesIO()
+        with ZipOutputSink(stream, ROOT_PATH) as sink:
+            for file_data in self.file_data:
+                sink.write(file_data)
+
+        stream.seek(0)
+        with zipfile.ZipFile(stream) as archive:
+            actual_files = {
+                name: archive.read(name).decode()
+                for name in archive.namelist()
+            }
+        self.assertEqual(EXPECTED_FILES, actual_files)
+
+    def test_tar_output_sink(self):
+        stream = io.BytesIO()
+        with TarOutputSink(stream, ROOT_PATH) as sink:
+            for file_data in self.file_data:
+                sink.write(file_data)
+
+        stream.seek(0)
+        with tarfile.open(fileobj=stream, mode="r:gz") as archive:
+            actual_files = {
+                member.name: archive.extractfile(member).read().decode()
+                for member in archive.getmembers()
+            }
+        self.assertEqual(EXPECTED_FILES, actual_files)
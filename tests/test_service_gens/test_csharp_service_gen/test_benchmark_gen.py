@@ -0,0 +1,195 @@
+import json
+import re
+import unittest
+
+from data_type_mapper.sql_type_mapper import PgsqlTypeMapper
+from entity_parser.entity_parser import JsonSchemaParser
+from service_gens.csharp_service_gen.benchmark_gen import BenchmarkProjectGen
+from service_gens.csharp_service_gen.utils import CsharpServiceUtil
+from service_gens.service_gen import CSharpTypeMapper
+from utils.utils import EntityFieldData
+from tests.test_service_gens.test_csharp_service_gen import (
+    test_db_service_gen
+)
+
+
+OUTPUT_PATH: str = "output/path"
+ECOMMERCE: str = "Ecommerce"
+PRODUCT_DAL: str = "ProductDal"
+SRC: str = "src"
+BENCHMARK_DIR: str = "output/path/Ecommerce/benchmarks/ProductDalBenchmarks"
+SEED_SCHEMA: str = '''
+{
+  "definitions": {
+    "Brand": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"},
+        "meta": {"type": "string", "format": "json", "filterable": true},
+        "details": {"type": "string", "format": "json"}
+      },
+      "required": ["id", "meta"]
+    },
+    "Product": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "string", "format": "uuid"},
+        "brand": {"$ref": "#/definitions/Brand"},
+        "parent_product": {"$ref": "#/definitions/Product"}
+      },
+      "required": ["id", "brand", "parent_product"]
+    }
+  }
+}
+'''
+INSERT_PATTERN: str = r"INSERT INTO (\w+) \(([^)]*)\) VALUES \((.*)\) ON"
+LITERAL_PATTERN: str = r"'(?:[^']|'')*'|[^, ]+"
+
+
+class TestBenchmarkProjectGen(unittest.TestCase):
+    def setUp(self) -> None:
+        self.maxDiff = None
+        svc_dir = CsharpServiceUtil(
+            output_path=OUTPUT_PATH,
+            sln_name=ECOMMERCE,
+            service_name=PRODUCT_DAL,
+            src=SRC
+        )
+        self.benchmark_gen = BenchmarkProjectGen(
+            service_name=PRODUCT_DAL,
+            svc_dir=svc_dir,
+            entities=[
+                test_db_service_gen.BRAND_ENTITY,
+                test_db_service_gen.CATEGORY_ENTITY,
+                test_db_service_gen.PRODUCT_ENTITY,
+                test_db_service_gen.ADDRESS_ENTITY
+            ],
+            pl_type_mapper=CSharpTypeMapper(),
+            seed_row_count=2
+        )
+
+    def test_gen_service_files(self):
+        file_data = list(self.benchmark_gen.gen_service())
+
+        # address has no primary key so it gets no benchmark
+        self.assertEqual(
+            [
+                "Program.cs",
+                "BenchmarkDb.cs",
+                "seed.sql",
+                "BrandRepoBenchmarks.cs",
+                "CategoryRepoBenchmarks.cs",
+                "ProductRepoBenchmarks.cs",
+            ],
+            [fd.file_name for fd in file_data]
+        )
+        for fd in file_data:
+            self.assertEqual(BENCHMARK_DIR, fd.file_path)
+
+    def test_gen_benchmark_db(self):
+        content = list(self.benchmark_gen.gen_service())[1].file_content
+        self.assertIn("        public const long SeedRowCount = 2;", content)
+        self.assertIn(
+            '                Execute(conn, File.ReadAllText(FindScript'
+            '("BENCHMARK_SEED_SQL", "seed.sql")));',
+            content
+        )
+        self.assertIn(
+            "           + Random.Shared.NextInt64(2000) * 1000000;", content
+        )
+
+    def test_gen_seed_sql(self):
+        statements = list(
+            list(self.benchmark_gen.gen_service())[2].file_content
+        )
+
+        # Two rows per table, re-running the script skips existing rows
+        self.assertEqual(6, len(statements))
+        self.assertTrue(statements[0].startswith(
+            "INSERT INTO Brand (brand_id, name, description) VALUES ('key-1'"
+        ))
+        for statement in statements:
+            self.assertTrue(statement.endswith(" ON CONFLICT DO NOTHING;"))
+
+    def test_gen_seed_sql_matches_columns(self):
+        entities = JsonSchemaParser().parse(file_content=SEED_SCHEMA)
+        type_mapper = PgsqlTypeMapper(use_jsonb=True)
+        benchmark_gen = BenchmarkProjectGen(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.benchmark_gen.svc_dir,
+            entities=entities,
+            pl_type_mapper=CSharpTypeMapper(),
+            db_type_mapper=type_mapper,
+            seed_row_count=3
+        )
+        columns = {
+            entity.name: {
+                fld.name: fld
+                for fld in EntityFieldData.from_entity(
+                    entity, type_mapper
+                ).get_field_data()
+            }
+            for entity in entities
+        }
+
+        statements = list(list(benchmark_gen.gen_service())[2].file_content)
+        self.assertEqual(6, len(statements))
+        for statement in statements:
+            table, names, values = re.match(
+                INSERT_PATTERN, statement
+            ).groups()
+            for name, value in zip(
+                names.split(", "), re.findall(LITERAL_PATTERN, values)
+            ):
+                fld = columns[table][name]
+                if fld.is_required:
+                    self.assertNotEqual("NULL", value, statement)
+                if fld.data_type == "JSONB" and value != "NULL":
+                    json.loads(value[1:-1].replace("''", "'"))
+
+    def test_gen_repo_benchmark(self):
+        file_data = list(self.benchmark_gen.gen_service())[-1]
+        content = file_data.file_content
+        self.assertIn("    public class ProductRepoBenchmarks", content)
+        self.assertIn(
+            "        private long nextKey = BenchmarkDb.NewKeyBase();", content
+        )
+        self.assertIn(
+            "           repo = new ProductRepo(new DbService"
+            "(BenchmarkDb.Open()), new ProductSqlCommand());",
+            content
+        )
+        for benchmark in [
+            "        public Task<Product?> GetAsync() => "
+            "repo.GetAsync(getParam);",
+            "        public Task<IEnumerable<Product>> ListAsync() => "
+            "repo.ListAsync(listParam);",
+            "        public Task<int> CreateAsync() => "
+            "repo.CreateAsync(NewEntity(nextKey++));",
+            "        public Task<int> UpdateAsync() => "
+            "repo.UpdateAsync(entity);",
+            "        public async Task DeleteAsync()",
+        ]:
+            self.assertIn(benchmark, content)
+
+        # Required columns and keys are populated from the key counter
+        new_entity_start = content.index(
+            "        private static Product NewEntity(long key) => new()"
+        )
+        self.assertEqual(
+            [
+                "        {",
+                "           Productid = Guid.NewGuid(),",
+                '           Name = $"bench-{key}",',
+                '           Brand_id = $"bench-{key}",',
+                "           Category_id = (int)key,",
+                "        };",
+                "",
+                "        private static ProductGetParam NewGetParam"
+                "(Product row) => new()",
+                "        {",
+                "           Productid = row.Productid,",
+                "        };",
+            ],
+            content[new_entity_start + 1:new_entity_start + 12]
+        )
@@ -1,14 +1,20 @@
+from dataclasses import asdict
 from os import path
 from pathlib import Path
+import pickle
 from typing import List
 import unittest
+from unittest import mock
 
 from parameterized import parameterized
 import send2trash
 
 from data_type_mapper.sql_type_mapper import PgsqlTypeMapper
+from instrumentation.instrumentation import SpanRecorder
+from output_sink.output_sink import MemoryOutputSink
 from service_gens.csharp_service_gen.csharp_service_gen import (
-    CsharpRestServiceGenerator
+    CsharpRestServiceGenerator, ServiceGenOptions, ServiceManifestEntry,
+    _gen_manifest_entry
 )
 from sql_generator.sql_generator import (
     PgsqlCommandGenerator, PgsqlTableSqlGenerator
@@ -151,3 +157,140 @@ class TestDotnetProcessRunner(unittest.TestCase):
             full_file_name: str = path.join(self.output_path, file_path)
             file_exist = path.exists(full_file_name)
             self.assertTrue(file_exist)
+
+    def test_gen_rest_service_to_memory_sink(self):
+        sink = MemoryOutputSink(self.output_path)
+        CsharpRestServiceGenerator.gen_services_from_file_content(
+            output_path=self.output_path,
+            sln_name=ECOMMERCE,
+            service_name=PRODUCT_API,
+            file_content=SELF_REF_AND_ENTITY_REF_SCHEMA,
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            db_type_mapper=PgsqlTypeMapper(),
+            db_script_gen=PgsqlTableSqlGenerator(),
+            output_sink=sink
+        )
+
+        # Nothing is scaffolded or written to disk
+        self.assertFalse(path.exists(path.join(self.output_path, ECOMMERCE)))
+        self.assertIn("Ecommerce/DbScripts/init.sql", sink.files)
+        self.assertIn(
+            "Ecommerce/src/ProductApiDal/Repos/ProductRepo.cs", sink.files
+        )
+        self.assertIn(
+            "CREATE TABLE IF NOT EXISTS Product (",
+            sink.files["Ecommerce/DbScripts/init.sql"]
+        )
+
+    def test_gen_services_from_manifest_reports_errors(self):
+        manifest = [
+            ServiceManifestEntry(
+                file_path=path.join(self.output_path, "missing.json"),
+                sln_name=ECOMMERCE,
+                service_name=service_name
+            )
+            for service_name in ["ProductApi", "OrderApi"]
+        ]
+        report = CsharpRestServiceGenerator.gen_services_from_manifest(
+            output_path=self.output_path,
+            manifest=manifest,
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            db_type_mapper=PgsqlTypeMapper(),
+            db_script_gen=PgsqlTableSqlGenerator(),
+            max_workers=2
+        )
+
+        self.assertEqual(
+            ["ProductApi", "OrderApi"],
+            [result.service_name for result in report.results]
+        )
+        self.assertEqual(2, len(report.failed))
+        self.assertEqual(
+            path.join(self.output_path, "OrderApi"),
+            report.results[1].output_path
+        )
+        self.assertIn("FileNotFoundError", report.get_error_report())
+        for result in report.results:
+            self.assertGreaterEqual(result.elapsed_seconds, 0)
+
+    def test_gen_manifest_entry_forwards_options(self):
+        options = ServiceGenOptions(
+            gen_telemetry=True,
+            gen_row_mappers=True,
+            gen_counts=True,
+            eager_load_depth=2,
+            count_estimate_threshold=5000
+        )
+        entry = ServiceManifestEntry(
+            file_path="schema.json",
+            sln_name=ECOMMERCE,
+            service_name=PRODUCT_API
+        )
+        with mock.patch.object(
+            CsharpRestServiceGenerator, "gen_services_from_file_path"
+        ) as gen_services:
+            # The options are sent to the worker processes
+            result = _gen_manifest_entry(
+                self.output_path,
+                entry,
+                PgsqlCommandGenerator(entity=None),
+                PgsqlTypeMapper(),
+                PgsqlTableSqlGenerator(),
+                pickle.loads(pickle.dumps(options))
+            )
+
+        self.assertIsNone(result.error)
+        kwargs = gen_services.call_args.kwargs
+        self.assertEqual(
+            asdict(options),
+            {name: kwargs[name] for name in asdict(options)}
+        )
+        self.assertEqual("schema.json", kwargs["file_path"])
+
+    def test_gen_rest_service_with_instrumentation(self):
+        recorder = SpanRecorder()
+        CsharpRestServiceGenerator.gen_services_from_file_content(
+            output_path=self.output_path,
+            sln_name=ECOMMERCE,
+            service_name=PRODUCT_API,
+            file_content=SELF_REF_AND_ENTITY_REF_SCHEMA,
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            db_type_mapper=PgsqlTypeMapper(),
+            db_script_gen=PgsqlTableSqlGenerator(),
+            output_sink=MemoryOutputSink(self.output_path),
+            instrumentation=recorder
+        )
+
+        summary = recorder.get_summary()
+        self.assertEqual(3, summary["parser.parse"]["item_count"])
+        self.assertEqual(3, summary["db_service.type_mapping"]["count"])
+        self.assertEqual(3, summary["db_scripts.gen_db_scripts"]["item_count"])
+        self.assertEqual(
+            summary["db_service.gen_service"]["item_count"]
+            + summary["secret_manager.gen_service"]["item_count"],
+            summary["output.write"]["count"]
+        )
+
+    def test_gen_rest_service_with_benchmarks(self):
+        sink = MemoryOutputSink(self.output_path)
+        CsharpRestServiceGenerator.gen_services_from_file_content(
+            output_path=self.output_path,
+            sln_name=ECOMMERCE,
+            service_name=PRODUCT_API,
+            file_content=SELF_REF_AND_ENTITY_REF_SCHEMA,
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            db_type_mapper=PgsqlTypeMapper(),
+            db_script_gen=PgsqlTableSqlGenerator(),
+            output_sink=sink,
+            gen_benchmarks=True
+        )
+
+        benchmark_dir = "Ecommerce/benchmarks/ProductApiDalBenchmarks"
+        for file_name in [
+            "Program.cs",
+            "BenchmarkDb.cs",
+            "BrandRepoBenchmarks.cs",
+            "CategoryRepoBenchmarks.cs",
+            "ProductRepoBenchmarks.cs",
+        ]:
+            self.assertIn(f"{benchmark_dir}/{file_name}", sink.files)
@@ -1,9 +1,11 @@
+from dataclasses import replace
 from typing import List
 import unittest
 from parameterized import parameterized
 
+from data_type_mapper.sql_type_mapper import PgsqlTypeMapper
 from entity_parser.entity import (
-    Entity, EntityField, FieldFormat, FieldType, RefEntityField
+    Entity, EntityCache, EntityField, FieldFormat, FieldType, RefEntityField
 )
 from service_gens.csharp_service_gen.db_service_gen import (
     DbServiceGenerator
@@ -1678,3 +1680,834 @@ class TestDbServiceGenerator(unittest.TestCase):
         )
         actual_file_data = list(service_gen.gen_service())
         self.assertEqual(expected_file_data, actual_file_data)
+
+    def test_gen_service_with_telemetry(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[BRAND_ENTITY],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_telemetry=True
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        self.assertIn(
+            "        Task<int> ExecuteAsync(string sqlCommand, object? param, "
+            "string? entity = null, string? operation = null);",
+            files["IDbService.cs"]
+        )
+        # Failed queries are marked on the activity and timed as well
+        self.assertEqual(
+            [
+                "           using var activity = DbTelemetry.StartActivity"
+                "(entity, operation);",
+                "           var start = Stopwatch.GetTimestamp();",
+                "           try",
+                "           {",
+                "                var result = await conn.ExecuteAsync"
+                "(sqlCommand, param);",
+                '                activity?.SetTag("db.rows", result);',
+                "                return result;",
+                "           }",
+                "           catch (Exception ex)",
+                "           {",
+                "                activity?.SetStatus"
+                "(ActivityStatusCode.Error, ex.Message);",
+                "                throw;",
+                "           }",
+                "           finally",
+                "           {",
+                "                DbTelemetry.Record"
+                "(start, entity, operation);",
+                "           }",
+                "        }",
+            ],
+            files["DbService.cs"][11:29]
+        )
+        # The row count would make the histogram tags unbounded
+        self.assertNotIn(
+            '                new KeyValuePair<string, object?>("db.rows", '
+            "rows));",
+            files["DbTelemetry.cs"]
+        )
+        self.assertIn(
+            '        public const string SourceName = "ProductDal";',
+            files["DbTelemetry.cs"]
+        )
+        self.assertIn(
+            "           return await dbService.ExecuteAsync"
+            '(sqlCommand.DeleteCommand, brandGetParam, "Brand", "delete");',
+            files["BrandRepo.cs"]
+        )
+
+    def test_gen_service_with_row_mappers(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[BRAND_ENTITY],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_row_mappers=True,
+            gen_partial_updates=True
+        )
+        files = {
+            file_data.file_name: file_data
+            for file_data in service_gen.gen_service()
+        }
+
+        self.assertNotIn("using Dapper;", files["DbService.cs"].file_content)
+        self.assertEqual(
+            "output/path/Ecommerce/src/ProductDal/Mappers",
+            files["BrandRowMapper.cs"].file_path
+        )
+        self.assertEqual(
+            [
+                "           Brand_id = reader.GetString(0),",
+                "           Name = reader.GetString(1),",
+                "           Description = reader.IsDBNull(2) ? null : "
+                "reader.GetString(2),",
+            ],
+            files["BrandRowMapper.cs"].file_content[11:14]
+        )
+        self.assertIn(
+            '           parameters.Add(new NpgsqlParameter<string?>'
+            '("description", brand.Description));',
+            files["BrandRowMapper.cs"].file_content
+        )
+        self.assertIn(
+            "           return await dbService.ExecuteAsync"
+            "(sqlCommand.DeleteCommand, parameters => "
+            "BrandRowMapper.BindGetParam(parameters, brandGetParam));",
+            files["BrandRepo.cs"].file_content
+        )
+        self.assertIn(
+            '           parameters.Add(new NpgsqlParameter<string?>'
+            '("name", param.Name));',
+            files["BrandRowMapper.cs"].file_content
+        )
+        self.assertIn(
+            '           parameters.Add(new NpgsqlParameter<bool>'
+            '("name_set", param.Name_set));',
+            files["BrandRowMapper.cs"].file_content
+        )
+
+    def test_gen_service_with_number_row_mapper(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[BRAND_ENTITY, CATEGORY_ENTITY, PRODUCT_ENTITY],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_row_mappers=True
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        # The decimal price is stored in a double precision column
+        self.assertEqual(
+            [
+                "           Price = reader.IsDBNull(3) ? null : "
+                "(decimal)reader.GetDouble(3),",
+                "           Quantity = reader.IsDBNull(4) ? null : "
+                "reader.GetInt32(4),",
+            ],
+            files["ProductRowMapper.cs"][14:16]
+        )
+
+    def test_gen_service_with_typed_parameters(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[BRAND_ENTITY],
+            pl_type_mapper=CSharpTypeMapper(),
+            db_type_mapper=PgsqlTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_row_mappers=True
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        mapper_content = files["BrandRowMapper.cs"]
+        self.assertIn("using NpgsqlTypes;", mapper_content)
+        self.assertIn(
+            '           parameters.Add(new NpgsqlParameter<string>'
+            '("brand_id", param.Brand_id) '
+            '{ NpgsqlDbType = NpgsqlDbType.Varchar, Size = 30 });',
+            mapper_content
+        )
+        self.assertIn(
+            '           parameters.Add(new NpgsqlParameter<string[]>'
+            '("brand_ids", param.Brand_ids?.ToArray() ?? []) '
+            '{ NpgsqlDbType = NpgsqlDbType.Array | NpgsqlDbType.Varchar });',
+            mapper_content
+        )
+
+    def test_gen_service_with_incompatible_parameter_type(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[BRAND_ENTITY, CATEGORY_ENTITY, PRODUCT_ENTITY],
+            pl_type_mapper=CSharpTypeMapper(),
+            db_type_mapper=PgsqlTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_row_mappers=True
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        # A decimal cannot be written to the double precision column as is
+        self.assertIn(
+            '           parameters.Add(new NpgsqlParameter<decimal?>'
+            '("price", product.Price));',
+            files["ProductRowMapper.cs"]
+        )
+        self.assertIn(
+            '           parameters.Add(new NpgsqlParameter<int?>'
+            '("quantity", product.Quantity) '
+            '{ NpgsqlDbType = NpgsqlDbType.Integer });',
+            files["ProductRowMapper.cs"]
+        )
+
+    def test_gen_service_with_typed_dapper_parameters(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[BRAND_ENTITY],
+            pl_type_mapper=CSharpTypeMapper(),
+            db_type_mapper=PgsqlTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_partial_updates=True
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        repo_content = files["BrandRepo.cs"]
+        self.assertEqual(
+            ["using System.Data;", "using Dapper;"], repo_content[:2]
+        )
+        self.assertIn(
+            "           return await dbService.ExecuteAsync"
+            "(sqlCommand.CreateCommand, GetParameters(brand));",
+            repo_content
+        )
+        self.assertIn(
+            "           return await dbService.ExecuteAsync"
+            "(sqlCommand.UpdatePartialCommand, "
+            "GetPatchParameters(brandPatchParam));",
+            repo_content
+        )
+        start = repo_content.index(
+            "        private static DynamicParameters GetKeyParameters"
+            "(BrandGetParam param)"
+        )
+        self.assertEqual(
+            [
+                "        private static DynamicParameters GetKeyParameters"
+                "(BrandGetParam param)",
+                "        {",
+                "           var parameters = new DynamicParameters();",
+                '           parameters.Add("brand_id", param.Brand_id, '
+                'DbType.String, size: 30);',
+                "           return parameters;",
+                "        }",
+                "",
+                "        private static DynamicParameters GetPatchParameters"
+                "(BrandPatchParam param)",
+                "        {",
+                "           var parameters = new DynamicParameters();",
+                '           parameters.Add("brand_id", param.Brand_id, '
+                'DbType.String, size: 30);',
+                '           parameters.Add("name", param.Name, '
+                'DbType.String, size: 50);',
+                '           parameters.Add("name_set", param.Name_set, '
+                'DbType.Boolean);',
+                '           parameters.Add("description", '
+                'param.Description, DbType.String);',
+                '           parameters.Add("description_set", '
+                'param.Description_set, DbType.Boolean);',
+                "           return parameters;",
+                "        }",
+            ],
+            repo_content[start:start + 17]
+        )
+
+    def test_gen_service_with_cache_hint(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[
+                replace(BRAND_ENTITY, cache=EntityCache(ttl_seconds=30)),
+                CATEGORY_ENTITY
+            ],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_partial_updates=True
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        self.assertNotIn("CachedCategoryRepo.cs", files)
+        cached_repo = files["CachedBrandRepo.cs"]
+        self.assertIn(
+            "    public class CachedBrandRepo(IBrandRepo repo, "
+            "IMemoryCache cache, TimeSpan? ttl = null) : IBrandRepo",
+            cached_repo
+        )
+        self.assertIn(
+            "        public static readonly TimeSpan DefaultTtl = "
+            "TimeSpan.FromSeconds(30);",
+            cached_repo
+        )
+        self.assertIn(
+            "           cache.Remove(GetKey(brand.Brand_id));", cached_repo
+        )
+        self.assertIn(
+            "           cache.Remove(GetKey(brandGetParam.Brand_id));",
+            cached_repo
+        )
+        self.assertIn(
+            "           cache.Remove(GetKey(brandPatchParam.Brand_id));",
+            cached_repo
+        )
+
+    def test_gen_service_with_get_many(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[
+                replace(BRAND_ENTITY, cache=EntityCache(ttl_seconds=30))
+            ],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_get_many=True
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        self.assertIn(
+            "        string GetManyCommand { get; }", files["ISqlCommand.cs"]
+        )
+        self.assertIn(
+            "        Task<Dictionary<string, Brand>> GetManyAsync"
+            "(IEnumerable<BrandGetParam> brandGetParams);",
+            files["IBrandRepo.cs"]
+        )
+        self.assertIn(
+            '        public string GetManyCommand => "SELECT brand_id, name, '
+            'description FROM Brand WHERE brand_id = ANY(@brand_ids);";',
+            files["BrandSqlCommand.cs"]
+        )
+        repo = files["BrandRepo.cs"]
+        start = repo.index(
+            "        public async Task<Dictionary<string, Brand>> "
+            "GetManyAsync(IEnumerable<BrandGetParam> brandGetParams)"
+        )
+        self.assertEqual(
+            [
+                "        {",
+                "           var param = new",
+                "           {",
+                "                brand_ids = brandGetParams"
+                ".Select(getParam => getParam.Brand_id).ToArray(),",
+                "           };",
+                "           var rows = await dbService.ListAsync<Brand>"
+                "(sqlCommand.GetManyCommand, param);",
+                "           return rows.ToDictionary(row => row.Brand_id);",
+                "        }",
+            ],
+            repo[start + 1:start + 9]
+        )
+        # The cached repo only reads the keys missing from the cache
+        self.assertIn(
+            "                foreach (var (key, row) in await "
+            "repo.GetManyAsync(missing))",
+            files["CachedBrandRepo.cs"]
+        )
+
+    def test_gen_service_without_get_many(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[
+                replace(BRAND_ENTITY, cache=EntityCache(ttl_seconds=30))
+            ],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_row_mappers=True
+        )
+
+        for file_data in service_gen.gen_service():
+            self.assertFalse(
+                any("GetMany" in line for line in file_data.file_content),
+                file_data.file_name
+            )
+
+    def test_gen_service_with_partial_updates(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[BRAND_ENTITY],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_partial_updates=True
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        self.assertIn(
+            "        string UpdatePartialCommand { get; }",
+            files["ISqlCommand.cs"]
+        )
+        self.assertIn(
+            "        Task<int> UpdatePartialAsync(BrandPatchParam "
+            "brandPatchParam);",
+            files["IBrandRepo.cs"]
+        )
+        self.assertEqual(
+            [
+                "namespace ProductDal.Models",
+                "{",
+                "    public class BrandPatchParam",
+                "    {",
+                "        public string Brand_id { get; set; } = default!;",
+                "",
+                "        private string? name;",
+                "        public string? Name",
+                "        {",
+                "           get => name;",
+                "           set { name = value; Name_set = true; }",
+                "        }",
+                "        public bool Name_set { get; private set; }",
+                "",
+                "        private string? description;",
+                "        public string? Description",
+                "        {",
+                "           get => description;",
+                "           set { description = value; "
+                "Description_set = true; }",
+                "        }",
+                "        public bool Description_set { get; private set; }",
+                "    }",
+                "}",
+            ],
+            files["BrandPatchParam.cs"]
+        )
+        self.assertIn(
+            '        public string UpdatePartialCommand => "UPDATE Brand SET '
+            'name = CASE WHEN @name_set THEN @name ELSE name END, description '
+            '= CASE WHEN @description_set THEN @description ELSE description '
+            'END WHERE brand_id = @brand_id;";',
+            files["BrandSqlCommand.cs"]
+        )
+        self.assertIn(
+            "           return await "
+            "dbService.ExecuteAsync(sqlCommand.UpdatePartialCommand, "
+            "brandPatchParam);",
+            files["BrandRepo.cs"]
+        )
+
+    def test_gen_service_without_partial_updates(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[
+                replace(BRAND_ENTITY, cache=EntityCache(ttl_seconds=30))
+            ],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_row_mappers=True,
+            gen_batch_loaders=True
+        )
+
+        for file_data in service_gen.gen_service():
+            self.assertNotEqual("BrandPatchParam.cs", file_data.file_name)
+            self.assertFalse(
+                any(
+                    "UpdatePartial" in line or "PatchParam" in line
+                    for line in file_data.file_content
+                ),
+                file_data.file_name
+            )
+
+    def test_gen_service_with_batch_loaders(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[BRAND_ENTITY, ADDRESS_ENTITY],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_batch_loaders=True
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        self.assertNotIn("BatchedAddressRepo.cs", files)
+        batched_repo = files["BatchedBrandRepo.cs"]
+        self.assertIn(
+            "    public class BatchedBrandRepo(IBrandRepo repo) : IBrandRepo",
+            batched_repo
+        )
+        self.assertIn(
+            "        private Dictionary<string, (BrandGetParam Param, "
+            "TaskCompletionSource<Brand?> Source)> pending = new();",
+            batched_repo
+        )
+        self.assertIn(
+            "           var key = brandGetParam.Brand_id;", batched_repo
+        )
+        self.assertIn(
+            "                var rows = await repo.GetManyAsync"
+            "(batch.Values.Select(item => item.Param));",
+            batched_repo
+        )
+
+    def test_gen_service_with_eager_loading(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[BRAND_ENTITY, CATEGORY_ENTITY, PRODUCT_ENTITY],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            eager_load_depth=1
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        self.assertNotIn("BrandWithRefs.cs", files)
+        self.assertEqual(
+            [
+                "namespace ProductDal.Models",
+                "{",
+                "    public class ProductWithRefs",
+                "    {",
+                "        public Product Product { get; set; } = default!;",
+                "        public Brand Brand { get; set; } = default!;",
+                "        public Category Category { get; set; } = default!;",
+                "    }",
+                "}",
+            ],
+            files["ProductWithRefs.cs"]
+        )
+        self.assertIn(
+            "        public const string GetWithRefsCommand = "
+            '"SELECT t0.productid, t0.name, t0.description, t0.price, '
+            "t0.quantity, t0.brand_id, t0.category_id, t1.brand_id, "
+            "t1.name, t1.description, t2.id, t2.name, t2.description "
+            "FROM product t0 JOIN Brand t1 ON t1.brand_id = t0.brand_id "
+            "JOIN Category t2 ON t2.id = t0.category_id "
+            'WHERE t0.productid = @productid;";',
+            files["ProductSqlCommand.cs"]
+        )
+        self.assertIn(
+            "        Task<ProductWithRefs?> GetWithRefsAsync"
+            "(ProductGetParam productGetParam);",
+            files["IProductRepo.cs"]
+        )
+        self.assertIn(
+            "           return await dbService.GetAsync"
+            "(ProductSqlCommand.GetWithRefsCommand, productGetParam, "
+            "[typeof(Product), typeof(Brand), typeof(Category)], "
+            "row => new ProductWithRefs { Product = (Product)row[0], "
+            "Brand = (Brand)row[1], Category = (Category)row[2] }, "
+            '"brand_id,id");',
+            files["ProductRepo.cs"]
+        )
+        self.assertIn(
+            "        public async Task<T?> GetAsync<T>(string sqlCommand, "
+            "object? param, Type[] types, Func<object[], T> map, "
+            "string splitOn)",
+            files["DbService.cs"]
+        )
+
+    def test_gen_service_with_eager_loading_row_mappers(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[BRAND_ENTITY, CATEGORY_ENTITY, PRODUCT_ENTITY],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_row_mappers=True,
+            eager_load_depth=1
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        row_mapper = files["ProductRowMapper.cs"]
+        start = row_mapper.index(
+            "        public static ProductWithRefs MapWithRefs"
+            "(DbDataReader reader) => new()"
+        )
+        self.assertEqual(
+            [
+                "           Brand = new Brand",
+                "           {",
+                "                Brand_id = reader.GetString(7),",
+                "                Name = reader.GetString(8),",
+                "                Description = reader.IsDBNull(9) ? null : "
+                "reader.GetString(9),",
+                "           },",
+            ],
+            row_mapper[start + 12:start + 18]
+        )
+        self.assertIn(
+            "           return await dbService.GetAsync<ProductWithRefs>"
+            "(ProductSqlCommand.GetWithRefsCommand, parameters => "
+            "ProductRowMapper.BindGetParam(parameters, productGetParam), "
+            "ProductRowMapper.MapWithRefs);",
+            files["ProductRepo.cs"]
+        )
+
+    def test_gen_service_with_counts(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[BRAND_ENTITY],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_counts=True
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        self.assertIn(
+            "        string CountCommand { get; }", files["ISqlCommand.cs"]
+        )
+        self.assertIn(
+            "        string EstimateCountCommand { get; }",
+            files["ISqlCommand.cs"]
+        )
+        self.assertIn(
+            "        Task<long> CountAsync(BrandListParam brandListParam);",
+            files["IBrandRepo.cs"]
+        )
+        self.assertIn(
+            '        public string CountCommand => "SELECT COUNT(*) FROM '
+            'Brand WHERE (@brand_ids = {} OR brand_ids = ANY(@brand_ids));";',
+            files["BrandSqlCommand.cs"]
+        )
+        self.assertIn(
+            "        public string EstimateCountCommand => \"SELECT CASE "
+            "WHEN c.reltuples < 0 OR c.relpages = 0 THEN -1 ELSE "
+            "(c.reltuples / c.relpages * (pg_relation_size(c.oid) / "
+            "current_setting('block_size')::int))::bigint END FROM pg_class "
+            "c WHERE c.oid = 'Brand'::regclass;\";",
+            files["BrandSqlCommand.cs"]
+        )
+        self.assertIn(
+            "        private const long EstimateCountThreshold = 100000;",
+            files["BrandRepo.cs"]
+        )
+
+    def test_gen_service_without_counts(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[
+                replace(BRAND_ENTITY, cache=EntityCache(ttl_seconds=30))
+            ],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_batch_loaders=True
+        )
+
+        for file_data in service_gen.gen_service():
+            self.assertFalse(
+                any(
+                    "CountAsync" in line or "CountCommand" in line
+                    for line in file_data.file_content
+                ),
+                file_data.file_name
+            )
+
+    def test_gen_service_with_count_estimate_threshold(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[BRAND_ENTITY, ADDRESS_ENTITY],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_row_mappers=True,
+            gen_counts=True,
+            count_estimate_threshold=5000
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        brand_repo = files["BrandRepo.cs"]
+        self.assertIn(
+            "        private const long EstimateCountThreshold = 5000;",
+            brand_repo
+        )
+        self.assertIn(
+            "                var estimate = await dbService.GetAsync<long>"
+            "(sqlCommand.EstimateCountCommand, parameters => { }, "
+            "reader => reader.GetInt64(0));",
+            brand_repo
+        )
+        self.assertIn(
+            "           return await dbService.GetAsync<long>"
+            "(sqlCommand.CountCommand, parameters => "
+            "BrandRowMapper.BindListParam(parameters, brand), "
+            "reader => reader.GetInt64(0));",
+            brand_repo
+        )
+
+        # Lists without keys are never filtered, the estimate is always tried
+        address_repo = files["AddressRepo.cs"]
+        start = address_repo.index(
+            "        public async Task<long> CountAsync"
+            "(AddressListParam address)"
+        )
+        self.assertEqual(
+            [
+                "           var estimate = await dbService.GetAsync<long>"
+                "(sqlCommand.EstimateCountCommand, parameters => { }, "
+                "reader => reader.GetInt64(0));",
+                "           if (estimate >= EstimateCountThreshold)",
+            ],
+            address_repo[start + 3:start + 5]
+        )
+
+    def test_gen_service_with_filterable_json_field(self):
+        document = EntityField(
+            name="attributes",
+            field_type=FieldType.STRING,
+            format=FieldFormat.JSON,
+            is_filterable=True
+        )
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[
+                replace(
+                    BRAND_ENTITY,
+                    non_ref_fields=BRAND_ENTITY.non_ref_fields + [document]
+                )
+            ],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            gen_row_mappers=True
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        self.assertIn(
+            '        public const string ListByAttributesCommand = "SELECT '
+            "brand_id, name, description, attributes FROM Brand WHERE "
+            "attributes @> @attributes::jsonb ORDER BY brand_id ASC "
+            'LIMIT @limit OFFSET @offset;";',
+            files["BrandSqlCommand.cs"]
+        )
+        self.assertIn(
+            "        Task<IEnumerable<Brand>> ListByAttributesAsync"
+            "(string attributes, BrandListParam brandListParam);",
+            files["IBrandRepo.cs"]
+        )
+        self.assertIn(
+            "           return await dbService.ListAsync<Brand>"
+            "(BrandSqlCommand.ListByAttributesCommand, parameters => "
+            "BrandRowMapper.BindListByAttributesParam(parameters, "
+            "attributes, brand), BrandRowMapper.Map);",
+            files["BrandRepo.cs"]
+        )
+        self.assertIn(
+            "           parameters.Add(new NpgsqlParameter<string>"
+            '("attributes", attributes));',
+            files["BrandRowMapper.cs"]
+        )
+
+    def test_gen_service_with_projections(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[
+                replace(
+                    BRAND_ENTITY,
+                    projections={"summary": ["brand_id", NAME]}
+                )
+            ],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None)
+        )
+        files = {
+            file_data.file_name: file_data.file_content
+            for file_data in service_gen.gen_service()
+        }
+
+        self.assertEqual(
+            [
+                "namespace ProductDal.Models",
+                "{",
+                "    public class BrandSummary",
+                "    {",
+                "        public string Brand_id { get; set; } = default!;",
+                "        public string Name { get; set; } = default!;",
+                "    }",
+                "}",
+            ],
+            files["BrandSummary.cs"]
+        )
+        self.assertIn(
+            '        public const string GetSummaryCommand = '
+            '"SELECT brand_id, name FROM Brand WHERE brand_id = @brand_id;";',
+            files["BrandSqlCommand.cs"]
+        )
+        self.assertIn(
+            "        Task<IEnumerable<BrandSummary>> ListSummaryAsync"
+            "(BrandListParam brandListParam);",
+            files["IBrandRepo.cs"]
+        )
+        self.assertIn("using ProductDal.SqlCommands;", files["BrandRepo.cs"])
+        self.assertIn(
+            "           return await dbService.ListAsync<BrandSummary>"
+            "(BrandSqlCommand.ListSummaryCommand, brand);",
+            files["BrandRepo.cs"]
+        )
+
+    def test_gen_service_with_unknown_projection_column(self):
+        service_gen = DbServiceGenerator(
+            service_name=PRODUCT_DAL,
+            svc_dir=self.svc_dir,
+            entities=[
+                replace(BRAND_ENTITY, projections={"Summary": ["title"]})
+            ],
+            pl_type_mapper=CSharpTypeMapper(),
+            sql_gen=PgsqlCommandGenerator(entity=None)
+        )
+        with self.assertRaises(ValueError) as context:
+            list(service_gen.gen_service())
+
+        self.assertEqual(
+            "`Brand.projections.Summary` has no column `title`",
+            str(context.exception)
+        )
@@ -0,0 +1,230 @@
+import json
+import os
+import tempfile
+from threading import Event, Thread
+import time
+import unittest
+
+from data_type_mapper.sql_type_mapper import PgsqlTypeMapper
+from entity_parser.entity_parser import JsonSchemaParser
+from output_sink.output_sink import MemoryOutputSink
+from service_gens.csharp_service_gen.schema_watcher import SchemaWatcher
+from service_gens.csharp_service_gen.utils import CsharpServiceUtil
+from sql_generator.sql_generator import (
+    PgsqlCommandGenerator, PgsqlTableSqlGenerator
+)
+from utils.utils import with_line_endings
+
+
+OUTPUT_PATH: str = "output/path"
+ECOMMERCE: str = "Ecommerce"
+PRODUCT_DAL: str = "ProductDal"
+SRC: str = "src"
+INIT_SQL: str = "Ecommerce/DbScripts/init.sql"
+BRAND_REPO: str = "Ecommerce/src/ProductDal/Repos/BrandRepo.cs"
+SCHEMA = {
+    "definitions": {
+        "Brand": {
+            "type": "object",
+            "properties": {
+                "brand_id": {"type": "string", "maxLength": 30},
+                "name": {"type": "string", "maxLength": 50}
+            },
+            "required": ["brand_id", "name"]
+        },
+        "Category": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "integer"},
+                "name": {"type": "string", "maxLength": 50}
+            },
+            "required": ["id"]
+        },
+        "Product": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string", "format": "uuid"},
+                "brand": {"$ref": "#/definitions/Brand"}
+            },
+            "required": ["id"]
+        }
+    }
+}
+
+
+class TestSchemaWatcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.schema = json.loads(json.dumps(SCHEMA))
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.file_path = os.path.join(temp_dir.name, "schema.json")
+        self._write_schema()
+
+        self.svc_dir = CsharpServiceUtil(
+            output_path=OUTPUT_PATH,
+            sln_name=ECOMMERCE,
+            service_name=PRODUCT_DAL,
+            src=SRC
+        )
+        self.sink = MemoryOutputSink(OUTPUT_PATH)
+        self.watcher = SchemaWatcher(
+            file_path=self.file_path,
+            svc_dir=self.svc_dir,
+            service_name=PRODUCT_DAL,
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            db_type_mapper=PgsqlTypeMapper(),
+            db_script_gen=PgsqlTableSqlGenerator(),
+            output_sink=self.sink
+        )
+
+    def _write_schema(self) -> None:
+        self._write_file(json.dumps(self.schema))
+
+    def _write_file(self, content: str) -> None:
+        # Replace the file at once so a running watch never reads it half
+        # written
+        temp_path = f"{self.file_path}.tmp"
+        with open(temp_path, "w") as file:
+            file.write(content)
+
+        # Make sure the modification is visible to the mtime check
+        stat = os.stat(temp_path)
+        os.utime(
+            temp_path,
+            ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000)
+        )
+        os.replace(temp_path, self.file_path)
+
+    def _get_full_db_script(self) -> str:
+        file_data = PgsqlTableSqlGenerator().gen_db_scripts_file_data(
+            entities=JsonSchemaParser().parse(file_path=self.file_path),
+            type_mapper=PgsqlTypeMapper(),
+            file_path="",
+            file_name=""
+        )
+        return "".join(with_line_endings(file_data.file_content))
+
+    def test_poll_regenerates_all_entities_first(self):
+        self.assertEqual(
+            {"Brand", "Category", "Product"}, self.watcher.poll()
+        )
+        self.assertIn(BRAND_REPO, self.sink.files)
+        self.assertEqual(self._get_full_db_script(), self.sink.files[INIT_SQL])
+
+    def test_poll_without_change(self):
+        self.watcher.poll()
+        self.assertEqual(set(), self.watcher.poll())
+
+    def test_poll_regenerates_changed_entity_only(self):
+        self.watcher.poll()
+        self.schema["definitions"]["Category"]["properties"]["name"][
+            "maxLength"
+        ] = 100
+        self._write_schema()
+
+        self.assertEqual({"Category"}, self.watcher.poll())
+        self.assertEqual(self._get_full_db_script(), self.sink.files[INIT_SQL])
+
+    def test_poll_regenerates_entities_with_changed_columns(self):
+        self.watcher.poll()
+        self.schema["definitions"]["Brand"]["properties"]["brand_id"][
+            "maxLength"
+        ] = 40
+        self._write_schema()
+
+        # The FK column of Product is derived from the Brand primary key
+        self.assertEqual({"Brand", "Product"}, self.watcher.poll())
+        self.assertIn(
+            "    brand_id VARCHAR(40) NOT NULL,", self.sink.files[INIT_SQL]
+        )
+
+    def test_poll_regenerates_with_generator_options(self):
+        watcher = SchemaWatcher(
+            file_path=self.file_path,
+            svc_dir=self.svc_dir,
+            service_name=PRODUCT_DAL,
+            sql_gen=PgsqlCommandGenerator(entity=None),
+            db_type_mapper=PgsqlTypeMapper(),
+            db_script_gen=PgsqlTableSqlGenerator(),
+            output_sink=self.sink,
+            gen_row_mappers=True,
+            gen_batch_loaders=True
+        )
+        watcher.poll()
+
+        self.assertIn(
+            "Ecommerce/src/ProductDal/Mappers/BrandRowMapper.cs",
+            self.sink.files
+        )
+        self.assertIn(
+            "Ecommerce/src/ProductDal/Repos/BatchedBrandRepo.cs",
+            self.sink.files
+        )
+
+    def test_poll_retries_failed_generation(self):
+        self.watcher.poll()
+        self.schema["definitions"]["Category"]["projections"] = {
+            "Summary": ["id", "label"]
+        }
+        self._write_schema()
+        with self.assertRaises(ValueError):
+            self.watcher.poll()
+
+        # Nothing was regenerated, so the next poll tries again
+        with self.assertRaises(ValueError):
+            self.watcher.poll()
+
+        self.schema["definitions"]["Category"]["projections"] = {
+            "Summary": ["id", "name"]
+        }
+        self._write_schema()
+        self.assertEqual({"Category"}, self.watcher.poll())
+
+    def test_watch_recovers_from_invalid_schema(self):
+        self.watcher.poll()
+        self._write_file('{"definitions": {"Brand": ')
+
+        errors = []
+        stop_event = Event()
+        thread = Thread(
+            target=self.watcher.watch,
+            kwargs={
+                "poll_interval": 0.01,
+                "stop_event": stop_event,
+                "on_error": errors.append
+            }
+        )
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(stop_event.set)
+        self._wait_for(lambda: errors)
+
+        # The half saved schema is reported once and the watch goes on
+        self.assertEqual(1, len(errors))
+        self.assertIsInstance(errors[0], json.JSONDecodeError)
+        self.assertIn(BRAND_REPO, self.sink.files)
+
+        self.schema["definitions"]["Category"]["properties"]["name"][
+            "maxLength"
+        ] = 100
+        self._write_schema()
+        self._wait_for(
+            lambda: "VARCHAR(100)" in self.sink.files[INIT_SQL]
+        )
+        self.assertEqual(1, len(errors))
+        self.assertIsNone(self.watcher.last_error)
+
+    def _wait_for(self, condition) -> None:
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_poll_drops_removed_entity(self):
+        self.watcher.poll()
+        del self.schema["definitions"]["Category"]
+        self._write_schema()
+
+        self.assertEqual(set(), self.watcher.poll())
+        self.assertNotIn("Category", self.sink.files[INIT_SQL])
+        self.assertEqual(self._get_full_db_script(), self.sink.files[INIT_SQL])
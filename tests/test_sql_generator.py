@@ -1,9 +1,15 @@
+from dataclasses import replace
 from typing import List
 import unittest
+from unittest.mock import patch
 from parameterized import parameterized
 
 from data_type_mapper.sql_type_mapper import PgsqlTypeMapper
-from entity_parser.entity import Entity, EntityField, FieldType, RefEntityField
+from entity_parser.entity_parser import JsonSchemaParser
+from entity_parser.entity import (
+    Entity, EntityField, EntityIndex, EntityStorage, FieldFormat, FieldType,
+    IndexMethod, RefEntityField
+)
 from sql_generator.sql_generator import (
     PgsqlCommandGenerator, PgsqlTableSqlGenerator
 )
@@ -149,6 +155,60 @@ ENTITY_WITH_REF = Entity(
     ]
 )
 
+REVIEW_ENTITY = Entity(
+    name="review",
+    non_ref_fields=[],
+    ref_fields=[
+        RefEntityField(
+            name="product",
+            ref_entity=ENTITY_WITH_REF,
+            is_required=False
+        )
+    ],
+    pk_fields=[
+        EntityField(
+            name="review_id",
+            field_type=FieldType.INTEGER,
+            max_length=None,
+            is_required=True,
+            is_primary_key=True,
+            type_ref=None
+        )
+    ]
+)
+
+EVENT_ENTITY = Entity(
+    name="event",
+    non_ref_fields=[
+        EntityField(
+            name="kind",
+            field_type=FieldType.STRING,
+            max_length=20,
+            is_required=True
+        ),
+        EntityField(
+            name="payload",
+            field_type=FieldType.STRING,
+            format=FieldFormat.JSON
+        ),
+        EntityField(
+            name="created_at",
+            field_type=FieldType.STRING,
+            is_required=True,
+            format=FieldFormat.DATETIME
+        )
+    ],
+    ref_fields=[],
+    pk_fields=[
+        EntityField(
+            name="id",
+            field_type=FieldType.INTEGER,
+            is_required=True,
+            is_primary_key=True
+        )
+    ]
+)
+
 STATE_ENUM_ENTITY = Entity(
     name=STATE,
     non_ref_fields=[],
@@ -563,6 +623,59 @@ DOT_NET_TYPE_ENTITY = Entity(
 )
 
 
+REF_CYCLE_SCHEMA: str = '''
+{
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "definitions": {
+    "Product": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"},
+        "brand": {"$ref": "#/definitions/Brand"},
+        "featured_review": {"$ref": "#/definitions/Review"}
+      }
+    },
+    "Review": {
+      "type": "object",
+      "indexes": [{"columns": ["rating"]}],
+      "properties": {
+        "id": {"type": "integer"},
+        "rating": {"type": "integer"},
+        "product": {"$ref": "#/definitions/Product"}
+      }
+    },
+    "Brand": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"}
+      }
+    },
+    "Category": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "integer"},
+        "parent": {"$ref": "#/definitions/Category"}
+      }
+    }
+  }
+}
+'''
+
+
+def guarded_constraint_sql(constraint_name: str, constraint_sql: str) -> str:
+    return (
+        "DO $$\n"
+        "BEGIN\n"
+        "    IF NOT EXISTS (\n"
+        "        SELECT 1 FROM pg_constraint "
+        f"WHERE conname = '{constraint_name}'\n"
+        "    ) THEN\n"
+        f"        {constraint_sql}\n"
+        "    END IF;\n"
+        "END $$;"
+    )
+
+
 class TestPostgreSqlGenerator(unittest.TestCase):
     @parameterized.expand([
         (
@@ -626,6 +739,27 @@ class TestPostgreSqlGenerator(unittest.TestCase):
         actual_sql = sql_gen.gen_list_sql_statement()
         self.assertEqual(expected_sql, actual_sql)
 
+    def test_gen_projection_sql_statements(self):
+        entity_data = EntityFieldData.from_entity(ENTITY_WITH_REF)
+        sql_gen = PgsqlCommandGenerator(entity_data)
+        field_data = [
+            fld for fld in entity_data.get_field_data()
+            if fld.name in ("productid", "name")
+        ]
+        self.assertEqual(
+            "SELECT productid, name FROM product "
+            "WHERE productid = @productid;",
+            sql_gen.gen_get_sql_statement(field_data)
+        )
+        self.assertEqual(
+            "SELECT productid, name FROM product WHERE "
+            "(@productids = {} OR productids = ANY(@productids)) AND "
+            "(@brand_ids = {} OR brand_ids = ANY(@brand_ids)) AND "
+            "(@category_ids = {} OR category_ids = ANY(@category_ids)) "
+            "ORDER BY productid ASC LIMIT @limit OFFSET @offset;",
+            sql_gen.gen_list_sql_statement(field_data)
+        )
+
     @parameterized.expand([
         (
             "entity_with_no_ref",
@@ -671,6 +805,76 @@ class TestPostgreSqlGenerator(unittest.TestCase):
         actual_sql = sql_gen.gen_get_sql_statement()
         self.assertEqual(expected_sql, actual_sql)
 
+    @parameterized.expand([
+        (
+            "entity_with_no_ref",
+            ENTITY_WITH_NO_REF,
+            (
+                "SELECT brand_id, name, description FROM Brand "
+                "WHERE brand_id = ANY(@brand_ids);"
+            )
+        ),
+        (
+            "entity_with_enum_and_no_pk",
+            ADDRESS_ENTITY,
+            "SELECT street_address, city, state FROM address;"
+        ),
+        (
+            "entity_with_composite_pk",
+            COMPOSITE_PRIMARY_KEY_ENTITY,
+            "SELECT order_id, product_id, quantity, price FROM product_order "
+            "WHERE (order_id, product_id) IN "
+            "(SELECT * FROM UNNEST(@order_ids, @product_ids));"
+        )
+    ])
+    def test_gen_get_many_sql_statement(
+        self, name: str, entity: Entity, expected_sql: str
+    ):
+        sql_gen = PgsqlCommandGenerator(EntityFieldData.from_entity(entity))
+        actual_sql = sql_gen.gen_get_many_sql_statement()
+        self.assertEqual(expected_sql, actual_sql)
+
+    @parameterized.expand([
+        (
+            "entity_with_ref",
+            ENTITY_WITH_REF,
+            "SELECT COUNT(*) FROM product "
+            "WHERE (@productids = {} OR productids = ANY(@productids)) "
+            "AND (@brand_ids = {} OR brand_ids = ANY(@brand_ids)) "
+            "AND (@category_ids = {} OR category_ids = ANY(@category_ids));"
+        ),
+        (
+            "entity_with_enum_and_no_pk",
+            ADDRESS_ENTITY,
+            "SELECT COUNT(*) FROM address;"
+        ),
+        (
+            "entity_with_composite_pk",
+            COMPOSITE_PRIMARY_KEY_ENTITY,
+            "SELECT COUNT(*) FROM product_order "
+            "WHERE (@order_ids = {} OR order_ids = ANY(@order_ids)) "
+            "AND (@product_ids = {} OR product_ids = ANY(@product_ids));"
+        )
+    ])
+    def test_gen_count_sql_statement(
+        self, name: str, entity: Entity, expected_sql: str
+    ):
+        sql_gen = PgsqlCommandGenerator(EntityFieldData.from_entity(entity))
+        actual_sql = sql_gen.gen_count_sql_statement()
+        self.assertEqual(expected_sql, actual_sql)
+
+    def test_gen_estimate_count_sql_statement(self):
+        sql_gen = PgsqlCommandGenerator(
+            EntityFieldData.from_entity(ENTITY_WITH_NO_REF)
+        )
+        self.assertEqual(
+            "SELECT CASE WHEN c.reltuples < 0 OR c.relpages = 0 THEN -1 "
+            "ELSE (c.reltuples / c.relpages * (pg_relation_size(c.oid) / "
+            "current_setting('block_size')::int))::bigint END "
+            "FROM pg_class c WHERE c.oid = 'Brand'::regclass;",
+            sql_gen.gen_estimate_count_sql_statement()
+        )
+
     @parameterized.expand([
         (
             "entity_with_no_ref",
@@ -790,6 +994,125 @@ class TestPostgreSqlGenerator(unittest.TestCase):
         actual_sql = sql_gen.gen_update_sql_statement()
         self.assertEqual(expected_sql, actual_sql)
 
+    @parameterized.expand([
+        (
+            "entity_with_no_ref",
+            ENTITY_WITH_NO_REF,
+            (
+                "UPDATE Brand SET "
+                "name = CASE WHEN @name_set THEN @name ELSE name END, "
+                "description = CASE WHEN @description_set "
+                "THEN @description ELSE description END "
+                "WHERE brand_id = @brand_id;"
+            )
+        ),
+        (
+            "entity_with_enum_and_no_pk",
+            ADDRESS_ENTITY,
+            (
+                "UPDATE address SET street_address = CASE WHEN "
+                "@street_address_set THEN @street_address "
+                "ELSE street_address END, "
+                "city = CASE WHEN @city_set THEN @city ELSE city END, "
+                "state = CASE WHEN @state_set THEN @state ELSE state END;"
+            )
+        ),
+        (
+            "entity_with_composite_pk",
+            COMPOSITE_PRIMARY_KEY_ENTITY,
+            (
+                "UPDATE product_order SET quantity = CASE WHEN "
+                "@quantity_set THEN @quantity ELSE quantity END, "
+                "price = CASE WHEN @price_set THEN @price ELSE price END "
+                "WHERE order_id = @order_id AND product_id = @product_id;"
+            )
+        )
+    ])
+    def test_gen_update_partial_sql_statement(
+        self, name: str, entity: Entity, expected_sql: str
+    ):
+        sql_gen = PgsqlCommandGenerator(EntityFieldData.from_entity(entity))
+        actual_sql = sql_gen.gen_update_partial_sql_statement()
+        self.assertEqual(expected_sql, actual_sql)
+
+    @parameterized.expand([
+        (
+            "required_refs",
+            ENTITY_WITH_REF,
+            1,
+            "SELECT t0.productid, t0.name, t0.description, t0.price, "
+            "t0.quantity, t0.brand_id, t0.category_id, t1.brand_id, "
+            "t1.name, t1.description, t2.id, t2.name, t2.description "
+            "FROM product t0 JOIN Brand t1 ON t1.brand_id = t0.brand_id "
+            "JOIN Category t2 ON t2.id = t0.category_id "
+            "WHERE t0.productid = @productid;"
+        ),
+        (
+            "optional_ref_depth_one",
+            REVIEW_ENTITY,
+            1,
+            "SELECT t0.review_id, t0.productid, t1.productid, t1.name, "
+            "t1.description, t1.price, t1.quantity, t1.brand_id, "
+            "t1.category_id FROM review t0 "
+            "LEFT JOIN product t1 ON t1.productid = t0.productid "
+            "WHERE t0.review_id = @review_id;"
+        ),
+        (
+            # References below an optional join stay optional
+            "optional_ref_depth_two",
+            REVIEW_ENTITY,
+            2,
+            "SELECT t0.review_id, t0.productid, t1.productid, t1.name, "
+            "t1.description, t1.price, t1.quantity, t1.brand_id, "
+            "t1.category_id, t2.brand_id, t2.name, t2.description, "
+            "t3.id, t3.name, t3.description FROM review t0 "
+            "LEFT JOIN product t1 ON t1.productid = t0.productid "
+            "LEFT JOIN Brand t2 ON t2.brand_id = t1.brand_id "
+            "LEFT JOIN Category t3 ON t3.id = t1.category_id "
+            "WHERE t0.review_id = @review_id;"
+        )
+    ])
+    def test_gen_get_with_refs_sql_statement(
+        self, name: str, entity: Entity, depth: int, expected_sql: str
+    ):
+        sql_gen = PgsqlCommandGenerator(EntityFieldData.from_entity(entity))
+        joins = sql_gen.get_ref_joins(depth)
+        actual_sql = sql_gen.gen_get_with_refs_sql_statement(joins)
+        self.assertEqual(expected_sql, actual_sql)
+
+    def test_get_ref_joins_without_refs(self):
+        sql_gen = PgsqlCommandGenerator(
+            EntityFieldData.from_entity(ADDRESS_ENTITY)
+        )
+        self.assertEqual([], sql_gen.get_ref_joins(2))
+
+    @parameterized.expand([
+        (
+            "entity_with_pk",
+            EVENT_ENTITY,
+            "SELECT id, kind, payload, created_at FROM event "
+            "WHERE payload @> @payload::jsonb ORDER BY id ASC "
+            "LIMIT @limit OFFSET @offset;"
+        ),
+        (
+            "entity_without_pk",
+            replace(EVENT_ENTITY, pk_fields=[]),
+            "SELECT kind, payload, created_at FROM event "
+            "WHERE payload @> @payload::jsonb LIMIT @limit OFFSET @offset;"
+        )
+    ])
+    def test_gen_list_by_containment_sql_statement(
+        self, name: str, entity: Entity, expected_sql: str
+    ):
+        entity_data = EntityFieldData.from_entity(entity)
+        sql_gen = PgsqlCommandGenerator(entity_data)
+        payload = next(
+            fld for fld in entity_data.other_field_data
+            if fld.name == "payload"
+        )
+        actual_sql = sql_gen.gen_list_by_containment_sql_statement(payload)
+        self.assertEqual(expected_sql, actual_sql)
+
     @parameterized.expand([
         (
             "entity_with_no_ref",
@@ -934,3 +1257,372 @@ class TestPgsqlTableSqlGenerator(unittest.TestCase):
         entity_data = EntityFieldData.from_entity(entity, self.type_mapper)
         actual_sql = tbl_sql_gen.gen_table_sql(entity_data)
         self.assertEqual(expected_sql, actual_sql)
+
+    def test_gen_table_sql_with_indexes(self):
+        entity = replace(
+            EVENT_ENTITY,
+            append_only=True,
+            # Only the covering projection gets an index, without its
+            # variable length columns
+            projections={
+                "Summary": ["id", "kind", "payload"], "Detail": ["kind"]
+            },
+            covering_projections=["Summary"],
+            indexes=[
+                EntityIndex(
+                    columns=["kind"],
+                    include=["payload"],
+                    where="created_at > '2024-01-01'"
+                ),
+                EntityIndex(
+                    columns=["payload"],
+                    method=IndexMethod.GIN,
+                    name="event_payload_idx"
+                )
+            ]
+        )
+        entity_data = EntityFieldData.from_entity(entity, self.type_mapper)
+        actual_sql = PgsqlTableSqlGenerator().gen_table_sql(entity_data)
+        self.assertEqual(
+            [
+                "CREATE INDEX IF NOT EXISTS event_kind_covering_partial_idx "
+                "ON event (kind) INCLUDE (payload) "
+                "WHERE created_at > '2024-01-01';",
+                "CREATE INDEX IF NOT EXISTS event_payload_idx ON event "
+                "USING GIN (payload);",
+                "CREATE INDEX IF NOT EXISTS event_created_at_brin_idx "
+                "ON event USING BRIN (created_at);",
+                "CREATE INDEX IF NOT EXISTS event_summary_idx ON event (id) "
+                "INCLUDE (kind);",
+            ],
+            actual_sql[actual_sql.index(");") + 1:]
+        )
+
+    @parameterized.expand([
+        ("json", False, False, "JSON", []),
+        (
+            "jsonb",
+            True,
+            False,
+            "JSONB",
+            [
+                "CREATE INDEX IF NOT EXISTS event_payload_gin_idx ON event "
+                "USING GIN (payload);"
+            ]
+        ),
+        (
+            "filterable",
+            False,
+            True,
+            "JSONB",
+            [
+                "CREATE INDEX IF NOT EXISTS event_payload_gin_idx ON event "
+                "USING GIN (payload);"
+            ]
+        )
+    ])
+    def test_gen_table_sql_with_json_field(
+        self,
+        name: str,
+        use_jsonb: bool,
+        is_filterable: bool,
+        expected_type: str,
+        expected_indexes: List[str]
+    ):
+        payload = replace(
+            EVENT_ENTITY.non_ref_fields[1], is_filterable=is_filterable
+        )
+        entity = replace(
+            EVENT_ENTITY,
+            non_ref_fields=[
+                EVENT_ENTITY.non_ref_fields[0],
+                payload,
+                EVENT_ENTITY.non_ref_fields[2]
+            ]
+        )
+        entity_data = EntityFieldData.from_entity(
+            entity, PgsqlTypeMapper(use_jsonb=use_jsonb)
+        )
+        actual_sql = PgsqlTableSqlGenerator().gen_table_sql(entity_data)
+        self.assertIn(f"    payload {expected_type} NULL,", actual_sql)
+        self.assertEqual(
+            expected_indexes, actual_sql[actual_sql.index(");") + 1:]
+        )
+
+    def test_gen_table_sql_with_storage(self):
+        payload = replace(EVENT_ENTITY.non_ref_fields[1], compression="lz4")
+        entity = replace(
+            EVENT_ENTITY,
+            non_ref_fields=[
+                EVENT_ENTITY.non_ref_fields[0],
+                payload,
+                EVENT_ENTITY.non_ref_fields[2]
+            ],
+            storage=EntityStorage(fillfactor=80, unlogged=True)
+        )
+        entity_data = EntityFieldData.from_entity(entity, self.type_mapper)
+        actual_sql = PgsqlTableSqlGenerator().gen_table_sql(entity_data)
+        self.assertEqual(
+            [
+                "CREATE UNLOGGED TABLE IF NOT EXISTS event (",
+                "    id INTEGER PRIMARY KEY,",
+                "    kind VARCHAR(20) NOT NULL,",
+                "    payload JSON COMPRESSION lz4 NULL,",
+                "    created_at TIMESTAMPTZ NOT NULL",
+                ") WITH (fillfactor = 80);",
+            ],
+            actual_sql
+        )
+
+    def test_gen_table_sql_with_duplicate_index_name(self):
+        entity = replace(
+            EVENT_ENTITY,
+            indexes=[
+                EntityIndex(columns=["kind"], where="kind <> ''"),
+                EntityIndex(columns=["kind"]),
+                EntityIndex(columns=["kind"], where="kind = 'click'")
+            ]
+        )
+        entity_data = EntityFieldData.from_entity(entity, self.type_mapper)
+        with self.assertRaises(ValueError) as context:
+            PgsqlTableSqlGenerator().gen_table_sql(entity_data)
+
+        self.assertEqual(
+            "`event` has more than one index named `event_kind_partial_idx`, "
+            "name them with the `name` hint",
+            str(context.exception)
+        )
+
+    def test_gen_table_sql_with_unknown_index_column(self):
+        entity = replace(
+            EVENT_ENTITY, indexes=[EntityIndex(columns=["deleted_at"])]
+        )
+        entity_data = EntityFieldData.from_entity(entity, self.type_mapper)
+        with self.assertRaises(ValueError) as context:
+            PgsqlTableSqlGenerator().gen_table_sql(entity_data)
+
+        self.assertEqual(
+            "`event.indexes[0]` has no column `deleted_at`",
+            str(context.exception)
+        )
+
+    def test_gen_db_script_batches(self):
+        batches = PgsqlTableSqlGenerator().gen_db_script_batches(
+            JsonSchemaParser().parse(file_content=REF_CYCLE_SCHEMA),
+            self.type_mapper
+        )
+        self.assertEqual(
+            [
+                [
+                    "CREATE TABLE IF NOT EXISTS Brand (\n"
+                    "    id INTEGER PRIMARY KEY\n"
+                    ");",
+                    "CREATE TABLE IF NOT EXISTS Category (\n"
+                    "    id INTEGER PRIMARY KEY,\n"
+                    "    parent_id INTEGER NULL,\n"
+                    "    FOREIGN KEY (parent_id) REFERENCES Category (id)\n"
+                    ");"
+                ],
+                [
+                    "CREATE TABLE IF NOT EXISTS Product (\n"
+                    "    id INTEGER PRIMARY KEY,\n"
+                    "    brand_id INTEGER NULL,\n"
+                    "    featured_review_id INTEGER NULL,\n"
+                    "    FOREIGN KEY (brand_id) REFERENCES Brand (id)\n"
+                    ");"
+                ],
+                [
+                    "CREATE TABLE IF NOT EXISTS Review (\n"
+                    "    id INTEGER PRIMARY KEY,\n"
+                    "    rating INTEGER NULL,\n"
+                    "    product_id INTEGER NULL,\n"
+                    "    FOREIGN KEY (product_id) REFERENCES Product (id)\n"
+                    ");"
+                ],
+                [
+                    "CREATE INDEX IF NOT EXISTS review_rating_idx ON Review "
+                    "(rating);"
+                ],
+                [
+                    "DO $$\n"
+                    "BEGIN\n"
+                    "    IF NOT EXISTS (\n"
+                    "        SELECT 1 FROM pg_constraint "
+                    "WHERE conname = 'product_featured_review_id_fkey'\n"
+                    "    ) THEN\n"
+                    "        ALTER TABLE Product ADD CONSTRAINT "
+                    "product_featured_review_id_fkey FOREIGN KEY "
+                    "(featured_review_id) REFERENCES Review (id);\n"
+                    "    END IF;\n"
+                    "END $$;"
+                ]
+            ],
+            batches
+        )
+
+    def test_gen_db_script_batches_are_rerunnable(self):
+        for bulk_load in [False, True]:
+            batches = PgsqlTableSqlGenerator(
+                bulk_load=bulk_load
+            ).gen_db_script_batches(
+                JsonSchemaParser().parse(file_content=REF_CYCLE_SCHEMA),
+                self.type_mapper
+            )
+            statements = [
+                statement for batch in batches for statement in batch
+                if not statement.startswith("--")
+            ]
+            # Each statement skips what an earlier run already created
+            for statement in statements:
+                with self.subTest(bulk_load=bulk_load, statement=statement):
+                    self.assertTrue(
+                        statement.startswith("ANALYZE ")
+                        or "IF NOT EXISTS" in statement
+                    )
+
+    def test_gen_db_script_batches_for_bulk_load(self):
+        tbl_sql_gen = PgsqlTableSqlGenerator(
+            bulk_load=True, load_data_hook="\\i snapshot.sql"
+        )
+        batches = tbl_sql_gen.gen_db_script_batches(
+            JsonSchemaParser().parse(file_content=REF_CYCLE_SCHEMA),
+            self.type_mapper
+        )
+        self.assertEqual(
+            [
+                "CREATE TABLE IF NOT EXISTS Product (\n"
+                "    id INTEGER NOT NULL,\n"
+                "    brand_id INTEGER NULL,\n"
+                "    featured_review_id INTEGER NULL\n"
+                ");",
+                "CREATE TABLE IF NOT EXISTS Review (\n"
+                "    id INTEGER NOT NULL,\n"
+                "    rating INTEGER NULL,\n"
+                "    product_id INTEGER NULL\n"
+                ");",
+                "CREATE TABLE IF NOT EXISTS Brand (\n"
+                "    id INTEGER NOT NULL\n"
+                ");",
+                "CREATE TABLE IF NOT EXISTS Category (\n"
+                "    id INTEGER NOT NULL,\n"
+                "    parent_id INTEGER NULL\n"
+                ");"
+            ],
+            batches[0]
+        )
+        self.assertEqual(
+            [
+                ["\\i snapshot.sql"],
+                [
+                    guarded_constraint_sql(
+                        "product_pkey",
+                        "ALTER TABLE Product ADD PRIMARY KEY (id);"
+                    ),
+                    guarded_constraint_sql(
+                        "review_pkey",
+                        "ALTER TABLE Review ADD PRIMARY KEY (id);"
+                    ),
+                    guarded_constraint_sql(
+                        "brand_pkey",
+                        "ALTER TABLE Brand ADD PRIMARY KEY (id);"
+                    ),
+                    guarded_constraint_sql(
+                        "category_pkey",
+                        "ALTER TABLE Category ADD PRIMARY KEY (id);"
+                    )
+                ],
+                [
+                    "CREATE INDEX IF NOT EXISTS review_rating_idx ON Review "
+                    "(rating);"
+                ],
+                [
+                    guarded_constraint_sql(
+                        "product_brand_id_fkey",
+                        "ALTER TABLE Product ADD CONSTRAINT "
+                        "product_brand_id_fkey FOREIGN KEY (brand_id) "
+                        "REFERENCES Brand (id);"
+                    ),
+                    guarded_constraint_sql(
+                        "category_parent_id_fkey",
+                        "ALTER TABLE Category ADD CONSTRAINT "
+                        "category_parent_id_fkey FOREIGN KEY (parent_id) "
+                        "REFERENCES Category (id);"
+                    )
+                ],
+                [
+                    guarded_constraint_sql(
+                        "product_featured_review_id_fkey",
+                        "ALTER TABLE Product ADD CONSTRAINT "
+                        "product_featured_review_id_fkey FOREIGN KEY "
+                        "(featured_review_id) REFERENCES Review (id);"
+                    )
+                ],
+                [
+                    guarded_constraint_sql(
+                        "review_product_id_fkey",
+                        "ALTER TABLE Review ADD CONSTRAINT "
+                        "review_product_id_fkey FOREIGN KEY (product_id) "
+                        "REFERENCES Product (id);"
+                    )
+                ],
+                [
+                    "ANALYZE Product;",
+                    "ANALYZE Review;",
+                    "ANALYZE Brand;",
+                    "ANALYZE Category;"
+                ]
+            ],
+            batches[1:]
+        )
+
+    def test_gen_db_scripts_file_data(self):
+        tbl_sql_gen = PgsqlTableSqlGenerator()
+        file_data = tbl_sql_gen.gen_db_scripts_file_data(
+            entities=[ENTITY_WITH_NO_REF, ADDRESS_ENTITY],
+            type_mapper=self.type_mapper,
+            file_path="output/path",
+            file_name="init.sql"
+        )
+        expected_content = [
+            "-- Batch 1",
+            "CREATE TABLE IF NOT EXISTS Brand (",
+            "    brand_id VARCHAR(30) PRIMARY KEY,",
+            "    name VARCHAR(50) NOT NULL,",
+            "    description VARCHAR(max) NULL",
+            ");",
+            "",
+            "CREATE TABLE IF NOT EXISTS address (",
+            "    street_address TEXT NOT NULL,",
+            "    city TEXT NOT NULL,",
+            "    state VARCHAR(50) NOT NULL",
+            ");",
+            ""
+        ]
+
+        # Content is produced lazily and is only built when consumed
+        self.assertNotIsInstance(file_data.file_content, list)
+        self.assertEqual(expected_content, list(file_data.file_content))
+
+    def test_gen_db_scripts_file_data_streams_batches(self):
+        tbl_sql_gen = PgsqlTableSqlGenerator()
+        file_data = tbl_sql_gen.gen_db_scripts_file_data(
+            entities=JsonSchemaParser().parse(
+                file_content=REF_CYCLE_SCHEMA
+            ),
+            type_mapper=self.type_mapper,
+            file_path="output/path",
+            file_name="init.sql"
+        )
+        with patch.object(
+            tbl_sql_gen, "_get_index_batch", return_value=[]
+        ) as get_index_batch:
+            lines = iter(file_data.file_content)
+            self.assertEqual("-- Batch 1", next(lines))
+            self.assertEqual(
+                "CREATE TABLE IF NOT EXISTS Brand (", next(lines)
+            )
+
+            # Later batches are not built before the content reaches them
+            get_index_batch.assert_not_called()
+            list(lines)
+            get_index_batch.assert_called_once()
@@ -0,0 +1,155 @@
+import json
+import unittest
+
+from data_type_mapper.sql_type_mapper import PgsqlTypeMapper
+from entity_parser.entity_parser import JsonSchemaParser
+from synthetic_schema.synthetic_schema import (
+    PROFILES, SchemaProfile, SyntheticSchemaGenerator
+)
+from utils.utils import EntityFieldData
+
+
+TYPED_SCHEMA: str = '''
+{
+  "definitions": {
+    "Device": {
+      "type": "object",
+      "properties": {
+        "id": {"type": "string", "format": "uuid"},
+        "opens_at": {"type": "string", "format": "time"},
+        "network": {"type": "string", "format": "ipv4"},
+        "mac": {"type": "string", "format": "mac"},
+        "meta": {"type": "string", "format": "json", "filterable": true},
+        "firmware": {"type": "string", "format": "byte"},
+        "parent": {"$ref": "#/definitions/Device"}
+      },
+      "required": ["id", "opens_at", "network", "mac", "meta", "parent"]
+    }
+  }
+}
+'''
+ROW_COUNT: int = 20
+PROFILE = SchemaProfile(
+    entity_count=30,
+    ref_density=0.3,
+    self_ref_ratio=0.3,
+    defs_depth=3,
+    sub_def_ratio=0.5,
+    composite_key_ratio=0.3
+)
+
+
+class TestSyntheticSchemaGenerator(unittest.TestCase):
+    def setUp(self) -> None:
+        self.generator = SyntheticSchemaGenerator(PROFILE, seed=7)
+        self.entities = JsonSchemaParser().parse(
+            file_content=self.generator.gen_schema_content()
+        )
+
+    def test_gen_schema_is_deterministic(self):
+        self.assertEqual(
+            self.generator.gen_schema_content(),
+            SyntheticSchemaGenerator(PROFILE, seed=7).gen_schema_content()
+        )
+        self.assertNotEqual(
+            self.generator.gen_schema_content(),
+            SyntheticSchemaGenerator(PROFILE, seed=8).gen_schema_content()
+        )
+
+    def test_gen_schema_shapes(self):
+        tables = [
+            entity for entity in self.entities
+            if not entity.is_enum and not entity.is_sub_def
+        ]
+        self.assertEqual(PROFILE.entity_count, len(tables))
+        self.assertTrue(any(len(e.pk_fields) == 2 for e in tables))
+        self.assertTrue(any(
+            fld.ref_entity is entity
+            for entity in tables for fld in entity.ref_fields
+        ))
+        self.assertEqual(
+            PROFILE.defs_depth,
+            len([entity for entity in self.entities if entity.is_sub_def])
+        )
+
+    def test_gen_rows_match_tables(self):
+        rows = self.generator.gen_rows(self.entities, ROW_COUNT)
+        self.assertEqual(
+            rows, self.generator.gen_rows(self.entities, ROW_COUNT)
+        )
+
+        type_mapper = PgsqlTypeMapper()
+        for entity in self.entities:
+            if entity.is_enum or entity.is_sub_def:
+                self.assertNotIn(entity.name, rows)
+                continue
+
+            entity_data = EntityFieldData.from_entity(entity, type_mapper)
+            columns = [fld.name for fld in entity_data.get_field_data()]
+            self.assertEqual(ROW_COUNT, len(rows[entity.name]))
+            for row in rows[entity.name]:
+                self.assertEqual(sorted(columns), sorted(row))
+
+            # Foreign keys reference generated rows
+            for fld in entity_data.fk_field_data:
+                ref_values = {
+                    ref_row[fld.ref_field_name]
+                    for ref_row in rows[fld.ref_entity_name]
+                }
+                for row in rows[entity.name]:
+                    if row[fld.name] is not None:
+                        self.assertIn(row[fld.name], ref_values)
+
+    def test_gen_rows_fill_required_columns(self):
+        rows = self.generator.gen_rows(self.entities, ROW_COUNT)
+        type_mapper = PgsqlTypeMapper()
+        for entity in self.entities:
+            if entity.is_enum or entity.is_sub_def:
+                continue
+
+            entity_data = EntityFieldData.from_entity(entity, type_mapper)
+            pk_names = {fld.name for fld in entity_data.pk_field_data}
+            for fld in entity_data.get_field_data():
+                for row in rows[entity.name]:
+                    if fld.is_required or fld.name in pk_names:
+                        self.assertIsNotNone(row[fld.name], fld.name)
+                    if fld.data_type == "JSON" and row[fld.name]:
+                        json.loads(row[fld.name])
+                    self.assertNotIn("(max)", fld.data_type)
+
+    def test_gen_rows_for_column_types(self):
+        entities = JsonSchemaParser().parse(file_content=TYPED_SCHEMA)
+        rows = self.generator.gen_rows(entities, 3)["Device"]
+
+        # The first row of a required self-reference points at itself
+        self.assertEqual(rows[0]["id"], rows[0]["parent_id"])
+        self.assertTrue(all(row["parent_id"] for row in rows))
+        for row in rows:
+            self.assertRegex(row["opens_at"], r"^\d{2}:\d{2}:\d{2}$")
+            self.assertRegex(row["network"], r"^10\.\d+\.\d+\.0/24$")
+            self.assertRegex(
+                row["mac"], r"^08:00:2b(:[0-9a-f]{2}){3}$"
+            )
+            self.assertEqual({"value"}, set(json.loads(row["meta"])))
+
+        statement = next(self.generator.gen_insert_sql({"Device": rows}))
+        self.assertRegex(statement, r"'\\x[0-9a-f]{16}'")
+
+    def test_gen_insert_sql(self):
+        rows = self.generator.gen_rows(self.entities, 2)
+        statements = list(self.generator.gen_insert_sql(rows))
+        self.assertEqual(2 * len(rows), len(statements))
+        self.assertTrue(statements[0].startswith("INSERT INTO "))
+
+        statements = list(
+            self.generator.gen_insert_sql(rows, skip_existing=True)
+        )
+        self.assertTrue(statements[0].endswith(") ON CONFLICT DO NOTHING;"))
+
+    def test_profiles_parse(self):
+        for profile in PROFILES.values():
+            generator = SyntheticSchemaGenerator(profile, seed=1)
+            entities = JsonSchemaParser().parse(
+                file_content=generator.gen_schema_content()
+            )
+            self.assertTrue(generator.gen_rows(entities, 3))
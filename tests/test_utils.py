@@ -0,0 +1,24 @@
+import unittest
+from unittest.mock import mock_open, patch
+
+from utils.utils import WRITE_BUFFER_SIZE, FileData, write_file_data
+
+
+class TestWriteFileData(unittest.TestCase):
+    @patch("builtins.open", new_callable=mock_open)
+    def test_write_file_data_from_generator(self, mock_file):
+        file_data = FileData(
+            file_path="output/path",
+            file_name="init.sql",
+            file_content=(line for line in ["CREATE TABLE t (", ");"])
+        )
+        write_file_data(file_data)
+
+        mock_file.assert_called_once_with(
+            "output/path/init.sql", "w", buffering=WRITE_BUFFER_SIZE
+        )
+        written = "".join(
+            "".join(call.args[0])
+            for call in mock_file().writelines.call_args_list
+        )
+        self.assertEqual("CREATE TABLE t (\n);\n", written)
@@ -1,3 +1,4 @@
 TAB_4: str = "    "
 TAB_8: str = "        "
 TAB_12: str = "           "
+TAB_16: str = "                "
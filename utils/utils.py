@@ -1,11 +1,14 @@
 from dataclasses import dataclass
 import os
-from typing import List, NamedTuple
+from typing import Iterable, Iterator, List, NamedTuple
 
 from data_type_mapper.data_type_mapper import TypeMapper
 from entity_parser.entity import Entity, EntityField, FieldData, RefEntityField
 
 
+WRITE_BUFFER_SIZE: int = 1024 * 1024
+
+
 def read_file_content(file_path: str) -> None:
     with open(file_path) as file:
         return file.read()
@@ -29,17 +32,25 @@ def get_field_data(
             ref_entity_name=ref_entity_name,
             data_type=type_mapper.get_field_type(fld) if type_mapper else None,
             is_required=fld.is_required,
-            ref_field_name=fld.name
+            ref_field_name=fld.name,
+            compression=fld.compression
         )
         for fld in non_ref_fields
     ]
 
 
+def with_line_endings(lines: Iterable[str]) -> Iterator[str]:
+    # Yield the line and its terminator separately so no concatenated
+    # temporary string is created per line
+    for line in lines:
+        yield line
+        yield "\n"
+
+
 def write_file_data(file_data: "FileData") -> None:
     file_path = os.path.join(file_data.file_path, file_data.file_name)
-    with open(file_path, "w") as file:
-        for line in file_data.file_content:
-            file.write(line + "\n")
+    with open(file_path, "w", buffering=WRITE_BUFFER_SIZE) as file:
+        file.writelines(with_line_endings(file_data.file_content))
 
 
 def get_ref_field_data(
@@ -147,4 +158,6 @@ class EntityFieldData:
 class FileData:
     file_path: str
     file_name: str
-    file_content: List[str]
+    # Any iterable of lines; generators are consumed lazily by
+    # `write_file_data` so large files are never fully materialized
+    file_content: Iterable[str]